@@ -1,10 +1,17 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from tier1.tier1_pipeline import run_tier1_continuous
-from tier2.tier2_pipeline import run_tier2_continuous
-from utils.audio_processing import AudioStream
+from tier1.tier1_pipeline import run_tier1_continuous, Tier1SessionState
+from tier1.offline_pipeline import run_tier1_offline_parallel, shutdown_segment_pool, OfflineAnalysisCancelled
+from tier2.tier2_jobs import tier2_jobs, TIER2_DEADLINE_SECONDS
+from utils.audio_processing import AudioStream, get_transcription_metrics
+from utils.scene_processing import process_scene_frames, SCENE_BATCH_SIZE, get_clip_batching_metrics, scene_models_ready
+from utils.inference_gateway import inference_gateway
+from utils.model_runtime import get_runtime_stats
+from utils.model_registry import model_registry
+from utils.motion_gate import MotionGate
+from utils.frame_protocol import negotiate_protocol, encode_display_frame, send_frame_message
 import cv2
 import asyncio
 import queue
@@ -150,14 +157,29 @@ app = FastAPI()
 # Health check endpoint for Render
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for Render deployment"""
+    """Health check endpoint for Render deployment - liveness plus model readiness"""
     return {
         "status": "healthy",
+        "ready": model_registry.is_ready(tier=1),
         "service": "anomaly-detection-backend",
         "timestamp": datetime.now().isoformat(),
         "version": "1.0.0"
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process and event loop respond - never waits on models"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: Tier 1 models loaded and warmed (503 until then); Tier 2 warmup is reported, not awaited"""
+    ready = model_registry.is_ready(tier=1)
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"ready": ready, "models": model_registry.get_status(tier=1),
+                                 "tier2": {"ready": model_registry.is_ready(tier=2),
+                                           "models": model_registry.get_status(tier=2)}})
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -224,7 +246,9 @@ async def test_mongodb_connection():
 # FastAPI Events
 @app.on_event("startup")
 async def startup_event():
-    """Initialize MongoDB connection on startup"""
+    """Initialize MongoDB connection and start model warmup on startup"""
+    # Models load + run a dummy inference in the background; /health/ready reports when done
+    model_registry.warmup()
     await connect_to_mongodb()
 
 @app.on_event("shutdown")
@@ -237,6 +261,11 @@ async def shutdown_event():
     await asyncio.sleep(0.5)  # Give sessions time to stop
     session_manager.cleanup_all_sessions()
     
+    # Stop offline segment worker processes and the inference executors
+    shutdown_segment_pool()
+    inference_gateway.shutdown()
+    tier2_jobs.shutdown()
+    
     # Close MongoDB connection
     await close_mongodb_connection()
     
@@ -405,6 +434,92 @@ async def save_anomaly_to_db(anomaly_event, username="demo_user"):
         print(f"❌ Error saving anomaly to MongoDB: {e}")
         return None
 
+async def update_anomaly_tier2_in_db(anomaly_id, tier2_result):
+    """Attach a finished Tier 2 analysis to its stored anomaly event"""
+    if database is None or anomaly_id is None:
+        return
+    
+    try:
+        await database[ANOMALIES_COLLECTION].update_one({"_id": anomaly_id}, {"$set": {"tier2_analysis": tier2_result}})
+        print(f"📊 Tier 2 analysis stored for anomaly {anomaly_id}")
+    except Exception as e:
+        print(f"❌ Error storing Tier 2 analysis in MongoDB: {e}")
+
+async def deliver_tier2_result(job, websocket, anomaly_event, fusion_status, anomaly_id=None):
+    """Push a finished Tier 2 job to the frontend (and MongoDB) - runs on the event loop"""
+    frame_id = anomaly_event["frame_id"]
+    timestamp = anomaly_event["timestamp"]
+    
+    if job.status == "done":
+        tier2_result = job.result
+        session_manager.increment_stat("tier2_analyses_completed")
+        anomaly_event["tier2_analysis"] = tier2_result
+        
+        print(f"✅ TIER 2 ANALYSIS COMPLETE FOR FRAME {frame_id} ({time.time() - job.submitted_at:.1f}s)")
+        print(f"📋 Summary: {tier2_result.get('reasoning_summary', 'Analysis complete')}")
+        print(f"🎯 Threat Level: {tier2_result.get('threat_severity_index', 0.5):.2f}")
+        
+        message = {
+            "type": "tier2_analysis",
+            "frame_id": frame_id,
+            "timestamp": timestamp,
+            "fusion_status": fusion_status,
+            **tier2_result
+        }
+        await update_anomaly_tier2_in_db(anomaly_id, tier2_result)
+    else:
+        session_manager.increment_stat("tier2_analyses_failed")
+        reason = job.error or f"job {job.status}"
+        print(f"❌ TIER 2 ANALYSIS FAILED: {reason}")
+        
+        message = {
+            "type": "tier2_analysis",
+            "frame_id": frame_id,
+            "timestamp": timestamp,
+            "fusion_status": fusion_status,
+            "error": reason,
+            "status": "Error",
+            "reasoning_summary": f"Tier 2 analysis failed: {reason}"
+        }
+    
+    try:
+        if websocket.client_state.name == "CONNECTED":
+            await websocket.send_json(message)
+            print(f"📤 Tier 2 results sent to frontend for frame {frame_id}")
+    except Exception as send_error:
+        print(f"❌ Tier 2 WebSocket error: {send_error}")
+
+def submit_tier2_analysis(session_id, websocket, frame, audio_chunk_path, tier1_result, anomaly_event, fusion_status, anomaly_id=None):
+    """Queue Tier 2 for an anomaly -> job, or None if that anomaly is already being analysed"""
+    loop = asyncio.get_running_loop()
+    
+    def on_done(job):
+        # Called on a Tier 2 worker thread - hop back onto the event loop to talk to the websocket
+        asyncio.run_coroutine_threadsafe(
+            deliver_tier2_result(job, websocket, anomaly_event, fusion_status, anomaly_id), loop)
+    
+    # One job per anomaly event: its MongoDB id, else its first frame id + timestamp (upload/CCTV
+    # events are not stored and their frame id may be "unknown"); "<session>:" prefixes every key
+    event_key = anomaly_id or f"{anomaly_event['frame_id']}@{anomaly_event['timestamp']}"
+    incident_key = f"{session_id}:{event_key}"
+    job = tier2_jobs.submit(incident_key, frame.copy(), audio_chunk_path, tier1_result.copy(), on_done)
+    if job is None:
+        print(f"🔁 Tier 2 already pending for {incident_key} - not queued again")
+    return job
+
+def rate_settings_from_query(query_params):
+    """Optional per-session ?target_fps=&latency_slo= overrides for the adaptive rate controller"""
+    settings = {}
+    for key in ("target_fps", "latency_slo"):
+        try:
+            value = float(query_params[key]) if key in query_params else None
+        except ValueError:
+            print(f"⚠️ Ignoring invalid {key}: {query_params[key]}")
+            continue
+        if value is not None and value > 0:
+            settings[key] = value
+    return settings
+
 async def save_session_metadata(session_data):
     """Save session metadata to MongoDB"""
     if database is None:
@@ -884,7 +999,11 @@ async def get_system_stats():
         "total_stored_anomalies": await database[ANOMALIES_COLLECTION].count_documents({}) if database is not None else 0,
         "total_sessions": await database[SESSIONS_COLLECTION].count_documents({}) if database is not None else 0,
         "active_sessions": stats['active_sessions'],
-        "active_cameras": stats['active_cameras']
+        "active_cameras": stats['active_cameras'],
+        "transcription": get_transcription_metrics(),
+        "tier2_jobs": tier2_jobs.get_metrics(),
+        "clip_batching": get_clip_batching_metrics(),
+        "model_runtime": get_runtime_stats()
     }
 
 @app.websocket("/stream_video")
@@ -894,6 +1013,8 @@ async def stream_video(websocket: WebSocket):
     # Get username from query parameters
     query_params = websocket.query_params
     current_username = query_params.get("username", "dashboard_user")
+    # Display frames as binary JPEG messages for clients that ask for it, base64 JSON otherwise
+    frame_protocol = negotiate_protocol(query_params)
     
     # Check if this is dashboard mode (simplified)
     is_dashboard = dashboard_mode.is_dashboard_user(current_username)
@@ -901,7 +1022,7 @@ async def stream_video(websocket: WebSocket):
     if is_dashboard:
         print(f"🎛️ DASHBOARD MODE activated for user: {current_username}")
         # Create session with SessionManager first (moved up to fix UnboundLocalError)
-        session_id = session_manager.create_session(current_username, "live_stream")
+        session_id = session_manager.create_session(current_username, "live_stream", **rate_settings_from_query(query_params))
         session = session_manager.get_session(session_id)
         
         if not session:
@@ -920,7 +1041,7 @@ async def stream_video(websocket: WebSocket):
     else:
         print(f"👤 USER MODE activated for user: {current_username}")
         # Create session for non-dashboard users
-        session_id = session_manager.create_session(current_username, "live_stream")
+        session_id = session_manager.create_session(current_username, "live_stream", **rate_settings_from_query(query_params))
         session = session_manager.get_session(session_id)
         
         if not session:
@@ -951,7 +1072,7 @@ async def stream_video(websocket: WebSocket):
                     # Release any existing capture first
                     if video_cap:
                         video_cap.release()
-                        time.sleep(0.5)
+                        await asyncio.sleep(0.5)
                     
                     # Try different capture backends
                     if attempt == 0:
@@ -1064,13 +1185,20 @@ async def stream_video(websocket: WebSocket):
     
     print(f"🚀 ALL WORKERS STARTED via SessionManager for session {session_id}")
     
+    # This session's own pipeline - other sessions never read these results
+    pipeline = session_manager.get_pipeline(session_id)
+    # Fused results arrive through an asyncio queue so waiting never blocks the event loop
+    fused_results = inference_gateway.bridge(pipeline.fusion_results_queue)
+    # Pose tracker + smoothing history owned by this stream only
+    tier1_state = Tier1SessionState()
+    
     try:
         last_stats_time = time.time()
         
         while True:
             try:
-                # Get fused result from SessionManager fusion queue
-                fused_result = session_manager.fusion_results_queue.get(timeout=0.5)
+                # Get fused result from this session's fusion queue
+                fused_result = await fused_results.get(timeout=0.5)
             except queue.Empty:
                 # Print stats if no results for a while
                 if time.time() - last_stats_time > 5.0:
@@ -1082,12 +1210,20 @@ async def stream_video(websocket: WebSocket):
             frame = fused_result["frame"]
             frame_id = fused_result["frame_id"]
             audio_chunk_path = fused_result["audio_chunk_path"]
+            audio_transcripts = fused_result.get("audio_transcripts")  # Transcribed once by the audio worker
             fusion_status = fused_result["fusion_status"]
             timestamp = fused_result["timestamp"]
             
             # Run Tier 1 anomaly detection
             try:
-                tier1_result = run_tier1_continuous(frame, audio_chunk_path)
+                tier1_started = time.time()
+                tier1_result = await inference_gateway.run_tier1(
+                    run_tier1_continuous, frame, audio_chunk_path, audio_transcripts=audio_transcripts,
+                    session_state=tier1_state, frame_timestamp=timestamp,
+                    motion_static=fused_result.get("motion_static", False)
+                )
+                # Latency + queue depth steer this session's capture stride
+                pipeline.record_tier1_latency(time.time() - tier1_started)
                 
                 # �️ SAFETY CHECK: Ensure tier1_result is valid
                 if tier1_result is None:
@@ -1147,7 +1283,7 @@ async def stream_video(websocket: WebSocket):
                         
                         # Save Tier 1 anomaly snapshot and metadata
                         anomaly_frame_filename = f"anomaly_frames/tier1_anomaly_{int(timestamp)}_{frame_id}.jpg"
-                        cv2.imwrite(anomaly_frame_filename, frame)
+                        await inference_gateway.run_io(cv2.imwrite, anomaly_frame_filename, frame)
                         
                         # Store NEW anomaly event with Tier 1 data
                         anomaly_event = {
@@ -1175,78 +1311,31 @@ async def stream_video(websocket: WebSocket):
                             add_user_anomaly(current_username, 'live', anomaly_event)
                         current_anomaly_event = anomaly_event  # Track current incident
                         
-                        # Save to MongoDB (async)
-                        await save_anomaly_to_db(anomaly_event.copy(), current_username)
+                        # Save to MongoDB (async) - Tier 2 attaches its analysis to this document later
+                        anomaly_id = await save_anomaly_to_db(anomaly_event.copy(), current_username)
                         
-                        # TRIGGER TIER 2 ANALYSIS (synchronous but optimized)
+                        # TRIGGER TIER 2 ANALYSIS (queued - the live stream keeps flowing)
                         session_manager.increment_stat("tier2_analyses_triggered")
                         print(f"🔬 TRIGGERING TIER 2 ANALYSIS #{session_manager.get_stats()['tier2_analyses_triggered']}...")
-                        print(f"🔬 Tier 2 Analysis Starting for Frame {frame_id} at {timestamp}")
+                        print(f"🔬 Tier 2 Analysis Queued for Frame {frame_id} at {timestamp}")
                         
-                        # Send immediate Tier 2 start notification to frontend
-                        tier2_start_notification = {
-                            "type": "tier2_start",
-                            "frame_id": frame_id,
-                            "timestamp": timestamp,
-                            "message": "Starting advanced AI analysis...",
-                            "status": "analyzing"
-                        }
-                        
-                        try:
-                            if websocket.client_state.name == "CONNECTED":
-                                await websocket.send_json(tier2_start_notification)
-                                print(f"📤 Tier 2 START notification sent to frontend")
-                        except Exception as send_error:
-                            print(f"❌ Tier 2 START notification error: {send_error}")
-                        
-                        try:
-                            tier2_result = run_tier2_continuous(frame.copy(), audio_chunk_path, tier1_result.copy())
-                            session_manager.increment_stat("tier2_analyses_completed")
-                            
-                            # Update anomaly event with Tier 2 analysis
-                            anomaly_event["tier2_analysis"] = tier2_result
-                            tier1_result["tier2_analysis"] = tier2_result
-                            
-                            print(f"✅ TIER 2 ANALYSIS COMPLETE FOR FRAME {frame_id}")
-                            print(f"📋 Summary: {tier2_result.get('reasoning_summary', 'Analysis complete')}")
-                            print(f"🎯 Threat Level: {tier2_result.get('threat_severity_index', 0.5):.2f}")
-                            print(f"🔍 Tier 2 Full Result: {json.dumps(tier2_result, indent=2)}")
-                            
-                            # Send separate Tier 2 WebSocket message
-                            tier2_websocket_result = {
-                                "type": "tier2_analysis",
+                        if submit_tier2_analysis(session_id, websocket, frame, audio_chunk_path, tier1_result,
+                                                 anomaly_event, fusion_status, anomaly_id):
+                            # Send immediate Tier 2 start notification to frontend
+                            tier2_start_notification = {
+                                "type": "tier2_start",
                                 "frame_id": frame_id,
                                 "timestamp": timestamp,
-                                "fusion_status": fusion_status,
-                                **tier2_result
+                                "message": "Starting advanced AI analysis...",
+                                "status": "analyzing"
                             }
                             
                             try:
                                 if websocket.client_state.name == "CONNECTED":
-                                    await websocket.send_json(tier2_websocket_result)
-                                    print(f"📤 Tier 2 results sent to frontend for frame {frame_id}")
+                                    await websocket.send_json(tier2_start_notification)
+                                    print(f"📤 Tier 2 START notification sent to frontend")
                             except Exception as send_error:
-                                print(f"❌ Tier 2 WebSocket error: {send_error}")
-                                
-                        except Exception as tier2_error:
-                            session_manager.increment_stat("tier2_analyses_failed")
-                            print(f"❌ TIER 2 ANALYSIS FAILED: {tier2_error}")
-                            
-                            # Send error tier2 result
-                            tier2_error_result = {
-                                "type": "tier2_analysis",
-                                "frame_id": frame_id,
-                                "timestamp": timestamp,
-                                "fusion_status": fusion_status,
-                                "error": str(tier2_error),
-                                "status": "Error",
-                                "reasoning_summary": f"Tier 2 analysis failed: {str(tier2_error)}"
-                            }
-                            try:
-                                if websocket.client_state.name == "CONNECTED":
-                                    await websocket.send_json(tier2_error_result)
-                            except:
-                                pass
+                                print(f"❌ Tier 2 START notification error: {send_error}")
                 else:
                     # No anomaly detected - reset cooldown tracking
                     current_anomaly_event = None
@@ -1260,13 +1349,10 @@ async def stream_video(websocket: WebSocket):
                 })
                 
                 # Encode frame for live video display
+                display_jpeg = None
                 try:
-                    # Resize frame for efficient transmission (optional)
-                    display_frame = cv2.resize(frame, (640, 480))
-                    ret, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                    if ret:
-                        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                        tier1_result["frame_data"] = frame_base64
+                    # Resized for efficient transmission; sent per the negotiated frame protocol
+                    display_jpeg = encode_display_frame(frame)
                 except Exception as frame_encode_error:
                     print(f"Frame encoding error: {frame_encode_error}")
                 
@@ -1278,9 +1364,9 @@ async def stream_video(websocket: WebSocket):
                         print(f"📨 Status: {tier1_result.get('status')}")
                         print(f"📨 Details: {tier1_result.get('details')}")
                         print(f"📨 Frame ID: {tier1_result.get('frame_id')}")
-                        print(f"📨 Message size: {len(str(tier1_result))} chars")
+                        print(f"📨 Message size: {len(str(tier1_result))} chars + {len(display_jpeg or b'')} byte frame ({frame_protocol})")
                         
-                        await websocket.send_json(tier1_result)
+                        await send_frame_message(websocket, tier1_result, display_jpeg, frame_protocol)
                         print(f"✅ WEBSOCKET MESSAGE SENT SUCCESSFULLY!")
                         
                         # Log ALL messages, not just anomalies
@@ -1315,6 +1401,7 @@ async def stream_video(websocket: WebSocket):
     finally:
         # Cleanup session using SessionManager
         print(f"🧹 Cleaning up session: {session_id}")
+        fused_results.close()
         
         # Stop dashboard monitoring session if dashboard mode
         if is_dashboard:
@@ -1332,11 +1419,18 @@ async def stream_video(websocket: WebSocket):
 # ========== CONSOLIDATED WORKER FUNCTIONS - SESSION MANAGER ONLY ==========
 # These replace all old global-variable-based worker functions
 
-def video_capture_worker_session(video_cap, video_writer, fps, session_stop_event):
-    """CONSOLIDATED Session-aware video worker - uses SessionManager only"""
+def video_capture_worker_session(video_cap, video_writer, fps, pipeline, session_stop_event):
+    """CONSOLIDATED Session-aware video worker - feeds the session's own pipeline"""
     frame_count = 0
     processed_count = 0
     start_time = time.time()
+    # Static frames are flagged so Tier 1 can skip CLIP and pose and reuse its last result
+    motion_gate = MotionGate()
+    # Pace reads at the source frame rate (live cameras already block in read())
+    source_fps = fps if fps and fps > 0 else 30.0
+    frame_period = 1.0 / source_fps
+    next_frame_time = time.time()
+    frames_since_sample = 0
     
     print("🎬 Session video worker started (CONSOLIDATED)")
     
@@ -1346,8 +1440,8 @@ def video_capture_worker_session(video_cap, video_writer, fps, session_stop_even
             print("❌ Video capture failed")
             break
             
-        # Use SessionManager for stats
-        session_manager.increment_stat("frames_captured")
+        # Per-session stats (forwarded to the SessionManager totals)
+        pipeline.increment_stat("frames_captured")
         frame_count += 1
         
         # Record every frame to video
@@ -1357,40 +1451,54 @@ def video_capture_worker_session(video_cap, video_writer, fps, session_stop_even
         except Exception as e:
             pass  # Silent video writing errors
         
-        # Process every 5th frame (~6 FPS)
-        if frame_count % 5 == 0:
+        # Analyse every Nth frame - N follows the session's Tier 1 latency and queue depth
+        frames_since_sample += 1
+        if frames_since_sample >= pipeline.rate.stride(source_fps):
+            frames_since_sample = 0
             current_timestamp = time.time()
+            pipeline.rate.observe_queue(pipeline.queue_fill())
             
             try:
+                motion_static = motion_gate.is_static(frame, current_timestamp)
+                if motion_static:
+                    pipeline.increment_stat("frames_static")
+                
                 # Create video data packet
                 video_data = {
                     "frame_id": frame_count,
                     "timestamp": current_timestamp,
                     "frame": frame.copy(),  # Thread-safe copy
-                    "session_time": current_timestamp - start_time
+                    "session_time": current_timestamp - start_time,
+                    "motion_static": motion_static
                 }
                 
-                # Add to SessionManager video queue (non-blocking)
-                if not session_manager.video_queue.full():
-                    session_manager.video_queue.put(video_data)
-                    session_manager.increment_stat("frames_processed")
+                # Add to the session video queue - drops or waits per the session's back-pressure policy
+                if pipeline.put_video(video_data, session_stop_event):
+                    pipeline.increment_stat("frames_processed")
                     processed_count += 1
                     
                     if processed_count % 50 == 0:
                         print(f"🎬 Processed {processed_count} frames")
-                else:
-                    pass  # Drop frame if queue full
                     
             except Exception as e:
                 print(f"Video processing error: {e}")
                 
-        time.sleep(1/30.0)  # Maintain ~30 FPS
+        next_frame_time = max(next_frame_time + frame_period, time.time() - frame_period)
+        delay = next_frame_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
     
     print("🎬 CONSOLIDATED Session video worker stopped")
 
-def audio_capture_worker_session(audio_queue, audio_stream, session_stop_event):
-    """CONSOLIDATED Session-aware audio worker - uses SessionManager only"""
-    from utils.audio_processing import chunk_and_transcribe_tiny
+def audio_capture_worker_session(pipeline, audio_stream, session_stop_event):
+    """CONSOLIDATED Session-aware audio worker - feeds the session's own pipeline
+
+    Audio is transcribed with a sliding window (StreamingTranscriber): each new hop of audio is
+    transcribed once with overlap, silent hops are skipped, and timestamped segments are forwarded.
+    Windows run on the shared Whisper pool, so this loop keeps draining capture while Whisper works;
+    capture overflow and dropped windows are counted in the session stats.
+    """
+    from utils.audio_processing import StreamingTranscriber, transcription_pool
     
     chunk_count = 0
     transcribed_count = 0
@@ -1403,58 +1511,75 @@ def audio_capture_worker_session(audio_queue, audio_stream, session_stop_event):
         print("⚠️ Audio stream is None, audio worker will exit")
         return
     
+    transcriber = StreamingTranscriber(pool=transcription_pool)
+    reported_loss = {"audio_overflow_chunks": 0, "audio_windows_dropped": 0}
+    
     while not session_stop_event.is_set():
         try:
-            # Get audio chunk (blocks until available)
-            audio_chunk_path = audio_stream.get_chunk()
+            # Audio lost before transcription: unread capture chunks evicted, windows dropped by the pool
+            loss = {"audio_overflow_chunks": getattr(audio_stream, "overflow_chunks", 0),
+                    "audio_windows_dropped": transcriber.stats["dropped_windows"]}
+            for stat_name, total in loss.items():
+                if total > reported_loss[stat_name]:
+                    pipeline.increment_stat(stat_name, total - reported_loss[stat_name])
+                    print(f"⚠️ Live audio lost: {stat_name}={total}")
+                    reported_loss[stat_name] = total
+            
+            # Get audio captured since the last read as in-memory 16 kHz float32 samples
+            new_samples = audio_stream.get_new_samples()
             
-            if audio_chunk_path:
+            if new_samples is not None:
                 try:
-                    # Use SessionManager for stats
-                    session_manager.increment_stat("audio_chunks_captured")
+                    pipeline.increment_stat("audio_chunks_captured")
                 except:
                     continue
                     
                 chunk_count += 1
-                current_timestamp = time.time()
                 
-                # Transcribe audio
-                transcripts = chunk_and_transcribe_tiny(audio_chunk_path)
+                # Queue completed windows for transcription - the ONLY Whisper pass for this audio;
+                # downstream stages consume the transcripts carried in the fused result
+                segments = transcriber.feed(new_samples)
+            else:
+                segments = transcriber.poll()  # Windows that finished since the last read
+            
+            for segment in segments:
+                audio_text = segment["text"]
+                pipeline.increment_stat("audio_transcribed")
+                transcribed_count += 1
                 
-                if transcripts:
-                    audio_text = " | ".join(transcripts)
-                    session_manager.increment_stat("audio_transcribed")
-                    transcribed_count += 1
-                    
-                    # Create audio data packet
-                    audio_data = {
-                        "timestamp": current_timestamp,
-                        "audio_text": audio_text,
-                        "transcripts": transcripts,
-                        "chunk_path": audio_chunk_path
-                    }
-                    
-                    # Add to SessionManager audio queue (non-blocking)
-                    if not session_manager.audio_queue.full():
-                        session_manager.audio_queue.put(audio_data)
-                        
-                        if transcribed_count % 20 == 0:
-                            print(f"🎤 Transcribed {transcribed_count} audio chunks")
-                    else:
-                        # Only log queue full occasionally
-                        if chunk_count % 100 == 0:
-                            print("⚠️ Audio queue full, dropping transcripts")
+                # Create audio data packet
+                audio_data = {
+                    "timestamp": segment["timestamp"],
+                    "audio_text": audio_text,
+                    "transcripts": [audio_text],
+                    "segment_start": segment["start"],
+                    "segment_end": segment["end"],
+                    "chunk_path": None  # Audio stays in memory - nothing on disk to hand over
+                }
                 
-            else:
+                # Add to the session audio queue (never blocks the capture thread)
+                if pipeline.put_audio(audio_data):
+                    
+                    if transcribed_count % 20 == 0:
+                        print(f"🎤 Transcribed {transcribed_count} audio segments "
+                              f"({transcriber.stats['silent_windows']}/{transcriber.stats['windows']} windows skipped as silent)")
+                else:
+                    # Only log queue full occasionally
+                    if chunk_count % 100 == 0:
+                        print("⚠️ Audio queue full, dropping transcripts")
+            
+            if new_samples is None:
                 time.sleep(0.05)  # Brief pause if no audio available
                 
         except Exception as e:
             print(f"❌ Session audio worker error: {e}")
+            time.sleep(0.05)
     
+    transcriber.close()
     print("🎤 CONSOLIDATED Session audio worker stopped")
 
-def fusion_worker_session(session_stop_event, video_queue_param=None, audio_queue_param=None, fusion_results_queue_param=None):
-    """CONSOLIDATED Session-aware fusion worker - uses SessionManager only"""
+def fusion_worker_session(pipeline, session_stop_event):
+    """CONSOLIDATED Session-aware fusion worker - one per session, reads only its own queues"""
     
     print("🔀 Session fusion worker started (CONSOLIDATED)")
     
@@ -1464,18 +1589,18 @@ def fusion_worker_session(session_stop_event, video_queue_param=None, audio_queu
     
     while not session_stop_event.is_set():
         try:
-            # Get video frame from SessionManager (blocking with timeout)
+            # Get video frame from the session pipeline (blocking with timeout)
             try:
-                video_data = session_manager.video_queue.get(timeout=0.5)
+                video_data = pipeline.video_queue.get(timeout=0.5)
             except queue.Empty:
                 continue
             
             video_timestamp = video_data["timestamp"]
             
-            # Update recent audio buffer from SessionManager
-            while not session_manager.audio_queue.empty():
+            # Update recent audio buffer from the session pipeline
+            while not pipeline.audio_queue.empty():
                 try:
-                    audio_data = session_manager.audio_queue.get_nowait()
+                    audio_data = pipeline.audio_queue.get_nowait()
                     recent_audio.append(audio_data)
                 except queue.Empty:
                     break
@@ -1497,31 +1622,33 @@ def fusion_worker_session(session_stop_event, video_queue_param=None, audio_queu
                     "timestamp": video_timestamp,
                     "frame": video_data["frame"],
                     "audio_text": best_audio["audio_text"],
+                    "audio_transcripts": best_audio["transcripts"],
                     "audio_chunk_path": best_audio["chunk_path"],
+                    "motion_static": video_data.get("motion_static", False),
                     "fusion_status": "video+audio",
                     "time_sync_diff": min_time_diff
                 }
-                session_manager.increment_stat("fusion_video_audio")
+                pipeline.increment_stat("fusion_video_audio")
             else:
                 fused_result = {
                     "frame_id": video_data["frame_id"],
                     "timestamp": video_timestamp,
                     "frame": video_data["frame"],
                     "audio_text": None,
+                    "audio_transcripts": None,
                     "audio_chunk_path": None,
+                    "motion_static": video_data.get("motion_static", False),
                     "fusion_status": "video-only",
                     "time_sync_diff": None
                 }
-                session_manager.increment_stat("fusion_video_only")
+                pipeline.increment_stat("fusion_video_only")
             
-            # Add to SessionManager fusion results queue
-            if not session_manager.fusion_results_queue.full():
-                session_manager.fusion_results_queue.put(fused_result)
+            # Add to the session fusion results queue (drop or wait per back-pressure policy)
+            if pipeline.put_fusion_result(fused_result, session_stop_event):
                 fusion_count += 1
                 
                 if fusion_count % 30 == 0:
                     print(f"🔀 Processed {fusion_count} fusion results")
-            # Silently drop if queue is full
                 
         except Exception as e:
             print(f"❌ Session fusion worker error: {e}")
@@ -1775,10 +1902,13 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
     query_params = websocket.query_params
     if "username" in query_params:
         current_username = query_params["username"]
+    # Display frames as binary JPEG messages for clients that ask for it, base64 JSON otherwise
+    frame_protocol = negotiate_protocol(query_params)
     
     # CRITICAL FIX: Register WebSocket with session manager for uploaded video processing
     session_manager.register_websocket(current_username, websocket)
     print(f"📡 WebSocket registered for user: {current_username} (uploaded video)")
+    fused_results = None  # Async bridge over the session's fusion queue (created once workers start)
     
     file_path = os.path.join(VIDEO_UPLOAD_DIR, filename)
     if not os.path.exists(file_path):
@@ -1807,7 +1937,7 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
         await websocket.send_json({"status": "Processing started", "filename": filename})
         
         # CONSOLIDATED: Use SessionManager's start_session_workers for uploaded video
-        upload_session_id = session_manager.create_session(current_username, "uploaded_video")
+        upload_session_id = session_manager.create_session(current_username, "uploaded_video", **rate_settings_from_query(query_params))
         print(f"✅ Created session: {upload_session_id}")
         
         # SessionManager handles ALL worker creation and management
@@ -1834,22 +1964,59 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
         
         print(f"🚀 Upload workers started via SessionManager for session {upload_session_id}")
         
+        # Uploaded files use a blocking pipeline: frames wait for space instead of being dropped
+        upload_pipeline = session_manager.get_pipeline(upload_session_id)
+        fused_results = inference_gateway.bridge(upload_pipeline.fusion_results_queue)
+        tier1_state = Tier1SessionState()
+        
         # Process fusion results (same logic as live stream)
         last_stats_time = time.time()
         
+        # Fused results whose scene score was computed in the last CLIP batch
+        pending_results = deque()
+        
         while True:
-            try:
-                # Get fused result from SessionManager fusion queue - CONSOLIDATED
-                fused_result = session_manager.fusion_results_queue.get(timeout=0.2)  # Reduced from 0.5 to 0.2
-            except queue.Empty:
-                # Check if video processing is complete via SessionManager
-                session = session_manager.get_session(upload_session_id)
-                if session and not any(t.is_alive() for t in session['threads']):
-                    print("📹 Video processing completed")
-                    user_anomalies = get_user_anomalies(current_username, 'upload')
-                    await websocket.send_json({"status": "Processing completed", "total_anomalies": len(user_anomalies)})
-                    break
-                continue
+            if not pending_results:
+                try:
+                    # Get fused result from SessionManager fusion queue - CONSOLIDATED
+                    fused_batch = [await fused_results.get(timeout=0.2)]  # Reduced from 0.5 to 0.2
+                except queue.Empty:
+                    # Check if video processing is complete via SessionManager
+                    session = session_manager.get_session(upload_session_id)
+                    if (session and not any(t.is_alive() for t in session['threads'])
+                            and upload_pipeline.fusion_results_queue.empty()):
+                        print("📹 Video processing completed")
+                        # Let queued Tier 2 jobs for this video report back before closing the socket
+                        wait_start = time.time()
+                        while tier2_jobs.has_active(f"{upload_session_id}:") and time.time() - wait_start < TIER2_DEADLINE_SECONDS:
+                            await asyncio.sleep(0.5)
+                        user_anomalies = get_user_anomalies(current_username, 'upload')
+                        await websocket.send_json({"status": "Processing completed", "total_anomalies": len(user_anomalies)})
+                        break
+                    continue
+                
+                # Drain whatever is already queued (up to SCENE_BATCH_SIZE) and score the scenes in one CLIP pass
+                while len(fused_batch) < SCENE_BATCH_SIZE:
+                    try:
+                        fused_batch.append(fused_results.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                batch_frames = [r.get("frame") for r in fused_batch]
+                scene_scores = [None] * len(fused_batch)
+                # Motion-gated static frames normally reuse the last Tier 1 result - don't spend CLIP on them
+                scorable = [i for i, f in enumerate(batch_frames) if f is not None and len(f.shape) == 3 and f.shape[2] == 3
+                            and not fused_batch[i].get("motion_static")]
+                # Before CLIP is warmed the Tier 1 scene branch reports "not ready" instead of blocking the batch
+                if scorable and scene_models_ready():
+                    batch_scores = await inference_gateway.run_tier1(
+                        process_scene_frames, [batch_frames[i] for i in scorable]
+                    )
+                    for i, score in zip(scorable, batch_scores):
+                        scene_scores[i] = score
+                pending_results.extend(zip(fused_batch, scene_scores))
+            
+            fused_result, scene_score = pending_results.popleft()
             
             # Process the fused result (same logic as live stream)
             frame_id = fused_result.get("frame_id", "unknown")
@@ -1858,9 +2025,16 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
             frame = fused_result.get("frame")
             frame = fused_result.get("frame")
             audio_chunk_path = fused_result.get("audio_chunk_path")
+            audio_transcripts = fused_result.get("audio_transcripts")  # Transcribed once by the audio worker
             
-            # Get detection results
-            tier1_result = run_tier1_continuous(frame, audio_chunk_path)
+            # Get detection results (scene already scored in the batch above)
+            tier1_started = time.time()
+            tier1_result = await inference_gateway.run_tier1(
+                run_tier1_continuous, frame, audio_chunk_path, scene_score=scene_score,
+                audio_transcripts=audio_transcripts, session_state=tier1_state, frame_timestamp=timestamp,
+                motion_static=fused_result.get("motion_static", False)
+            )
+            upload_pipeline.record_tier1_latency(time.time() - tier1_started)
             
             # SAFETY CHECK: Handle None result from tier1 (uploaded video)
             if tier1_result is None:
@@ -1933,7 +2107,7 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
                     
                     # Save Tier 1 anomaly snapshot
                     anomaly_frame_filename = f"anomaly_frames/uploaded_anomaly_{int(timestamp)}_{frame_id}.jpg"
-                    cv2.imwrite(anomaly_frame_filename, frame)
+                    await inference_gateway.run_io(cv2.imwrite, anomaly_frame_filename, frame)
                     
                     # Store NEW anomaly event
                     anomaly_event = {
@@ -1959,36 +2133,9 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
                     tier2_stats = session_manager.get_stats()
                     print(f"🔬 TRIGGERING TIER 2 ANALYSIS #{tier2_stats['tier2_analyses_triggered']}...")
                     
-                    try:
-                        tier2_result = run_tier2_continuous(frame.copy(), audio_chunk_path, tier1_result.copy())
-                        session_manager.increment_stat("tier2_analyses_completed")
-                        
-                        # Update anomaly event with Tier 2 analysis
-                        anomaly_event["tier2_analysis"] = tier2_result
-                        tier1_result["tier2_analysis"] = tier2_result
-                        
-                        print(f"✅ TIER 2 ANALYSIS COMPLETE")
-                        print(f"📋 Summary: {tier2_result.get('reasoning_summary', 'Analysis complete')}")
-                        
-                        # Send separate Tier 2 WebSocket message
-                        tier2_websocket_result = {
-                            "type": "tier2_analysis",
-                            "frame_id": frame_id,
-                            "timestamp": timestamp,
-                            "fusion_status": fusion_status,
-                            **tier2_result
-                        }
-                        
-                        try:
-                            if websocket.client_state.name == "CONNECTED":
-                                await websocket.send_json(tier2_websocket_result)
-                                print(f"📤 Tier 2 results sent to frontend")
-                        except Exception as send_error:
-                            print(f"❌ Tier 2 WebSocket error: {send_error}")
-                            
-                    except Exception as tier2_error:
-                        session_manager.increment_stat("tier2_analyses_failed")
-                        print(f"❌ TIER 2 ANALYSIS FAILED: {tier2_error}")
+                    # Queued - results are pushed to the websocket when the job finishes
+                    submit_tier2_analysis(upload_session_id, websocket, frame, audio_chunk_path, tier1_result,
+                                          anomaly_event, fusion_status)
             else:
                 # No anomaly detected - reset cooldown tracking
                 current_anomaly_event = None
@@ -2002,12 +2149,11 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
             })
             
             # Add frame data for frontend display (same as live stream)
+            display_jpeg = None
             if frame is not None:
                 try:
-                    # Encode frame as base64 for WebSocket transmission
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                    tier1_result["frame_data"] = frame_base64
+                    # Full-size JPEG, sent per the negotiated frame protocol
+                    display_jpeg = encode_display_frame(frame, size=None)
                 except Exception as encode_error:
                     print(f"Frame encoding error: {encode_error}")
             
@@ -2019,9 +2165,9 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
                     print(f"📨 Status: {tier1_result.get('status')}")
                     print(f"📨 Details: {tier1_result.get('details')}")
                     print(f"📨 Frame ID: {tier1_result.get('frame_id')}")
-                    print(f"📨 Message size: {len(str(tier1_result))} chars")
+                    print(f"📨 Message size: {len(str(tier1_result))} chars + {len(display_jpeg or b'')} byte frame ({frame_protocol})")
                     
-                    await websocket.send_json(tier1_result)
+                    await send_frame_message(websocket, tier1_result, display_jpeg, frame_protocol)
                     print(f"✅ UPLOADED VIDEO WEBSOCKET MESSAGE SENT!")
                     
                     # Log all messages
@@ -2052,6 +2198,8 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
     finally:
         # CONSOLIDATED CLEANUP - SessionManager handles everything
         print(f"🧹 CONSOLIDATED cleanup for upload session: {upload_session_id}")
+        if fused_results:
+            fused_results.close()
         session_manager.cleanup_session(upload_session_id)
         
         # CRITICAL FIX: Unregister WebSocket connection
@@ -2071,6 +2219,65 @@ async def process_uploaded_video(websocket: WebSocket, filename: str):
         # No audio_stream to stop for uploaded videos
         print(f"📹 Video processing session ended: {filename}")
 
+@app.websocket("/analyze_uploaded_video/{filename}")
+async def analyze_uploaded_video(websocket: WebSocket, filename: str):
+    """Offline (faster than real time) Tier 1 analysis of an uploaded file with progress updates"""
+    await websocket.accept()
+    
+    file_path = os.path.join(VIDEO_UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        error_msg = f"Video file not found: {file_path}"
+        print(f"❌ {error_msg}")
+        await websocket.send_json({"error": error_msg})
+        return
+    
+    loop = asyncio.get_running_loop()
+    progress_queue = asyncio.Queue()
+    # Set when the client goes away - the analysis (and its segment workers) stops at the next batch
+    cancel_event = threading.Event()
+    analysis = None
+    
+    def report_progress(progress):
+        # Called from the analysis thread - hand the update over to the event loop
+        if cancel_event.is_set():
+            raise OfflineAnalysisCancelled()
+        loop.call_soon_threadsafe(progress_queue.put_nowait, progress)
+    
+    try:
+        await websocket.send_json({"status": "Offline analysis started", "filename": filename})
+        # Long files are split into segments analysed by the offline worker process pool
+        analysis = loop.run_in_executor(
+            None, lambda: run_tier1_offline_parallel(file_path, report_progress, cancel_event=cancel_event))
+        
+        while not analysis.done():
+            try:
+                progress = await asyncio.wait_for(progress_queue.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            await websocket.send_json({"type": "offline_progress", "filename": filename, **progress})
+        
+        result = await analysis
+        await websocket.send_json({"type": "offline_result", "filename": filename, **result})
+        print(f"📼 Offline analysis sent for {filename}: {result['summary']['realtime_factor']}x real time")
+        
+    except WebSocketDisconnect:
+        print("WebSocket disconnected during offline analysis")
+    except Exception as e:
+        print(f"Offline analysis error: {e}")
+        try:
+            await websocket.send_json({"error": str(e)})
+        except:
+            pass
+    finally:
+        if analysis is not None and not analysis.done():
+            cancel_event.set()
+            try:
+                await analysis  # Returns within one batch once cancelled
+            except OfflineAnalysisCancelled:
+                print(f"🛑 Offline analysis of {filename} cancelled")
+            except Exception:
+                pass
+
 @app.websocket("/connect_cctv")
 async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username: str = None, password: str = None):
     """Connect to CCTV camera via RTSP and process through the same anomaly detection pipeline"""
@@ -2092,6 +2299,7 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
     # CRITICAL FIX: Register WebSocket with session manager for CCTV processing
     session_manager.register_websocket(current_username, websocket)
     print(f"📡 WebSocket registered for user: {current_username} (CCTV)")
+    fused_results = None  # Async bridge over the session's fusion queue (created once workers start)
     
     # Construct RTSP URL
     if username and password:
@@ -2127,7 +2335,7 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
         # Note: Most CCTV streams don't have audio, so primarily video-only processing
         
         # CONSOLIDATED: Use SessionManager's start_session_workers for CCTV
-        cctv_session_id = session_manager.create_session(current_username, "cctv_stream")
+        cctv_session_id = session_manager.create_session(current_username, "cctv_stream", **rate_settings_from_query(query_params))
         
         # SessionManager handles ALL worker creation and management for CCTV
         workers_started = session_manager.start_session_workers(
@@ -2145,13 +2353,17 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
         
         print(f"🚀 CCTV workers started via SessionManager for session {cctv_session_id}")
         
+        cctv_pipeline = session_manager.get_pipeline(cctv_session_id)
+        fused_results = inference_gateway.bridge(cctv_pipeline.fusion_results_queue)
+        tier1_state = Tier1SessionState()
+        
         # Process fusion results via SessionManager - CONSOLIDATED
         last_stats_time = time.time()
         
         while True:
             try:
                 # Get fused result from SessionManager fusion queue
-                fused_result = session_manager.fusion_results_queue.get(timeout=0.5)
+                fused_result = await fused_results.get(timeout=0.5)
             except queue.Empty:
                 # Print stats if no results for a while
                 if time.time() - last_stats_time > 30.0:  # Every 30 seconds
@@ -2172,9 +2384,16 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
             fusion_status = fused_result.get("fusion_status", "video-only")  # Usually video-only for CCTV
             frame = fused_result.get("frame")
             audio_chunk_path = fused_result.get("audio_chunk_path")  # Usually None for CCTV
+            audio_transcripts = fused_result.get("audio_transcripts")  # Transcribed once by the audio worker
             
             # Get detection results
-            tier1_result = run_tier1_continuous(frame, audio_chunk_path)
+            tier1_started = time.time()
+            tier1_result = await inference_gateway.run_tier1(
+                run_tier1_continuous, frame, audio_chunk_path, audio_transcripts=audio_transcripts,
+                session_state=tier1_state, frame_timestamp=timestamp,
+                motion_static=fused_result.get("motion_static", False)
+            )
+            cctv_pipeline.record_tier1_latency(time.time() - tier1_started)
             
             # SAFETY CHECK: Handle None result from tier1 (CCTV)
             if tier1_result is None:
@@ -2214,7 +2433,7 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
                     
                     # Save CCTV anomaly snapshot
                     anomaly_frame_filename = f"anomaly_frames/cctv_anomaly_{int(timestamp)}_{frame_id}.jpg"
-                    cv2.imwrite(anomaly_frame_filename, frame)
+                    await inference_gateway.run_io(cv2.imwrite, anomaly_frame_filename, frame)
                     
                     # Store anomaly event
                     anomaly_event = {
@@ -2240,34 +2459,9 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
                     stats = session_manager.get_stats() 
                     print(f"🔬 TRIGGERING TIER 2 ANALYSIS #{stats['tier2_analyses_triggered']}...")
                     
-                    try:
-                        tier2_result = run_tier2_continuous(frame.copy(), audio_chunk_path, tier1_result.copy())
-                        session_manager.increment_stat("tier2_analyses_completed")
-                        
-                        anomaly_event["tier2_analysis"] = tier2_result
-                        tier1_result["tier2_analysis"] = tier2_result
-                        
-                        print(f"✅ TIER 2 ANALYSIS COMPLETE")
-                        print(f"📋 Summary: {tier2_result.get('reasoning_summary', 'Analysis complete')}")
-                        
-                        # Send Tier 2 WebSocket message
-                        tier2_websocket_result = {
-                            "type": "tier2_analysis",
-                            "frame_id": frame_id,
-                            "timestamp": timestamp,
-                            "fusion_status": fusion_status,
-                            **tier2_result
-                        }
-                        
-                        try:
-                            if websocket.client_state.name == "CONNECTED":
-                                await websocket.send_json(tier2_websocket_result)
-                        except Exception as send_error:
-                            print(f"❌ Tier 2 WebSocket error: {send_error}")
-                            
-                    except Exception as tier2_error:
-                        session_manager.increment_stat("tier2_analyses_failed")
-                        print(f"❌ TIER 2 ANALYSIS FAILED: {tier2_error}")
+                    # Queued - results are pushed to the websocket when the job finishes
+                    submit_tier2_analysis(cctv_session_id, websocket, frame, audio_chunk_path, tier1_result,
+                                          anomaly_event, fusion_status)
             else:
                 current_anomaly_event = None
             
@@ -2303,6 +2497,8 @@ async def connect_cctv(websocket: WebSocket, ip: str, port: int = 554, username:
     finally:
         # CONSOLIDATED CLEANUP - SessionManager handles everything
         print(f"🧹 CONSOLIDATED cleanup for CCTV session: {cctv_session_id}")
+        if fused_results:
+            fused_results.close()
         session_manager.cleanup_session(cctv_session_id)
         
         # CRITICAL FIX: Unregister WebSocket connection
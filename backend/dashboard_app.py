@@ -1,6 +1,6 @@
 """
 Dedicated Backend Dashboard A# Import only the functions we need
-from tier1.tier1_pipeline import run_tier1_continuous
+from tier1.tier1_pipeline import run_tier1_continuous, Tier1SessionState
 from tier2.tier2_pipeline import run_tier2_continuous
 from dashboard_mode import dashboard_modeication
 Separate from main app.py to avoid frontend conflicts
@@ -27,7 +27,17 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import audio processing functions
-from utils.audio_processing import chunk_and_transcribe_tiny
+from utils.audio_processing import chunk_and_transcribe_tiny, pcm16_to_float32
+from utils.inference_gateway import inference_gateway
+from tier2.tier2_jobs import tier2_jobs
+from utils.model_registry import model_registry
+from utils.motion_gate import MotionGate
+from utils.rate_control import AdaptiveRateController
+from utils.frame_protocol import (negotiate_protocol, unpack_frame, decode_jpeg, encode_display_frame,
+                                  send_frame_message, KIND_VIDEO_FRAME, PROTOCOL_BINARY)
+
+# Browser frames are forwarded at most this often; how many of them reach Tier 1 is adaptive
+DASHBOARD_DISPLAY_FPS = float(os.getenv("DASHBOARD_DISPLAY_FPS", "15"))
 
 def process_browser_audio(audio_b64):
     """Process base64 encoded audio data from browser"""
@@ -38,33 +48,19 @@ def process_browser_audio(audio_b64):
         # Decode base64 audio data
         audio_bytes = base64.b64decode(audio_b64)
         
-        # Create temporary WAV file from raw PCM data
-        # Browser sends 16-bit PCM at 16kHz mono (from setupAudioCapture)
-        temp_dir = os.path.join(os.path.dirname(__file__), 'temp_audio')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_path = os.path.join(temp_dir, f"browser_audio_{int(time.time() * 1000)}.wav")
+        # Browser sends 16-bit PCM at 16kHz mono (from setupAudioCapture) - Whisper's native
+        # rate, so the samples go straight to the model without a temp WAV or ffmpeg
+        audio = pcm16_to_float32(audio_bytes)
+        if audio.size == 0:
+            print("🎤 Browser audio chunk empty")
+            return ""
         
-        # Write WAV file with proper header
-        with wave.open(temp_path, 'wb') as wf:
-            wf.setnchannels(1)  # Mono
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(16000)  # 16kHz
-            wf.writeframes(audio_bytes)
+        # Transcribe using existing pipeline (in-memory)
+        transcripts = chunk_and_transcribe_tiny(audio)
+        transcript_text = " ".join(transcripts) if transcripts else ""
         
-        # Verify file was created and has content
-        if os.path.exists(temp_path) and os.path.getsize(temp_path) > 44:  # WAV header is 44 bytes
-            print(f"🎤 Created browser audio file: {temp_path} ({os.path.getsize(temp_path)} bytes)")
-            
-            # Transcribe using existing pipeline
-            transcripts = chunk_and_transcribe_tiny(temp_path)
-            transcript_text = " ".join(transcripts) if transcripts else ""
-            
-            print(f"🎤 Browser audio transcript: '{transcript_text}'")
-            return transcript_text
-        else:
-            print("🎤 Browser audio file too small or not created")
-            return ""
+        print(f"🎤 Browser audio transcript: '{transcript_text}'")
+        return transcript_text
             
     except Exception as e:
         print(f"❌ Error processing browser audio: {e}")
@@ -85,8 +81,7 @@ async def get_latency_stats():
     }
 
 # Import only the functions we need
-from tier1.tier1_pipeline import run_tier1_continuous
-from tier2.tier2_pipeline import run_tier2_continuous
+from tier1.tier1_pipeline import run_tier1_continuous, Tier1SessionState
 from dashboard_mode import dashboard_mode
 
 app = FastAPI(title="Backend Dashboard API")
@@ -193,6 +188,7 @@ latency_stats = {
 async def startup_event():
     """Initialize dashboard on startup"""
     print("🎛️ Backend Dashboard Server Starting...")
+    model_registry.warmup()
     dashboard_mode.start_dashboard_session()
 
 @app.on_event("shutdown") 
@@ -263,37 +259,18 @@ def create_placeholder_frame(message: str):
     cv2.putText(frame, message, (200, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
     return frame
 
-def process_browser_audio(audio_b64: str) -> str:
-    """Process base64-encoded PCM audio data from browser"""
+def process_browser_audio(audio_b64) -> str:
+    """Process PCM audio data from browser - base64 text (JSON protocol) or raw bytes (binary protocol)"""
     if not audio_b64:
         return ""
     
     try:
-        # Decode base64 audio data
-        audio_bytes = base64.b64decode(audio_b64)
-        
-        # Create temporary WAV file
-        temp_dir = os.path.join(os.path.dirname(__file__), 'temp_audio')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_path = os.path.join(temp_dir, f"browser_audio_{int(time.time() * 1000)}.wav")
-        
-        # Write WAV file (assuming 16-bit PCM, 16kHz, mono from browser)
-        with wave.open(temp_path, 'wb') as wf:
-            wf.setnchannels(1)  # Mono
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(16000)  # 16kHz
-            wf.writeframes(audio_bytes)
+        # 16-bit PCM, 16kHz, mono from browser -> float32 samples
+        pcm_bytes = audio_b64 if isinstance(audio_b64, (bytes, bytearray)) else base64.b64decode(audio_b64)
+        audio = pcm16_to_float32(pcm_bytes)
         
-        # Transcribe using existing function
-        transcription = chunk_and_transcribe_tiny(temp_path)
-        
-        # Clean up temp file
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except:
-            pass
+        # Transcribe in memory - no temp file to write or clean up
+        transcription = chunk_and_transcribe_tiny(audio)
         
         return " ".join(transcription) if transcription else ""
         
@@ -313,6 +290,15 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
         return
     
     # Start monitoring session in dashboard_mode
+    # Pose tracker + smoothing history for this browser stream only
+    tier1_state = Tier1SessionState()
+    # Static browser frames reuse the last Tier 1 result instead of running CLIP and pose
+    motion_gate = MotionGate()
+    # Tier 1 rate follows its latency and how far behind the browser we are
+    analysis_rate = AdaptiveRateController()
+    # Replies go out as binary JPEG messages once the browser negotiates it, base64 JSON otherwise
+    frame_protocol = negotiate_protocol(websocket.query_params)
+    
     dashboard_mode.start_new_monitoring_session(
         dashboard_session.session_id, 
         f"dashboard_recording_{int(time.time())}.mp4"
@@ -322,15 +308,35 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
         # Main processing loop
         processed_frames = 0
         last_frame_time = time.time()
-        frame_interval = 1.0 / 15.0  # Limit to 15 FPS for smooth streaming
+        frame_interval = 1.0 / DASHBOARD_DISPLAY_FPS  # Display rate limit for smooth streaming
+        min_clock_offset = None  # Smallest (server - browser) time seen = clock skew + network floor
         
         while dashboard_session.is_active:
             frame_start_time = time.time()
             try:
                 # Wait for browser frame data via WebSocket
                 try:
-                    message = await websocket.receive_text()
-                    frame_data = json.loads(message)
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(code=message.get("code", 1000))
+                    
+                    if message.get("bytes") is not None:
+                        # Binary protocol: header + JPEG (+ raw PCM16) - no base64 and no JSON parsing
+                        packet = unpack_frame(message["bytes"])
+                        if packet["kind"] != KIND_VIDEO_FRAME:
+                            continue
+                        frame_data = {"type": "video_frame", "timestamp": packet["timestamp"]}
+                        frame_bytes, audio_payload = packet["jpeg"], packet["audio"]
+                        frame_protocol = PROTOCOL_BINARY  # A client sending binary frames can read them too
+                    else:
+                        frame_data = json.loads(message["text"])
+                        frame_bytes, audio_payload = None, frame_data.get('audio')
+                    
+                    # Protocol negotiation for clients that cannot set query parameters
+                    if frame_data.get('type') == 'hello':
+                        frame_protocol = negotiate_protocol(frame_data)
+                        await websocket.send_json({"type": "hello_ack", "frame_protocol": frame_protocol})
+                        continue
                     
                     # Handle ping messages
                     if frame_data.get('type') == 'ping':
@@ -352,17 +358,16 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                         
                         # ⏱️ LATENCY: Frame decode timing
                         decode_start = time.time()
-                        frame_b64 = frame_data['frame']
-                        frame_bytes = base64.b64decode(frame_b64)
-                        nparr = np.frombuffer(frame_bytes, np.uint8)
-                        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                        if frame_bytes is None:
+                            frame_bytes = base64.b64decode(frame_data['frame'])
+                        frame = decode_jpeg(frame_bytes)
                         decode_time = time.time() - decode_start
                         latency_stats['decode_times'].append(decode_time)
                         
                         # 🎤 Process audio data if available
                         audio_transcript = ""
-                        if 'audio' in frame_data and frame_data['audio']:
-                            audio_transcript = process_browser_audio(frame_data['audio'])
+                        if audio_payload:
+                            audio_transcript = await inference_gateway.run_tier1(process_browser_audio, audio_payload)
                         
                         # Create frame data structure
                         frame_id = processed_frames + 1
@@ -376,6 +381,8 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                     else:
                         continue  # Skip non-video messages
                         
+                except WebSocketDisconnect:
+                    raise
                 except Exception as e:
                     print(f"❌ Error receiving browser frame: {e}")
                     continue
@@ -392,10 +399,22 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                 try:
                     # ⏱️ LATENCY: Analysis timing
                     analysis_start = time.time()
-                    # Run Tier 1 analysis on every 5th frame (instead of every 3rd)
-                    if processed_frames % 5 == 0:
-                        # Pass audio transcript to tier1 analysis
-                        tier1_result = run_tier1_continuous(frame, audio_transcript if audio_transcript else None)
+                    # Backlog = how much older this frame is than the freshest one we have seen
+                    clock_offset = time.time() - timestamp
+                    min_clock_offset = clock_offset if min_clock_offset is None else min(min_clock_offset, clock_offset)
+                    backlog_fill = min(1.0, (clock_offset - min_clock_offset) / analysis_rate.latency_slo)
+                    analysis_rate.observe_queue(backlog_fill)
+                    
+                    # Run Tier 1 only as often as the adaptive controller allows
+                    if analysis_rate.should_analyze():
+                        # Pass the already-transcribed browser audio to tier1 analysis (no second Whisper pass)
+                        tier1_result = await inference_gateway.run_tier1(
+                            run_tier1_continuous, frame, None,
+                            audio_transcripts=[audio_transcript] if audio_transcript else None,
+                            session_state=tier1_state, frame_timestamp=timestamp,
+                            motion_static=motion_gate.is_static(frame, timestamp)
+                        )
+                        analysis_rate.record_latency(time.time() - analysis_start, backlog_fill)
                         frame_status = tier1_result.get("status", "Normal")
                         
                         # Extract FULL reasoning details from tier1_components
@@ -439,16 +458,13 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                 try:
                     # ⏱️ LATENCY: Compression timing
                     compression_start = time.time()
-                    display_frame = cv2.resize(frame, (640, 480))
-                    _, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])  # Reduced quality
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
+                    display_jpeg = encode_display_frame(frame, quality=70)  # Reduced quality
                     compression_time = time.time() - compression_start
                     latency_stats['compression_times'].append(compression_time)
                     
                     # OPTIMIZED: Send lighter frame data for smooth streaming
                     frame_data = {
                         "type": "continuous_frame",
-                        "frame_data": frame_base64,
                         "frame_id": frame_id,
                         "timestamp": timestamp,
                         "status": frame_status,
@@ -467,7 +483,7 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                     
                     # ⏱️ LATENCY: Transmission timing
                     transmission_start = time.time()
-                    await websocket.send_json(frame_data)
+                    await send_frame_message(websocket, frame_data, display_jpeg, frame_protocol)
                     transmission_time = time.time() - transmission_start
                     latency_stats['transmission_times'].append(transmission_time)
                     
@@ -492,7 +508,7 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                     
                     # Save anomaly frame
                     anomaly_frame_path = f"anomaly_frames/dashboard_frame_{frame_id}_{int(timestamp)}.jpg"
-                    cv2.imwrite(anomaly_frame_path, frame)
+                    await inference_gateway.run_io(cv2.imwrite, anomaly_frame_path, frame)
                     
                     # Add to dashboard mode with full reasoning
                     anomaly_data = {
@@ -552,14 +568,15 @@ async def websocket_stream(websocket: WebSocket, username: str = "dashboard_user
                     print(f"📊 LATENCY REPORT (Last 50 frames):")
                     print(f"   Decode: {avg_decode:.3f}s | Analysis: {avg_analysis:.3f}s | Compress: {avg_compress:.3f}s")
                     print(f"   Transmit: {avg_transmit:.3f}s | Total: {avg_total:.3f}s | FPS: {50/avg_total:.1f}")
+                    print(f"   Tier 1 rate: {analysis_rate.analysis_fps:.1f} FPS (target {analysis_rate.target_fps:.1f})")
                     
                     # Clear old stats to prevent memory buildup
                     for key in latency_stats:
                         if isinstance(latency_stats[key], list) and len(latency_stats[key]) > 100:
                             latency_stats[key] = latency_stats[key][-50:]
                 
-                # OPTIMIZED: Slightly longer delay for better performance
-                await asyncio.sleep(0.066)  # ~15 FPS instead of 30 FPS
+                # No fixed sleep here: frames arriving faster than frame_interval are skipped on receive,
+                # so waiting would only let stale frames pile up in the socket buffer
                 
             except Exception as e:
                 print(f"❌ Processing error: {e}")
@@ -598,9 +615,22 @@ async def run_tier2_for_dashboard(frame, frame_id: int, timestamp: float, websoc
                 "audio_analysis": {"transcript_text": "", "audio_detected": False, "confidence": 0}
             }
         }
-        tier2_result = await asyncio.get_event_loop().run_in_executor(
-            None, run_tier2_continuous, frame, None, tier1_result_for_tier2  # No audio for dashboard
-        )
+        # Same Tier 2 job queue as the main app: one worker pool with priorities and deadlines
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+        
+        def on_done(job):
+            # Called on a Tier 2 worker thread - resolve the awaited future on the event loop
+            loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(job))
+        
+        job = tier2_jobs.submit(f"dashboard:{dashboard_session.session_id}:{frame_id}", frame.copy(),
+                                None, tier1_result_for_tier2, on_done)  # No audio for dashboard
+        if job is None:
+            raise RuntimeError("Tier 2 queue is saturated with more urgent jobs")
+        job = await finished
+        if job.status != "done":
+            raise RuntimeError(job.error or f"Tier 2 job {job.status}")
+        tier2_result = job.result
         
         print(f"✅ Dashboard: Tier 2 complete for frame {frame_id}")
         print(f"📊 Dashboard: Tier 2 result: {tier2_result}")
@@ -12,10 +12,137 @@ from datetime import datetime
 import asyncio
 import queue
 import os
+from utils.rate_control import AdaptiveRateController, ANALYSIS_TARGET_FPS, TIER1_LATENCY_SLO
+
+class SessionPipeline:
+    """Bounded per-session pipeline: own video/audio/fusion queues, stats and back-pressure policy
+
+    Back-pressure policies:
+      'drop'  - live sources: a full queue drops the NEW item (the stream keeps moving)
+      'block' - file sources: the producer waits for space, nothing is ever dropped
+    
+    Each pipeline also owns an AdaptiveRateController: live ('drop') pipelines lower their
+    analysis rate when Tier 1 falls behind so the video queue does not fill; 'block' pipelines
+    keep a fixed rate so files are sampled evenly.
+    """
+    
+    POLICIES = ("drop", "block")
+    
+    def __init__(self, session_id: str, backpressure: str = "drop",
+                 video_size: int = 30, audio_size: int = 50, fusion_size: int = 20,
+                 stats_sink=None, target_fps: Optional[float] = None,
+                 latency_slo: Optional[float] = None):
+        if backpressure not in self.POLICIES:
+            raise ValueError(f"Unknown back-pressure policy: {backpressure}")
+        self.session_id = session_id
+        self.backpressure = backpressure
+        self.video_queue = queue.Queue(maxsize=video_size)
+        self.audio_queue = queue.Queue(maxsize=audio_size)
+        self.fusion_results_queue = queue.Queue(maxsize=fusion_size)
+        self._stats_sink = stats_sink  # Process-wide totals (SessionManager.increment_stat)
+        self.rate = AdaptiveRateController(
+            target_fps=ANALYSIS_TARGET_FPS if target_fps is None else target_fps,
+            latency_slo=TIER1_LATENCY_SLO if latency_slo is None else latency_slo,
+            adaptive=backpressure == "drop"
+        )
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "frames_captured": 0,
+            "frames_processed": 0,
+            "frames_dropped": 0,
+            "frames_static": 0,
+            "audio_chunks_captured": 0,
+            "audio_transcribed": 0,
+            "audio_dropped": 0,
+            "audio_overflow_chunks": 0,
+            "audio_windows_dropped": 0,
+            "fusion_video_audio": 0,
+            "fusion_video_only": 0,
+            "fusion_dropped": 0
+        }
+    
+    def increment_stat(self, stat_name: str, amount: int = 1) -> None:
+        """Count in this session and in the process-wide totals"""
+        with self._lock:
+            self.stats[stat_name] = self.stats.get(stat_name, 0) + amount
+        if self._stats_sink:
+            self._stats_sink(stat_name, amount)
+    
+    def _put(self, target_queue: queue.Queue, item: Any, drop_stat: str, stop_event: Optional[threading.Event]) -> bool:
+        """Enqueue according to the back-pressure policy -> True if the item was accepted"""
+        if self.backpressure == "block":
+            while stop_event is None or not stop_event.is_set():
+                try:
+                    target_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        try:
+            target_queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.increment_stat(drop_stat)
+            return False
+    
+    def put_video(self, item: Any, stop_event: Optional[threading.Event] = None) -> bool:
+        return self._put(self.video_queue, item, "frames_dropped", stop_event)
+    
+    def put_audio(self, item: Any, stop_event: Optional[threading.Event] = None) -> bool:
+        # Audio is always live-paced: never stall the capture thread on it
+        try:
+            self.audio_queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.increment_stat("audio_dropped")
+            return False
+    
+    def put_fusion_result(self, item: Any, stop_event: Optional[threading.Event] = None) -> bool:
+        return self._put(self.fusion_results_queue, item, "fusion_dropped", stop_event)
+    
+    def queue_sizes(self) -> Dict[str, int]:
+        return {
+            'video': self.video_queue.qsize(),
+            'audio': self.audio_queue.qsize(),
+            'fusion_results': self.fusion_results_queue.qsize()
+        }
+    
+    def queue_fill(self) -> float:
+        """Fill ratio (0-1) of the fullest frame-carrying queue"""
+        return max(q.qsize() / q.maxsize for q in (self.video_queue, self.fusion_results_queue))
+    
+    def record_tier1_latency(self, seconds: float) -> None:
+        """Consumer feedback for the rate controller"""
+        self.rate.record_latency(seconds, self.queue_fill())
+    
+    def is_congested(self, ratio: float = 0.9) -> bool:
+        """True when any queue is above ratio of its capacity"""
+        return any(q.qsize() > q.maxsize * ratio
+                   for q in (self.video_queue, self.audio_queue, self.fusion_results_queue))
+    
+    def clear(self) -> None:
+        """Drop everything still queued - ALWAYS SUCCEEDS"""
+        for queue_obj in (self.video_queue, self.audio_queue, self.fusion_results_queue):
+            try:
+                while True:
+                    queue_obj.get_nowait()
+            except queue.Empty:
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'backpressure': self.backpressure, 'queue_sizes': self.queue_sizes(),
+                'rate_control': self.rate.get_stats()}
 
 class SessionManager:
     """Thread-safe session manager - SINGLE SOURCE OF TRUTH for all session management"""
     
+    # Back-pressure per session type: files must not lose frames, live sources must not lag
+    BACKPRESSURE_BY_SESSION_TYPE = {
+        "uploaded_video": "block"
+    }
+    
     def __init__(self):
         self._lock = threading.RLock()  # Reentrant lock for nested calls
         self._sessions: Dict[str, Dict[str, Any]] = {}
@@ -23,12 +150,9 @@ class SessionManager:
         self._active_cameras = set()
         self._websocket_connections: Dict[str, Any] = {}
         
-        # Shared queues for multimodal fusion
-        self.video_queue = queue.Queue(maxsize=30)
-        self.audio_queue = queue.Queue(maxsize=50) 
-        self.fusion_results_queue = queue.Queue(maxsize=20)
+        # Multimodal fusion queues live in each session's SessionPipeline
         
-        # Performance statistics - SINGLE SOURCE
+        # Performance statistics - process-wide totals across all sessions
         self.performance_stats = {
             "frames_captured": 0,
             "frames_processed": 0,
@@ -36,6 +160,12 @@ class SessionManager:
             "audio_transcribed": 0,
             "fusion_video_audio": 0,
             "fusion_video_only": 0,
+            "frames_dropped": 0,
+            "frames_static": 0,
+            "audio_dropped": 0,
+            "audio_overflow_chunks": 0,
+            "audio_windows_dropped": 0,
+            "fusion_dropped": 0,
             "tier1_anomalies_detected": 0,
             "tier2_analyses_triggered": 0,
             "tier2_analyses_completed": 0,
@@ -50,11 +180,15 @@ class SessionManager:
         
         print("🏗️ SessionManager initialized - ready for session management")
     
-    def create_session(self, username: str, session_type: str = "live_stream") -> str:
-        """Create a new processing session with all required resources"""
+    def create_session(self, username: str, session_type: str = "live_stream", backpressure: Optional[str] = None,
+                       target_fps: Optional[float] = None, latency_slo: Optional[float] = None) -> str:
+        """Create a new processing session with all required resources (including its own pipeline)"""
         with self._lock:
             session_id = str(uuid.uuid4())
             
+            if backpressure is None:
+                backpressure = self.BACKPRESSURE_BY_SESSION_TYPE.get(session_type, "drop")
+            
             session_data = {
                 'session_id': session_id,
                 'username': username,
@@ -63,6 +197,8 @@ class SessionManager:
                 'status': 'initializing',
                 'stop_event': threading.Event(),
                 'threads': [],
+                'pipeline': SessionPipeline(session_id, backpressure, stats_sink=self.increment_stat,
+                                            target_fps=target_fps, latency_slo=latency_slo),
                 'resources': {
                     'video_cap': None,
                     'video_writer': None,
@@ -99,6 +235,12 @@ class SessionManager:
                 session['metadata']['last_activity'] = time.time()
             return session
     
+    def get_pipeline(self, session_id: str) -> Optional[SessionPipeline]:
+        """Get the session's own pipeline (queues, stats, back-pressure)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session['pipeline'] if session else None
+    
     def update_session(self, session_id: str, updates: Dict[str, Any]) -> bool:
         """Update session data with automatic activity tracking"""
         with self._lock:
@@ -335,6 +477,7 @@ class SessionManager:
                 pass  # Silent fail for OpenCV cleanup
             
             # STEP 7: Final session removal
+            session['pipeline'].clear()
             session['status'] = 'cleaned'
             del self._sessions[session_id]
             self.performance_stats["sessions_completed"] += 1
@@ -399,16 +542,9 @@ class SessionManager:
         return cleanup_success
     
     def _clear_all_shared_resources(self) -> None:
-        """Clear all shared queues and resources - ALWAYS SUCCEEDS"""
+        """Clear all shared resources - ALWAYS SUCCEEDS"""
         try:
-            # Clear all queues
-            queues = [self.video_queue, self.audio_queue, self.fusion_results_queue]
-            for queue_obj in queues:
-                try:
-                    while not queue_obj.empty():
-                        queue_obj.get_nowait()
-                except:
-                    pass
+            # Session queues are cleared with their sessions
             
             # Global OpenCV cleanup
             try:
@@ -474,11 +610,14 @@ class SessionManager:
             else:
                 video_worker, audio_worker, fusion_worker = worker_functions
             
+            # Every worker of this session talks through the session's own pipeline
+            pipeline = session['pipeline']
+            
             # Create and start video worker
             video_thread = self.create_worker_thread(
                 session_id, 
                 video_worker,
-                (video_cap, video_writer, fps),
+                (video_cap, video_writer, fps, pipeline),
                 "video"
             )
             if video_thread:
@@ -489,7 +628,7 @@ class SessionManager:
             audio_thread = self.create_worker_thread(
                 session_id,
                 audio_worker, 
-                (self.audio_queue, audio_stream),
+                (pipeline, audio_stream),
                 "audio"
             )
             if audio_thread:
@@ -500,7 +639,7 @@ class SessionManager:
             fusion_thread = self.create_worker_thread(
                 session_id,
                 fusion_worker,
-                (),
+                (pipeline,),
                 "fusion"
             )
             if fusion_thread:
@@ -550,21 +689,27 @@ class SessionManager:
             return active
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get comprehensive performance statistics"""
+        """Get comprehensive performance statistics (totals + per-session pipelines)"""
         with self._lock:
             active_sessions = len([s for s in self._sessions.values() if s['status'] in ['active', 'camera_acquired']])
             
+            # Aggregate queue depth across every session's pipeline
+            queue_sizes = {'video': 0, 'audio': 0, 'fusion_results': 0}
+            session_pipelines = {}
+            for session_id, session in self._sessions.items():
+                pipeline_stats = session['pipeline'].get_stats()
+                session_pipelines[session_id] = pipeline_stats
+                for name, size in pipeline_stats['queue_sizes'].items():
+                    queue_sizes[name] += size
+            
             return {
                 **self.performance_stats,
                 'active_sessions': active_sessions,
                 'total_sessions': len(self._sessions),
                 'active_cameras': len(self._active_cameras),
                 'websocket_connections': len(self._websocket_connections),
-                'queue_sizes': {
-                    'video': self.video_queue.qsize(),
-                    'audio': self.audio_queue.qsize(),
-                    'fusion_results': self.fusion_results_queue.qsize()
-                }
+                'queue_sizes': queue_sizes,
+                'session_pipelines': session_pipelines
             }
     
     def increment_stat(self, stat_name: str, amount: int = 1) -> None:
@@ -625,9 +770,10 @@ class SessionManager:
                 health['session_health'].append(session_health)
             
             # Check queue health
-            if any(q.qsize() > q.maxsize * 0.9 for q in [self.video_queue, self.audio_queue, self.fusion_results_queue]):
+            congested = [sid for sid, s in self._sessions.items() if s['pipeline'].is_congested()]
+            if congested:
                 health['resource_health']['queues_healthy'] = False
-                health['issues'].append("One or more queues are near capacity")
+                health['issues'].append(f"Queues near capacity in {len(congested)} session(s)")
             
             # Overall health status
             if health['issues']:
@@ -0,0 +1,498 @@
+from utils.audio_processing import get_whisper_tiny, extract_audio
+from utils.pose_processing import (create_video_landmarker, detect_fall_sota, detect_abnormal_posture,
+                                   is_bbox_fall, landmarks_to_array, pose_features)
+from utils.scene_processing import (score_scene_batch, select_scene_anomaly, detect_comprehensive_anomalies,
+                                    SCENE_BATCH_SIZE)
+from utils.fusion_logic import tier1_fusion
+from utils.model_runtime import model_inference, cap_thread_budgets
+import mediapipe as mp
+import cv2
+import os
+import math
+import numpy as np
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import tempfile
+import threading
+import time
+
+# Offline (uploaded file) analysis: decode as fast as the CPU allows, never drop frames
+OFFLINE_SAMPLE_FPS = float(os.getenv("OFFLINE_SAMPLE_FPS", "1"))  # Tier 1 samples per second of video
+OFFLINE_QUEUE_SIZE = int(os.getenv("OFFLINE_QUEUE_SIZE", "32"))  # Decoded frames buffered ahead of inference
+OFFLINE_WORKERS = int(os.getenv("OFFLINE_WORKERS", str(max(1, (os.cpu_count() or 2) // 4))))  # Segment worker processes
+OFFLINE_SEGMENT_SECONDS = float(os.getenv("OFFLINE_SEGMENT_SECONDS", "60"))  # Video seconds per segment task
+OFFLINE_SEGMENT_WARMUP_SECONDS = float(os.getenv("OFFLINE_SEGMENT_WARMUP_SECONDS", "5"))  # Discarded pose lead-in per segment
+
+# Persistent segment worker pool - each worker process loads the models once and keeps them
+_segment_pool = None
+_segment_pool_workers = 0
+_segment_pool_lock = threading.Lock()
+_segment_manager = None  # Serves the cancel events the segment workers poll
+
+class OfflineAnalysisCancelled(Exception):
+    """The caller set the cancel event (e.g. the client disconnected) before the analysis finished"""
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise OfflineAnalysisCancelled()
+
+_END_OF_VIDEO = None
+
+def _put_blocking(frame_queue, item, stop_event):
+    """Blocking put that gives up once the consumer has stopped"""
+    while not stop_event.is_set():
+        try:
+            frame_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _decode_sampled_frames(cap, frame_queue, frame_interval, start_frame, end_frame, stop_event):
+    """Decoder thread: grab every frame, retrieve only sampled ones, block when the queue is full"""
+    try:
+        frame_index = start_frame
+        while not stop_event.is_set() and (end_frame is None or frame_index < end_frame):
+            # grab() skips the colour conversion for frames we never look at
+            if not cap.grab():
+                break
+            if (frame_index - start_frame) % frame_interval == 0:
+                ret, frame = cap.retrieve()
+                # Blocking put = back-pressure instead of silently dropping frames
+                if ret and not _put_blocking(frame_queue, (frame_index, frame), stop_event):
+                    break
+            frame_index += 1
+    except Exception as e:
+        print(f"❌ Offline decoder error: {e}")
+    finally:
+        _put_blocking(frame_queue, _END_OF_VIDEO, stop_event)
+
+def _transcribe_by_second(video_path, start_sec, end_sec, results):
+    """Whisper over the file's audio track -> {second: [texts]} (None when the file has no audio)"""
+    audio_path = None
+    try:
+        fd, audio_path = tempfile.mkstemp(suffix=".mp3", prefix="offline_audio_")
+        os.close(fd)
+        if not extract_audio(video_path, audio_path):
+            results["by_second"] = None
+            return
+
+        # temperature=0 keeps decoding greedy, so repeated runs give identical transcripts
+        with model_inference("whisper"):
+            transcription = get_whisper_tiny().transcribe(audio_path, fp16=False, temperature=0.0)
+        by_second = {}
+        for segment in transcription.get("segments", []):
+            text = segment["text"].strip()
+            if not text:
+                continue
+            first = int(segment["start"])
+            last = max(first + 1, int(math.ceil(segment["end"])))
+            for second in range(first, last):
+                if second >= start_sec and (end_sec is None or second < end_sec):
+                    by_second.setdefault(second, []).append(text)
+        results["by_second"] = by_second
+        print(f"🎤 Offline audio: {len(transcription.get('segments', []))} segments transcribed")
+    except Exception as e:
+        print(f"⚠ Offline audio processing error: {e}")
+        results["error"] = str(e)
+        results["by_second"] = None
+    finally:
+        if audio_path and os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+
+def _detect_pose(landmarker, frame, timestamp_ms):
+    """Landmarks of one sample as a (33, 4) array, or None when no person is found"""
+    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    result = landmarker.detect_for_video(mp_image, timestamp_ms)
+    if not result.pose_landmarks:
+        return None
+    return landmarks_to_array(result.pose_landmarks[0])
+
+def _evaluate_poses(poses):
+    """Stateless pose check (fall / abnormal posture) for a batch of samples -> [(anomaly, score)]
+
+    Features for every detected pose come from one vectorized kernel call over the stacked batch.
+    """
+    results = [(0, 0.0)] * len(poses)
+    detected = [i for i, pose in enumerate(poses) if pose is not None]
+    if not detected:
+        return results
+
+    stacked = np.stack([poses[i] for i in detected])
+    features = pose_features(stacked)
+    for row, i in enumerate(detected):
+        frame_features = {name: value[row] for name, value in features.items()}
+        fall_detected, fall_score = detect_fall_sota(poses[i], features=frame_features)
+        if fall_detected:
+            results[i] = (1, fall_score)
+        # Velocity-based movement checks are skipped: samples are too far apart for frame-to-frame motion
+        elif detect_abnormal_posture(poses[i], features=frame_features):
+            results[i] = (1, 0.7)
+        else:
+            results[i] = (0, fall_score)
+    return results
+
+def _score_batch(batch, landmarker, fps, batch_size):
+    """Scene (one batched CLIP pass) and pose for a list of (frame_index, frame) samples"""
+    images = [frame for _, frame in batch]  # BGR frames go straight to the CLIP preprocessor
+    scene_logits = score_scene_batch(images, batch_size)
+    scene_scores = [select_scene_anomaly(logits) for logits in scene_logits]
+    # Batch-summary criterion of run_tier1 (category thresholds), from the same logits
+    comprehensive_scores = [detect_comprehensive_anomalies(None, logits=logits)[0] for logits in scene_logits]
+
+    poses = []
+    for frame_index, frame in batch:
+        try:
+            poses.append(_detect_pose(landmarker, frame, int(1000 * frame_index / fps)))
+        except Exception as e:
+            print(f"⚠ Offline pose processing error: {e}")
+            poses.append(None)
+    pose_results = _evaluate_poses(poses)
+
+    samples = []
+    for (frame_index, frame), scene_score, comprehensive_score, pose, (pose_anomaly, pose_score) in zip(
+            batch, scene_scores, comprehensive_scores, poses, pose_results):
+        samples.append({
+            "frame_index": frame_index,
+            "timestamp": round(frame_index / fps, 3),
+            "scene_score": scene_score,
+            "scene_comprehensive_score": float(comprehensive_score),
+            "pose_anomaly": pose_anomaly,
+            "pose_score": pose_score,
+            # Batch-summary criterion of run_tier1 (bounding-box ratio), kept apart from the per-second check
+            "pose_bbox_fall": bool(is_bbox_fall(pose, frame.shape[1], frame.shape[0]))
+        })
+    return samples
+
+def _build_timeline(samples, audio_by_second, start_sec, total_seconds):
+    """Fuse samples into one Tier 1 entry per second of video"""
+    by_second = {}
+    for sample in samples:
+        by_second.setdefault(int(sample["timestamp"]), []).append(sample)
+
+    timeline = []
+    for second in range(start_sec, start_sec + total_seconds):
+        second_samples = by_second.get(second, [])
+        scene_score = max((s["scene_score"] for s in second_samples), default=0.0)
+        pose_anomaly = max((s["pose_anomaly"] for s in second_samples), default=0)
+
+        if audio_by_second is None:
+            audio_summary = None
+            transcripts = []
+        else:
+            transcripts = audio_by_second.get(second, [])
+            audio_summary = " | ".join(transcripts) if transcripts else "no transcripts"
+
+        pose_summary = f"Pose anomaly detected: {bool(pose_anomaly)}"
+        scene_summary = f"Scene anomaly probability: {scene_score:.3f}"
+        try:
+            status, details = tier1_fusion(pose_summary, audio_summary, scene_summary)
+        except Exception as e:
+            print(f"⚠ Offline fusion error at {second}s: {e}")
+            status, details = "Error", f"Fusion failed: {str(e)}"
+
+        timeline.append({
+            "second": second,
+            "status": status,
+            "details": details,
+            "scene_score": round(scene_score, 3),
+            "pose_anomaly": bool(pose_anomaly),
+            "audio_available": audio_summary is not None,
+            "transcript_text": " | ".join(transcripts),
+            "frames_analyzed": len(second_samples)
+        })
+    return timeline
+
+def _probe_video(video_path):
+    """fps (30 when unknown), frame count and duration of a video file"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = fps if fps > 0 else 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    duration = total_frames / fps if total_frames > 0 else 0.0
+    return fps, total_frames, duration
+
+def analyze_frame_range(video_path, start_frame, end_frame, frame_interval, fps, batch_size=None,
+                        progress_callback=None, warmup_frame=None, cancel_event=None):
+    """Decode [start_frame, end_frame) and score every frame_interval-th frame -> ordered samples
+
+    warmup_frame (on the sampling grid, before start_frame) feeds the samples of [warmup_frame,
+    start_frame) to the pose landmarker only, so its tracking state is settled at start_frame.
+    Those samples are not scored or returned. cancel_event is checked before every batch;
+    once set, decoding stops and OfflineAnalysisCancelled is raised.
+    """
+    batch_size = batch_size or SCENE_BATCH_SIZE
+    started = time.time()
+    decode_from = start_frame if warmup_frame is None else min(warmup_frame, start_frame)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    if decode_from > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, decode_from)
+
+    stop_event = threading.Event()
+    frame_queue = queue.Queue(maxsize=OFFLINE_QUEUE_SIZE)
+    decoder = threading.Thread(target=_decode_sampled_frames,
+                               args=(cap, frame_queue, frame_interval, decode_from, end_frame, stop_event),
+                               daemon=True)
+    decoder.start()
+
+    samples = []
+    landmarker = create_video_landmarker()
+    try:
+        finished = False
+        while not finished:
+            _check_cancelled(cancel_event)
+            batch = []
+            while len(batch) < batch_size:
+                item = frame_queue.get()
+                if item is _END_OF_VIDEO:
+                    finished = True
+                    break
+                frame_index, frame = item
+                if frame_index < start_frame:
+                    # Warm-up sample: advance the landmarker's tracking, discard the result
+                    try:
+                        _detect_pose(landmarker, frame, int(1000 * frame_index / fps))
+                    except Exception as e:
+                        print(f"⚠ Offline pose warm-up error: {e}")
+                    continue
+                batch.append(item)
+            if not batch:
+                break
+
+            samples.extend(_score_batch(batch, landmarker, fps, batch_size))
+
+            if progress_callback:
+                progress_callback({
+                    "processed_seconds": round((batch[-1][0] + frame_interval - start_frame) / fps, 2),
+                    "frames_analyzed": len(samples),
+                    "elapsed": round(time.time() - started, 2)
+                })
+    finally:
+        stop_event.set()
+        decoder.join()
+        cap.release()
+        landmarker.close()
+
+    return samples
+
+def _finish_offline_result(video_path, samples, audio_results, fps, duration, start_sec, end_sec,
+                           total_seconds, started, workers=1):
+    """Per-second timeline and summary for the merged samples of one analysis"""
+    samples = sorted(samples, key=lambda sample: sample["frame_index"])
+    if samples:
+        total_seconds = max(total_seconds, int(samples[-1]["timestamp"]) + 1 - int(start_sec))
+    timeline = _build_timeline(samples, audio_results.get("by_second"), int(start_sec), total_seconds)
+
+    elapsed = time.time() - started
+    anomaly_seconds = [entry["second"] for entry in timeline if entry["status"] == "Suspected Anomaly"]
+    summary = {
+        "video_file": os.path.basename(video_path),
+        "duration": round(duration, 2),
+        "segment_start": start_sec,
+        "segment_end": end_sec,
+        "fps": fps,
+        "frames_analyzed": len(samples),
+        "pose_bbox_fall_frames": sum(1 for sample in samples if sample["pose_bbox_fall"]),
+        "anomaly_seconds": anomaly_seconds,
+        "max_scene_score": max((entry["scene_score"] for entry in timeline), default=0.0),
+        "max_comprehensive_scene_score": max((sample["scene_comprehensive_score"] for sample in samples), default=0.0),
+        "audio_available": audio_results.get("by_second") is not None,
+        "workers": workers,
+        "processing_time": round(elapsed, 2),
+        "realtime_factor": round(total_seconds / elapsed, 2) if elapsed > 0 else 0.0
+    }
+    print(f"✅ Offline analysis complete: {total_seconds}s of video in {elapsed:.1f}s "
+          f"({summary['realtime_factor']}x real time, {workers} worker(s)), {len(anomaly_seconds)} anomalous seconds")
+    return {"timeline": timeline, "summary": summary}
+
+def _segment_bounds(fps, total_frames, sample_fps, start_sec, end_sec):
+    """Frame range, sampling interval and timeline length for a [start_sec, end_sec) request"""
+    frame_interval = max(1, int(round(fps / sample_fps)))
+    start_frame = int(round(start_sec * fps))
+    end_frame = int(round(end_sec * fps)) if end_sec is not None else None
+    if total_frames > 0:
+        last_frame = total_frames if end_frame is None else min(end_frame, total_frames)
+    else:
+        last_frame = end_frame or 0  # Frame count unknown: timeline length comes from the samples
+    total_seconds = max(0, int(math.ceil(last_frame / fps)) - int(start_sec))
+    return start_frame, end_frame, last_frame, frame_interval, total_seconds
+
+def _start_audio_thread(video_path, start_sec, end_sec):
+    """Transcribe the audio track in the background -> (thread, results dict)"""
+    audio_results = {}
+    audio_thread = threading.Thread(target=_transcribe_by_second,
+                                     args=(video_path, int(start_sec), end_sec, audio_results), daemon=True)
+    audio_thread.start()
+    return audio_thread, audio_results
+
+def run_tier1_offline(video_path, progress_callback=None, sample_fps=None, batch_size=None,
+                      start_sec=0, end_sec=None, cancel_event=None):
+    """Faster-than-real-time Tier 1 analysis of a video file -> per-second timeline + summary
+
+    progress_callback(dict) is called after every scored batch. start_sec/end_sec restrict the
+    analysis to a segment of the file. Results depend only on the file and settings (deterministic).
+    Setting cancel_event stops the analysis with OfflineAnalysisCancelled.
+    """
+    started = time.time()
+    sample_fps = sample_fps or OFFLINE_SAMPLE_FPS
+
+    fps, total_frames, duration = _probe_video(video_path)
+    start_frame, end_frame, _, frame_interval, total_seconds = _segment_bounds(
+        fps, total_frames, sample_fps, start_sec, end_sec)
+
+    print(f"📼 Offline analysis: {os.path.basename(video_path)} ({duration:.1f}s @ {fps:.1f} fps, "
+          f"segment {start_sec}s-{end_sec if end_sec is not None else 'end'}, every {frame_interval} frames)")
+
+    # Audio transcription runs alongside video decoding/inference
+    audio_thread, audio_results = _start_audio_thread(video_path, start_sec, end_sec)
+
+    def report_progress(progress):
+        processed_seconds = min(progress["processed_seconds"], total_seconds) if total_seconds else progress["processed_seconds"]
+        progress_callback({
+            **progress,
+            "processed_seconds": processed_seconds,
+            "total_seconds": total_seconds,
+            "progress": round(min(1.0, processed_seconds / total_seconds), 3) if total_seconds else 0.0
+        })
+
+    samples = analyze_frame_range(video_path, start_frame, end_frame, frame_interval, fps, batch_size,
+                                  report_progress if progress_callback else None, cancel_event=cancel_event)
+
+    audio_thread.join()
+    return _finish_offline_result(video_path, samples, audio_results, fps, duration, start_sec, end_sec,
+                                  total_seconds, started)
+
+def _init_segment_worker(num_threads):
+    """Worker process start-up: split the cores between workers (models load on first use)"""
+    cap_thread_budgets(num_threads)
+    cv2.setNumThreads(1)
+    print(f"🧵 Offline segment worker {os.getpid()} ready ({num_threads} threads)")
+
+def get_segment_pool(workers=None):
+    """Shared process pool for segment analysis, (re)created when the worker count changes"""
+    global _segment_pool, _segment_pool_workers, _segment_manager
+    workers = workers or OFFLINE_WORKERS
+    with _segment_pool_lock:
+        if _segment_pool is None or _segment_pool_workers != workers:
+            if _segment_pool is not None:
+                _segment_pool.shutdown(wait=False, cancel_futures=True)
+            threads_per_worker = max(1, (os.cpu_count() or workers) // workers)
+            # spawn: forking a process that already runs torch/mediapipe threads is unsafe
+            _segment_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_segment_worker,
+                initargs=(threads_per_worker,)
+            )
+            _segment_pool_workers = workers
+            print(f"🏭 Offline segment pool started: {workers} workers x {threads_per_worker} threads")
+        if _segment_manager is None:
+            _segment_manager = multiprocessing.get_context("spawn").Manager()
+        return _segment_pool
+
+def _segment_cancel_event():
+    """Event the segment workers can poll across processes (proxy from the shared manager)"""
+    with _segment_pool_lock:
+        return _segment_manager.Event()
+
+def shutdown_segment_pool():
+    """Stop the segment worker processes (application shutdown)"""
+    global _segment_pool, _segment_pool_workers, _segment_manager
+    with _segment_pool_lock:
+        if _segment_pool is not None:
+            _segment_pool.shutdown(wait=False, cancel_futures=True)
+            _segment_pool = None
+            _segment_pool_workers = 0
+        if _segment_manager is not None:
+            _segment_manager.shutdown()
+            _segment_manager = None
+
+def run_tier1_offline_parallel(video_path, progress_callback=None, workers=None, segment_seconds=None,
+                               sample_fps=None, batch_size=None, start_sec=0, end_sec=None, cancel_event=None):
+    """run_tier1_offline split into time segments analysed by a process pool, merged in order
+
+    Audio is transcribed once in this process while the workers score video segments. Segment
+    boundaries fall on sampled frames, so every second is sampled exactly as in a single-process
+    run. Each segment runs its own pose landmarker, warmed up over the OFFLINE_SEGMENT_WARMUP_SECONDS
+    before it; pose results right after a boundary are therefore close to, but not guaranteed
+    identical with, a single-process run.
+
+    Setting cancel_event (a threading.Event) drops the queued segments, stops the running ones
+    after their current batch and raises OfflineAnalysisCancelled.
+    """
+    started = time.time()
+    workers = workers or OFFLINE_WORKERS
+    sample_fps = sample_fps or OFFLINE_SAMPLE_FPS
+    segment_seconds = segment_seconds or OFFLINE_SEGMENT_SECONDS
+
+    fps, total_frames, duration = _probe_video(video_path)
+    start_frame, end_frame, last_frame, frame_interval, total_seconds = _segment_bounds(
+        fps, total_frames, sample_fps, start_sec, end_sec)
+
+    # Whole number of sampling intervals per segment keeps the sample grid identical
+    segment_frames = max(1, int(round(segment_seconds * fps / frame_interval))) * frame_interval
+    segments = [(first, min(first + segment_frames, last_frame))
+                for first in range(start_frame, last_frame, segment_frames)]
+    # Warm-up lead-in on the same sampling grid, never before the requested start
+    warmup_frames = int(math.ceil(OFFLINE_SEGMENT_WARMUP_SECONDS * fps / frame_interval)) * frame_interval
+
+    if workers <= 1 or len(segments) <= 1:
+        return run_tier1_offline(video_path, progress_callback, sample_fps, batch_size, start_sec, end_sec,
+                                 cancel_event)
+
+    print(f"📼 Parallel offline analysis: {os.path.basename(video_path)} ({duration:.1f}s) "
+          f"in {len(segments)} segments on {workers} workers")
+
+    audio_thread, audio_results = _start_audio_thread(video_path, start_sec, end_sec)
+
+    pool = get_segment_pool(workers)
+    # Workers cannot see the caller's threading.Event - mirror it into a cross-process one
+    worker_cancel = _segment_cancel_event()
+    futures = {
+        pool.submit(analyze_frame_range, video_path, first, last, frame_interval, fps, batch_size, None,
+                    max(start_frame, first - warmup_frames), worker_cancel): (first, last)
+        for first, last in segments
+    }
+
+    samples = []
+    processed_frames = 0
+    pending = set(futures)
+    try:
+        while pending:
+            _check_cancelled(cancel_event)
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                first, last = futures[future]
+                samples.extend(future.result())
+                processed_frames += last - first
+
+            if progress_callback and done:
+                processed_seconds = min(total_seconds, processed_frames / fps)
+                progress_callback({
+                    "processed_seconds": round(processed_seconds, 2),
+                    "total_seconds": total_seconds,
+                    "progress": round(min(1.0, processed_seconds / total_seconds), 3) if total_seconds else 0.0,
+                    "frames_analyzed": len(samples),
+                    "segments_done": sum(1 for f in futures if f.done()),
+                    "segments_total": len(segments),
+                    "elapsed": round(time.time() - started, 2)
+                })
+    except BaseException:
+        worker_cancel.set()
+        for future in futures:
+            future.cancel()
+        raise
+
+    audio_thread.join()
+    return _finish_offline_result(video_path, samples, audio_results, fps, duration, start_sec, end_sec,
+                                  total_seconds, started, workers)
@@ -1,23 +1,53 @@
-from utils.audio_processing import chunk_and_transcribe_tiny, extract_audio
-from utils.pose_processing import process_pose_frame, process_pose
-from utils.scene_processing import process_scene_frame, process_scene_tier1
+from utils.audio_processing import chunk_and_transcribe_tiny
+from utils.pose_processing import PoseTracker
+from utils.scene_processing import process_scene_frame, scene_models_ready
 from utils.fusion_logic import tier1_fusion
-import cv2
+from tier1.offline_pipeline import run_tier1_offline_parallel
 import numpy as np
 import json
 import time
 import traceback
+import os
+import threading
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
-# Global variables for smoothing/easing - simplified approach
-_anomaly_history = deque(maxlen=3)  # Reduced from 5 to 3 for faster response
-_startup_frame_count = 0  # Track startup frames to prevent initial false positives
+class Tier1SessionState:
+    """Per-session Tier 1 state: the session's PoseTracker and its smoothing history"""
+    
+    def __init__(self):
+        self.pose_tracker = PoseTracker()
+        self.anomaly_history = deque(maxlen=3)  # Reduced from 5 to 3 for faster response
+        self.startup_frame_count = 0  # Track startup frames to prevent initial false positives
+        self.last_result = None  # Last fully computed Tier 1 result - reused for motion-gated static frames
+        self.reused_results = 0
+        self.inflight_branches = {}  # modality -> future of its branch still running on the executor
+        self.skipped_branches = 0  # Branches not launched because the previous one was still running
+
+# Used when a caller does not pass its own session state (single-stream use)
+_default_state = None
+_default_state_lock = threading.Lock()
+
+def _get_default_state():
+    global _default_state
+    with _default_state_lock:
+        if _default_state is None:
+            _default_state = Tier1SessionState()
+        return _default_state
+
+# Concurrent modality branches: persistent executor + per-branch time budgets (seconds)
+TIER1_BRANCH_WORKERS = int(os.getenv("TIER1_BRANCH_WORKERS", "6"))
+TIER1_POSE_TIMEOUT = float(os.getenv("TIER1_POSE_TIMEOUT", "1.0"))
+TIER1_AUDIO_TIMEOUT = float(os.getenv("TIER1_AUDIO_TIMEOUT", "1.5"))
+TIER1_SCENE_TIMEOUT = float(os.getenv("TIER1_SCENE_TIMEOUT", "1.0"))  # Also bounds the wait on the CLIP batch server
+_branch_executor = ThreadPoolExecutor(max_workers=TIER1_BRANCH_WORKERS, thread_name_prefix="tier1-branch")
 
-def apply_temporal_smoothing(current_status, current_scene_prob, current_pose_anomaly, fusion_details):
+def apply_temporal_smoothing(current_status, current_scene_prob, current_pose_anomaly, fusion_details, state=None):
     """NO SMOOTHING - Immediate anomaly detection for demo"""
-    global _anomaly_history, _startup_frame_count
+    state = state or _get_default_state()
+    _anomaly_history = state.anomaly_history
     
-    _startup_frame_count += 1
+    state.startup_frame_count += 1
     
     # CRITICAL: Bypass smoothing for audio emergencies
     if "AUDIO EMERGENCY" in fusion_details:
@@ -25,7 +55,7 @@ def apply_temporal_smoothing(current_status, current_scene_prob, current_pose_an
         return "Suspected Anomaly"
     
     # NO STARTUP PROTECTION - Immediate detection!
-    print(f"� NO SMOOTHING MODE: frame {_startup_frame_count}, status={current_status}")
+    print(f"� NO SMOOTHING MODE: frame {state.startup_frame_count}, status={current_status}")
     
     # Return the status immediately without any smoothing
     if current_status == "Suspected Anomaly":
@@ -81,79 +111,173 @@ def apply_temporal_smoothing(current_status, current_scene_prob, current_pose_an
             print(f"🟡 Partial anomaly: {anomaly_count}/{len(_anomaly_history)} frames (need {required_agreement}), avg_conf={avg_confidence:.2f}")
         return "Normal"
 
-def run_tier1_continuous(frame, audio_chunk_path):
-    """Enhanced Tier 1 processing with FIXED audio handling"""
+def _has_audio_source(audio_chunk_path):
+    """True when run_tier1_continuous was given a usable audio chunk path"""
+    return bool(audio_chunk_path and isinstance(audio_chunk_path, str) and len(audio_chunk_path.strip()) > 0)
+
+def _pose_branch(frame, pose_tracker, frame_timestamp=None):
+    """Pose modality -> (pose_anomaly, pose_summary)"""
     try:
-        # Initialize components with error handling
-        pose_anomaly = 0
-        pose_summary = "Pose processing skipped"
-        audio_transcripts = []
-        audio_summary = None  # KEY CHANGE: Start with None to distinguish states
-        anomaly_prob = 0.0
-        scene_summary = "Scene processing skipped"
-        
-        # Pose processing with error handling
-        try:
-            pose_anomaly = process_pose_frame(frame)
-            pose_summary = f"Pose anomaly detected: {bool(pose_anomaly)}"
-        except Exception as e:
-            print(f"⚠ Pose processing error: {e}")
-            pose_anomaly = 0
-            pose_summary = f"Pose processing failed: {str(e)}"
+        # The session's own tracker: timestamps and previous-frame velocities never mix across streams
+        pose_anomaly = pose_tracker.process_frame(frame, frame_timestamp)
+        return pose_anomaly, f"Pose anomaly detected: {bool(pose_anomaly)}"
+    except Exception as e:
+        print(f"⚠ Pose processing error: {e}")
+        return 0, f"Pose processing failed: {str(e)}"
 
-        # FIXED Audio processing with proper state tracking
-        audio_processing_attempted = False
-        try:
-            # Check if audio is available
-            if audio_chunk_path and isinstance(audio_chunk_path, str) and len(audio_chunk_path.strip()) > 0:
+def _audio_branch(audio_chunk_path, audio_transcripts=None):
+    """Audio modality -> (audio_transcripts, audio_summary, audio_processing_attempted)
+
+    audio_transcripts: text already transcribed upstream for this chunk - Whisper is not run again
+    """
+    audio_processing_attempted = False
+    try:
+        # Check if audio is available
+        if audio_transcripts is not None or _has_audio_source(audio_chunk_path):
+            audio_processing_attempted = True
+            if audio_transcripts is not None:
+                transcripts = list(audio_transcripts)
+            else:
                 print(f"🎤 Processing audio from: {audio_chunk_path}")
-                audio_processing_attempted = True
-                
                 transcripts = chunk_and_transcribe_tiny(audio_chunk_path)
-                audio_transcripts = transcripts if transcripts else []
-                
-                if transcripts and len(transcripts) > 0:
-                    # Audio successfully processed with content
-                    audio_summary = " | ".join(transcripts)
-                    print(f"🎤 Audio transcripts found: {len(transcripts)} segments")
-                    
-                    # Debug: Print emergency audio immediately
-                    for transcript in transcripts:
-                        if any(word in transcript.lower() for word in ["help", "emergency", "call", "911", "fire"]):
-                            print(f"🚨 EMERGENCY AUDIO DETECTED: '{transcript}'")
-                else:
-                    # Audio processed but no transcripts (silence or unclear audio)
-                    audio_summary = "no transcripts"  # This will be recognized by fusion logic
-                    print(f"🎤 Audio processed but no clear transcripts")
-            else:
-                # No audio source provided
-                print(f"🎤 No audio source available (audio_chunk_path={audio_chunk_path})")
-                audio_summary = None  # Truly no audio available
+            audio_transcripts = transcripts if transcripts else []
+            
+            if transcripts and len(transcripts) > 0:
+                # Audio successfully processed with content
+                print(f"🎤 Audio transcripts found: {len(transcripts)} segments")
                 
-        except Exception as e:
-            print(f"⚠ Audio processing error: {e}")
-            if audio_processing_attempted:
-                # Audio was available but failed to process
-                audio_summary = "audio processing failed"
-                print(f"🎤 Audio processing failed: {str(e)}")
-            else:
-                # No audio was available to begin with
-                audio_summary = None
-                print(f"🎤 No audio available due to error: {str(e)}")
+                # Debug: Print emergency audio immediately
+                for transcript in transcripts:
+                    if any(word in transcript.lower() for word in ["help", "emergency", "call", "911", "fire"]):
+                        print(f"🚨 EMERGENCY AUDIO DETECTED: '{transcript}'")
+                return audio_transcripts, " | ".join(transcripts), True
+            
+            # Audio processed but no transcripts (silence or unclear audio)
+            print(f"🎤 Audio processed but no clear transcripts")
+            return [], "no transcripts", True  # This will be recognized by fusion logic
+        
+        # No audio source provided
+        print(f"🎤 No audio source available (audio_chunk_path={audio_chunk_path})")
+        return [], None, False  # Truly no audio available
+            
+    except Exception as e:
+        print(f"⚠ Audio processing error: {e}")
+        if audio_processing_attempted:
+            # Audio was available but failed to process
+            print(f"🎤 Audio processing failed: {str(e)}")
+            return [], "audio processing failed", True
+        # No audio was available to begin with
+        print(f"🎤 No audio available due to error: {str(e)}")
+        return [], None, False
 
-        # Scene processing with error handling
-        try:
-            # Convert frame to RGB for scene processing
-            if len(frame.shape) == 3 and frame.shape[2] == 3:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_frame = frame
-            anomaly_prob = process_scene_frame(rgb_frame)
-            scene_summary = f"Scene anomaly probability: {anomaly_prob:.3f}"
-        except Exception as e:
-            print(f"⚠ Scene processing error: {e}")
-            anomaly_prob = 0.0
-            scene_summary = f"Scene processing failed: {str(e)}"
+def _scene_branch(frame, scene_score, deadline):
+    """Scene modality -> (anomaly_prob, scene_summary), waiting on the CLIP batch server until deadline"""
+    try:
+        if scene_score is not None:
+            # Scene already scored in a batch by the caller
+            anomaly_prob = float(scene_score)
+        else:
+            # BGR (or grayscale) frame - the CLIP preprocessor handles the channel order
+            anomaly_prob = process_scene_frame(frame, timeout=max(0.0, deadline - time.time()))
+        return anomaly_prob, f"Scene anomaly probability: {anomaly_prob:.3f}"
+    except FuturesTimeoutError:
+        return 0.0, "Scene processing timed out"
+    except Exception as e:
+        print(f"⚠ Scene processing error: {e}")
+        return 0.0, f"Scene processing failed: {str(e)}"
+
+class _StaleBranch(Exception):
+    """A queued branch reached a worker after its caller had already given up on it"""
+
+def _run_branch(deadline, fn, *args):
+    # Timed-out results are discarded, so a branch that waited in the queue past its budget is skipped
+    if time.time() > deadline:
+        raise _StaleBranch()
+    return fn(*args)
+
+def _submit_branch(session_state, name, budget, fn, *args):
+    """Launch one modality branch -> future, or None while the session's previous one is still running
+
+    One in-flight branch per modality per session: an overrun branch keeps its executor worker,
+    but later frames never queue more work behind it.
+    """
+    previous = session_state.inflight_branches.get(name)
+    if previous is not None and not previous.done():
+        session_state.skipped_branches += 1
+        return None
+    future = _branch_executor.submit(_run_branch, time.time() + budget, fn, *args)
+    session_state.inflight_branches[name] = future
+    return future
+
+def _branch_result(future, timeout, fallback, name):
+    """Wait for one modality branch within its own budget; fallback value when it runs over"""
+    if future is None:
+        print(f"⏱️ {name} branch still busy with an earlier frame - using fallback")
+        return fallback
+    try:
+        return future.result(timeout=timeout)
+    except (FuturesTimeoutError, _StaleBranch):
+        # Drops it if it has not started yet; a running branch finishes but is never waited on
+        future.cancel()
+        print(f"⏱️ {name} branch exceeded {timeout:.2f}s budget - using fallback")
+        return fallback
+
+def _reuse_last_result(session_state, audio_chunk_path, audio_transcripts):
+    """Copy of the last Tier 1 result for a static frame, or None when the frame needs a full run
+
+    Never reused after an anomaly (it must be re-confirmed) or when the frame brings new audio.
+    """
+    last_result = session_state.last_result
+    if last_result is None or last_result.get("status") != "Normal":
+        return None
+    if audio_transcripts or _has_audio_source(audio_chunk_path):
+        return None
+    session_state.reused_results += 1
+    return {**last_result, "motion_gated": True}
+
+def run_tier1_continuous(frame, audio_chunk_path, scene_score=None, audio_transcripts=None, session_state=None,
+                         frame_timestamp=None, motion_static=False):
+    """Enhanced Tier 1 processing with FIXED audio handling
+
+    Pose, audio and scene branches run concurrently on a persistent executor and join
+    before fusion, each bounded by its own timeout (TIER1_*_TIMEOUT).
+    scene_score: precomputed scene anomaly probability (e.g. from batched CLIP); skips scene inference
+    audio_transcripts: cached transcripts of the audio chunk (from the audio worker); skips Whisper
+    session_state: the stream's Tier1SessionState (pose tracker + smoothing history)
+    frame_timestamp: capture time of the frame in seconds - gives the pose tracker real frame timing
+    motion_static: the motion gate saw no change - reuse the last result instead of running CLIP/pose
+    """
+    session_state = session_state or _get_default_state()
+    if motion_static:
+        reused = _reuse_last_result(session_state, audio_chunk_path, audio_transcripts)
+        if reused is not None:
+            return reused
+    try:
+        # Launch the three modality branches concurrently
+        branch_start = time.time()
+        pose_future = _submit_branch(session_state, "pose", TIER1_POSE_TIMEOUT,
+                                     _pose_branch, frame, session_state.pose_tracker, frame_timestamp)
+        audio_future = _submit_branch(session_state, "audio", TIER1_AUDIO_TIMEOUT,
+                                      _audio_branch, audio_chunk_path, audio_transcripts)
+        # Until CLIP is warmed a scene call would only block on the model load - mark it not ready instead
+        scene_ready = scene_score is not None or scene_models_ready()
+        scene_future = _submit_branch(session_state, "scene", TIER1_SCENE_TIMEOUT,
+                                      _scene_branch, frame, scene_score,
+                                      branch_start + TIER1_SCENE_TIMEOUT) if scene_ready else None
+        
+        # Budgets are measured from launch, so a slow branch does not eat the others' time
+        pose_anomaly, pose_summary = _branch_result(
+            pose_future, TIER1_POSE_TIMEOUT, (0, "Pose processing timed out"), "Pose")
+        audio_attempted = audio_transcripts is not None or _has_audio_source(audio_chunk_path)
+        audio_transcripts, audio_summary, audio_processing_attempted = _branch_result(
+            audio_future, max(0.0, TIER1_AUDIO_TIMEOUT - (time.time() - branch_start)),
+            ([], "audio processing failed" if audio_attempted else None, audio_attempted), "Audio")
+        if scene_ready:
+            anomaly_prob, scene_summary = _branch_result(
+                scene_future, max(0.0, TIER1_SCENE_TIMEOUT - (time.time() - branch_start)),
+                (0.0, "Scene processing timed out"), "Scene")
+        else:
+            anomaly_prob, scene_summary = 0.0, "Scene model not ready"
 
         # FIXED Tier 1 fusion with proper audio state handling
         try:
@@ -173,7 +297,8 @@ def run_tier1_continuous(frame, audio_chunk_path):
             fusion_details = f"Fusion failed: {str(e)}"
         
         # Apply smoothing WITH fusion details for audio emergency bypass
-        smoothed_status = apply_temporal_smoothing(initial_status, anomaly_prob, pose_anomaly, fusion_details)
+        smoothed_status = apply_temporal_smoothing(initial_status, anomaly_prob, pose_anomaly, fusion_details,
+                                                   session_state)
         
         # Add smoothing info if status changed
         if smoothed_status != initial_status:
@@ -195,11 +320,12 @@ def run_tier1_continuous(frame, audio_chunk_path):
                     "processing_attempted": audio_processing_attempted,
                     "summary": audio_summary if audio_summary else "No audio available",
                     "transcript_text": " | ".join(audio_transcripts) if audio_transcripts else "",
-                    "audio_source_provided": bool(audio_chunk_path)
+                    "audio_source_provided": bool(audio_chunk_path) or audio_processing_attempted
                 },
                 "scene_analysis": {
                     "anomaly_probability": round(anomaly_prob, 3),
-                    "summary": scene_summary
+                    "summary": scene_summary,
+                    "model_ready": scene_ready
                 },
                 "fusion_logic": {
                     "initial_status": initial_status,
@@ -217,6 +343,8 @@ def run_tier1_continuous(frame, audio_chunk_path):
             # Minimal logging for normal frames
             print(f"✅ Tier1 Normal: scene={anomaly_prob:.2f}, pose={pose_anomaly}, audio={'Yes' if audio_summary else 'No'}")
         
+        # Callers add per-frame keys (frame_data, frame_id...) to the returned dict - keep a clean copy
+        session_state.last_result = dict(result)
         return result
         
     except Exception as e:
@@ -248,41 +376,28 @@ def run_tier1_continuous(frame, audio_chunk_path):
         }
 
 def run_tier1(video_path):
-    """Keep original batch function - ENHANCED with better audio handling"""
+    """Keep original batch function - segments analysed in parallel by the offline worker pool"""
     try:
-        # Audio processing with better error handling
-        audio_transcripts = []
-        try:
-            audio_path = extract_audio(video_path)
-            if audio_path:
-                transcripts = chunk_and_transcribe_tiny(audio_path)
-                audio_transcripts = transcripts if transcripts else []
-                
-                if audio_transcripts:
-                    audio_summary = " | ".join(audio_transcripts)
-                else:
-                    audio_summary = "no transcripts"  # Processed but silent
-            else:
-                audio_summary = None  # No audio available
-        except Exception as e:
-            print(f"⚠ Batch audio processing error: {e}")
-            audio_summary = "audio processing failed"
+        analysis = run_tier1_offline_parallel(video_path)
+        timeline = analysis["timeline"]
+        summary = analysis["summary"]
         
-        # Pose processing
-        try:
-            num_anomalies, total_frames, _, _ = process_pose(video_path)
-            pose_summary = f"Pose anomalies (fall/crawl) detected in {num_anomalies} out of {total_frames} frames."
-        except Exception as e:
-            print(f"⚠ Batch pose processing error: {e}")
-            pose_summary = f"Pose processing failed: {str(e)}"
+        # Audio summary from the per-second transcripts
+        audio_transcripts = []
+        for entry in timeline:
+            if entry["transcript_text"] and (not audio_transcripts or audio_transcripts[-1] != entry["transcript_text"]):
+                audio_transcripts.append(entry["transcript_text"])
+        if not summary["audio_available"]:
+            audio_summary = None  # No audio available
+        elif audio_transcripts:
+            audio_summary = " | ".join(audio_transcripts)
+        else:
+            audio_summary = "no transcripts"  # Processed but silent
         
-        # Scene processing
-        try:
-            max_anomaly_prob = process_scene_tier1(video_path)
-            scene_summary = f"Highest scene anomaly probability: {max_anomaly_prob:.2f}"
-        except Exception as e:
-            print(f"⚠ Batch scene processing error: {e}")
-            scene_summary = f"Scene processing failed: {str(e)}"
+        # Original criterion: sampled frames whose pose bounding box is wider than twice its height
+        pose_summary = (f"Pose anomalies (fall/crawl) detected in {summary['pose_bbox_fall_frames']} "
+                        f"out of {summary['frames_analyzed']} frames.")
+        scene_summary = f"Highest scene anomaly probability: {summary['max_comprehensive_scene_score']:.2f}"
         
         # Fusion
         status, details = tier1_fusion(pose_summary, audio_summary, scene_summary)
@@ -292,7 +407,9 @@ def run_tier1(video_path):
             "details": details,
             "batch_info": {
                 "audio_transcripts": audio_transcripts,
-                "audio_available": audio_summary is not None
+                "audio_available": audio_summary is not None,
+                "timeline": timeline,
+                "summary": summary
             }
         }
         
@@ -302,4 +419,4 @@ def run_tier1(video_path):
             "status": "Error",
             "details": f"Batch processing error: {str(e)}",
             "batch_info": {"audio_transcripts": [], "audio_available": False}
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,157 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import traceback
+from tier2.tier2_pipeline import run_tier2_continuous
+
+# Tier 2 runs off the live path: Tier 1 submits a job and keeps streaming, results arrive via callback
+TIER2_WORKERS = int(os.getenv("TIER2_WORKERS", "2"))
+TIER2_QUEUE_SIZE = int(os.getenv("TIER2_QUEUE_SIZE", "8"))
+TIER2_DEADLINE_SECONDS = float(os.getenv("TIER2_DEADLINE_SECONDS", "30"))
+
+EMERGENCY_WORDS = ["help", "emergency", "call", "911", "fire"]
+
+def tier2_priority(tier1_result):
+    """Priority from Tier 1 evidence - lower runs first (falls and emergency audio jump the queue)"""
+    components = tier1_result.get("tier1_components") or {}
+    scene_prob = components.get("scene_analysis", {}).get("anomaly_probability", 0.0) or 0.0
+    pose_anomaly = components.get("pose_analysis", {}).get("anomaly_detected", False)
+    transcript = (components.get("audio_analysis", {}).get("transcript_text") or "").lower()
+
+    score = float(scene_prob)
+    if pose_anomaly:
+        score += 1.0
+    if any(word in transcript for word in EMERGENCY_WORDS):
+        score += 2.0
+    return -score
+
+class Tier2Job:
+    """One queued Tier 2 analysis; status is queued -> running -> done/failed/expired/dropped"""
+
+    def __init__(self, incident_key, frame, audio_input, tier1_result, on_done, priority, deadline):
+        self.incident_key = incident_key
+        self.frame = frame
+        self.audio_input = audio_input
+        self.tier1_result = tier1_result
+        self.on_done = on_done
+        self.priority = priority
+        self.deadline = deadline
+        self.submitted_at = time.time()
+        self.status = "queued"
+        self.result = None
+        self.error = None
+
+class Tier2JobQueue:
+    """Bounded priority queue + worker pool for Tier 2, with deadlines and one job per incident"""
+
+    def __init__(self, num_workers=TIER2_WORKERS, max_queue=TIER2_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._heap = []
+        self._counter = itertools.count()  # FIFO among equal priorities
+        self._active = {}  # incident_key -> job (queued or running)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._metrics = {"submitted": 0, "completed": 0, "failed": 0, "expired": 0,
+                         "dropped": 0, "deduplicated": 0, "rejected": 0}
+        self._workers = []
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker, name=f"tier2-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, incident_key, frame, audio_input, tier1_result, on_done=None, priority=None, deadline_seconds=None):
+        """Queue a Tier 2 job -> Tier2Job, or None if the incident already has one or the queue is saturated"""
+        if priority is None:
+            priority = tier2_priority(tier1_result)
+        deadline = time.time() + (TIER2_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds)
+        job = Tier2Job(incident_key, frame, audio_input, tier1_result, on_done, priority, deadline)
+        evicted = None
+
+        with self._cond:
+            if incident_key in self._active:
+                self._metrics["deduplicated"] += 1
+                return None
+
+            if len(self._heap) >= self.max_queue:
+                # Full: evict the least urgent queued job only if the new one is more urgent
+                worst = max(self._heap)
+                if worst[0] <= priority:
+                    self._metrics["rejected"] += 1
+                    return None
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                evicted = worst[2]
+                del self._active[evicted.incident_key]
+
+            heapq.heappush(self._heap, (priority, next(self._counter), job))
+            self._active[incident_key] = job
+            self._metrics["submitted"] += 1
+            self._cond.notify()
+
+        if evicted is not None:
+            print(f"⚠️ Tier 2 queue full - dropped job for {evicted.incident_key}")
+            self._finish(evicted, "dropped")
+        return job
+
+    def has_active(self, key_prefix):
+        """True while any queued/running job's incident key starts with key_prefix (e.g. a session id)"""
+        with self._cond:
+            return any(key.startswith(key_prefix) for key in self._active)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                job.status = "running"
+
+            if time.time() > job.deadline:
+                print(f"⏱️ Tier 2 job for {job.incident_key} expired after {time.time() - job.submitted_at:.1f}s in queue")
+                self._release(job)
+                self._finish(job, "expired")
+                continue
+
+            try:
+                job.result = run_tier2_continuous(job.frame, job.audio_input, job.tier1_result)
+                status = "done"
+            except Exception as e:
+                job.error = str(e)
+                print(f"❌ Tier 2 job failed: {e}")
+                print(traceback.format_exc())
+                status = "failed"
+
+            self._release(job)
+            self._finish(job, status)
+
+    def _release(self, job):
+        with self._cond:
+            if self._active.get(job.incident_key) is job:
+                del self._active[job.incident_key]
+
+    def _finish(self, job, status):
+        job.status = status
+        job.frame = None  # Free the frame as soon as the job is over
+        with self._cond:
+            key = {"done": "completed"}.get(status, status)
+            self._metrics[key] += 1
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                print(f"❌ Tier 2 result callback error: {e}")
+
+    def get_metrics(self):
+        with self._cond:
+            return {**self._metrics, "queued": len(self._heap), "active_incidents": len(self._active)}
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+tier2_jobs = Tier2JobQueue()
@@ -7,13 +7,20 @@ import traceback
 import time
 
 def run_tier2_continuous(frame, audio_input, tier1_result):
-    """Enhanced Tier 2 analysis with anomaly type detection and better reasoning"""
+    """Enhanced Tier 2 analysis with anomaly type detection and better reasoning
+
+    Audio is never re-transcribed here: the transcript cached in tier1_result is used.
+    """
     try:
+        # Audio counts as available when Tier 1 already transcribed it (the chunk file is gone by now)
+        tier1_audio = (tier1_result.get("tier1_components") or {}).get("audio_analysis", {})
+        audio_available = bool(audio_input) or bool(tier1_audio.get("available"))
+        
         # Structured logging for Tier 2 start
         tier2_log = {
             "component": "tier2_pipeline",
             "phase": "start",
-            "audio_available": bool(audio_input),
+            "audio_available": audio_available,
             "frame_available": frame is not None,
             "tier1_anomaly": tier1_result.get("result", "unknown")
         }
@@ -155,7 +162,7 @@ def run_tier2_continuous(frame, audio_input, tier1_result):
                 "audio_analysis": {
                     "full_transcript": full_transcript,
                     "audio_indicators": audio_indicators,
-                    "available": bool(audio_input),
+                    "available": audio_available,
                     "length": len(full_transcript) if full_transcript else 0
                 },
                 "visual_analysis": {
@@ -215,7 +222,7 @@ def run_tier2_continuous(frame, audio_input, tier1_result):
                     "audio_analysis": {
                         "full_transcript": full_transcript,
                         "audio_indicators": audio_indicators,
-                        "available": bool(audio_input),
+                        "available": audio_available,
                         "length": len(full_transcript) if full_transcript else 0
                     },
                     "visual_analysis": {
@@ -5,12 +5,50 @@ import os
 import pyaudio
 import wave
 import time
+import queue
+import threading
+import numpy as np
 from collections import deque
+from concurrent.futures import Future, CancelledError, TimeoutError as FuturesTimeoutError
 from threading import Thread
 from tempfile import NamedTemporaryFile
+from utils.model_runtime import configure_model, model_inference
+from utils.model_registry import model_registry
 
-whisper_tiny = whisper.load_model("tiny")
-whisper_large = whisper.load_model("tiny")
+# Both the fast path and the "large" path use Whisper tiny - one registry entry, one copy of the weights
+WHISPER_TINY_MODEL = os.getenv("WHISPER_TINY_MODEL", "tiny")
+WHISPER_LARGE_MODEL = os.getenv("WHISPER_LARGE_MODEL", "tiny")
+
+def _whisper_loader(name):
+    return lambda: configure_model("whisper", whisper.load_model(name))
+
+def _warmup_whisper(model):
+    with model_inference("whisper"):
+        model.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), fp16=False)
+
+
+# In-memory audio format expected by whisper.transcribe / log_mel_spectrogram
+WHISPER_SAMPLE_RATE = 16000
+MIN_AUDIO_SAMPLES = 500  # ~30ms - shorter chunks are noise (same cut-off as the old 1000-byte WAV check)
+
+_WHISPER_TINY_KEY = model_registry.register(f"whisper:{WHISPER_TINY_MODEL}", _whisper_loader(WHISPER_TINY_MODEL), _warmup_whisper)
+_WHISPER_LARGE_KEY = model_registry.register(f"whisper:{WHISPER_LARGE_MODEL}", _whisper_loader(WHISPER_LARGE_MODEL), _warmup_whisper,
+                                             tier=2)
+
+def get_whisper_tiny():
+    """Whisper model for live transcription, loaded on first use"""
+    return model_registry.get(_WHISPER_TINY_KEY)
+
+def get_whisper_large():
+    return model_registry.get(_WHISPER_LARGE_KEY)
+
+def pcm16_to_float32(audio_bytes):
+    """Raw 16-bit mono PCM bytes -> float32 numpy array in [-1, 1] (Whisper input format)"""
+    return np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+
+def _is_audio_array(audio):
+    """True for an in-memory numpy audio chunk (as opposed to a file path)"""
+    return isinstance(audio, np.ndarray)
 
 def cleanup_temp_audio_files():
     """Clean up old temporary audio files"""
@@ -41,6 +79,8 @@ class AudioStream:
             self.rate = 16000  # Whisper compatible
             self.stream = None
             self.buffer = deque(maxlen=16)  # Reduced from 32 to 16 for faster filling (~1 sec)
+            self.new_data = deque(maxlen=512)  # Captured but not yet consumed by get_new_samples (~32 sec)
+            self.overflow_chunks = 0  # Chunks evicted from new_data before anyone read them (lost audio)
             self.running = False
             print("AudioStream initialized successfully")
         except Exception as e:
@@ -76,6 +116,9 @@ class AudioStream:
                 if self.stream and self.stream.is_active():
                     data = self.stream.read(self.chunk, exception_on_overflow=False)
                     self.buffer.append(data)
+                    if len(self.new_data) == self.new_data.maxlen:
+                        self.overflow_chunks += 1  # The append below evicts the oldest unread chunk
+                    self.new_data.append(data)
                     chunk_count += 1
                     # Removed annoying log spam
                 else:
@@ -87,7 +130,7 @@ class AudioStream:
         print("Audio capture thread ended")
 
     def get_chunk(self):
-        """Get audio chunk with non-blocking approach and timeout handling"""
+        """Get audio chunk (16 kHz float32 numpy array, no temp file) with non-blocking approach"""
         if not self.running:
             return None
             
@@ -97,49 +140,52 @@ class AudioStream:
             return None
             
         try:
-            # Use available buffer data
-            available_chunks = list(self.buffer)
-            audio_bytes = b''.join(available_chunks)
-            
-            # Create temp directory if it doesn't exist
-            temp_dir = os.path.join(os.path.dirname(__file__), '..', 'temp_audio')
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Create temp file in the temp_audio directory
-            temp_path = os.path.join(temp_dir, f"audio_{int(time.time() * 1000)}.wav")
-            
-            # Write audio file with proper error handling
-            with wave.open(temp_path, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.p.get_sample_size(self.format))
-                wf.setframerate(self.rate)
-                wf.writeframes(audio_bytes)
-            
-            # Verify file exists and has content before returning
-            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 44:  # WAV header is 44 bytes
-                return temp_path
-            else:
-                return None
+            # Use available buffer data - stream is already 16 kHz mono int16, exactly what Whisper needs
+            audio_bytes = b''.join(list(self.buffer))
+            audio = pcm16_to_float32(audio_bytes)
+            return audio if audio.size > 0 else None
         except Exception as e:
             return None
 
+    def get_new_samples(self):
+        """Drain audio captured since the last call as 16 kHz float32 samples (None if nothing new)"""
+        if not self.running:
+            return None
+        chunks = []
+        while self.new_data:
+            try:
+                chunks.append(self.new_data.popleft())
+            except IndexError:
+                break
+        if not chunks:
+            return None
+        return pcm16_to_float32(b''.join(chunks))
+
     def stop(self):
         self.running = False
         self.stream.stop_stream()
         self.stream.close()
         self.p.terminate()
 
-def extract_audio(video_path):
+def extract_audio(video_path, audio_path="temp_audio.mp3"):
     # Existing batch function
-    audio_path = "temp_audio.mp3"
     video_clip = VideoFileClip(video_path)
-    if video_clip.audio:
-        video_clip.audio.write_audiofile(audio_path)
-        return audio_path
-    return None
+    try:
+        if video_clip.audio:
+            video_clip.audio.write_audiofile(audio_path, logger=None)
+            return audio_path
+        return None
+    finally:
+        video_clip.close()
 
 def chunk_and_transcribe_tiny(audio_path):
-    """Transcribe audio with timeout and robust error handling"""
+    """Transcribe audio with timeout and robust error handling
+
+    audio_path: file path, or a 16 kHz float32 numpy array (in-memory, no ffmpeg / disk I/O)
+    """
+    if _is_audio_array(audio_path):
+        return _transcribe_array_tiny(audio_path)
+
     if not audio_path:
         print("🎤 No audio path provided")
         return []
@@ -159,40 +205,7 @@ def chunk_and_transcribe_tiny(audio_path):
                 pass
             return []
         
-        # Use threading timeout for Windows compatibility
-        import threading
-        import queue
-        
-        result_queue = queue.Queue()
-        
-        def transcribe_with_timeout():
-            try:
-                result = whisper_tiny.transcribe(audio_path, fp16=False)
-                result_queue.put(("success", result))
-            except Exception as e:
-                result_queue.put(("error", str(e)))
-        
-        # Start transcription in a separate thread
-        transcription_thread = threading.Thread(target=transcribe_with_timeout)
-        transcription_thread.daemon = True
-        transcription_thread.start()
-        
-        try:
-            # Wait for result with 1-second timeout (reduced from 3)
-            result_type, result_data = result_queue.get(timeout=1.0)
-            
-            if result_type == "error":
-                return []
-            
-            text = result_data["text"].strip()
-            if text:
-                print(f"🎤 Audio detected: '{text}'")  # Only log when we actually get text
-                return [text]
-            else:
-                return []
-                
-        except queue.Empty:
-            return []
+        return _transcribe_with_timeout(audio_path)
         
     except Exception as e:
         print(f"🎤 Transcription error: {e}")
@@ -205,8 +218,171 @@ def chunk_and_transcribe_tiny(audio_path):
         except Exception as cleanup_error:
             pass
 
+class TranscriptionPool:
+    """Fixed-size Whisper worker pool with a bounded submit queue
+
+    submit() returns a Future. When the queue is full the OLDEST waiting job is dropped (live
+    audio: newer chunks matter more). Jobs that waited longer than their max_age, or whose
+    Future was cancelled by a caller that gave up, are skipped without running Whisper, so no
+    orphaned transcriptions pile up behind the live stream.
+    """
+    def __init__(self, get_model, num_workers=1, max_queue=4):
+        self.get_model = get_model  # Resolved per job so the model loads lazily
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.metrics = {
+            "submitted": 0, "completed": 0, "failed": 0,
+            "dropped_queue_full": 0, "skipped_stale": 0, "skipped_cancelled": 0,
+            "caller_timeouts": 0, "total_transcribe_time": 0.0
+        }
+        self.workers = []
+        for i in range(num_workers):
+            worker = Thread(target=self._worker, name=f"whisper-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.metrics[key] += amount
+
+    def submit(self, audio, max_age=None, **options):
+        """Queue audio (path or float32 array) for transcription -> Future of the whisper result
+
+        options are passed on to transcribe() (e.g. temperature, condition_on_previous_text).
+        """
+        future = Future()
+        job = (future, audio, time.time(), max_age, options)
+        self._count("submitted")
+        while True:
+            try:
+                self.jobs.put_nowait(job)
+                return future
+            except queue.Full:
+                try:
+                    stale_future = self.jobs.get_nowait()[0]
+                    stale_future.cancel()
+                    self._count("dropped_queue_full")
+                except queue.Empty:
+                    pass
+
+    def wait(self, future, timeout, queue_timeout=None):
+        """Result of a submitted job, or None after timeout/drop (the job is then cancelled/skipped)
+
+        timeout is transcription time, counted from the moment a worker starts the job; time spent
+        queued behind other jobs is bounded separately by queue_timeout (default: timeout).
+        """
+        queue_deadline = time.time() + (timeout if queue_timeout is None else queue_timeout)
+        try:
+            while True:
+                started_at = getattr(future, "started_at", None)
+                if started_at is not None:
+                    return future.result(timeout=max(0.0, started_at + timeout - time.time()))
+                remaining = queue_deadline - time.time()
+                if remaining <= 0:
+                    raise FuturesTimeoutError()
+                try:
+                    # Short slices while queued, so the run budget starts when the worker picks it up
+                    return future.result(timeout=min(remaining, 0.02))
+                except FuturesTimeoutError:
+                    continue
+        except CancelledError:
+            return None  # Dropped to make room for newer audio
+        except FuturesTimeoutError:
+            future.cancel()  # Still queued: the worker skips it; already running: it finishes unobserved
+            self._count("caller_timeouts")
+            return None
+
+    def _worker(self):
+        while True:
+            future, audio, submitted_at, max_age, options = self.jobs.get()
+            # Skip jobs whose caller already gave up or that are too old to matter
+            if not future.set_running_or_notify_cancel():
+                self._count("skipped_cancelled")
+                continue
+            if max_age is not None and time.time() - submitted_at > max_age:
+                self._count("skipped_stale")
+                future.set_result(None)
+                continue
+            started = time.time()
+            future.started_at = started  # Callers measure their timeout from here
+            try:
+                with model_inference("whisper"):
+                    result = self.get_model().transcribe(audio, fp16=False, **options)
+                self._count("completed")
+                future.set_result(result)
+            except Exception as e:
+                self._count("failed")
+                future.set_exception(e)
+            finally:
+                self._count("total_transcribe_time", time.time() - started)
+
+    def get_metrics(self):
+        """Queue depth, drop/skip counters and average transcription latency"""
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics["queue_depth"] = self.jobs.qsize()
+        metrics["workers"] = len(self.workers)
+        metrics["avg_transcribe_time"] = (
+            metrics["total_transcribe_time"] / metrics["completed"] if metrics["completed"] else 0.0
+        )
+        return metrics
+
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_QUEUE_SIZE = int(os.getenv("WHISPER_QUEUE_SIZE", "4"))
+WHISPER_TIMEOUT = float(os.getenv("WHISPER_TIMEOUT", "1.0"))  # Transcription time, from the job's start
+WHISPER_QUEUE_TIMEOUT = float(os.getenv("WHISPER_QUEUE_TIMEOUT", str(WHISPER_TIMEOUT)))  # Max wait for a free worker
+transcription_pool = TranscriptionPool(get_whisper_tiny, WHISPER_WORKERS, WHISPER_QUEUE_SIZE)
+
+def get_transcription_metrics():
+    """Metrics of the shared Whisper worker pool"""
+    return transcription_pool.get_metrics()
+
+def _transcribe_with_timeout(audio):
+    """whisper_tiny transcription (path or float32 array) via the worker pool, bounded by WHISPER_TIMEOUT -> [text]"""
+    # The job is skipped if it is still queued after WHISPER_QUEUE_TIMEOUT, instead of running orphaned
+    future = transcription_pool.submit(audio, max_age=WHISPER_QUEUE_TIMEOUT)
+    
+    try:
+        # WHISPER_TIMEOUT covers the transcription itself - queueing behind another chunk does not eat it
+        result_data = transcription_pool.wait(future, WHISPER_TIMEOUT, WHISPER_QUEUE_TIMEOUT)
+    except Exception:
+        return []
+    
+    if not result_data:
+        return []
+    
+    text = result_data["text"].strip()
+    if text:
+        print(f"🎤 Audio detected: '{text}'")  # Only log when we actually get text
+        return [text]
+    else:
+        return []
+
+def _transcribe_array_tiny(audio):
+    """In-memory path of chunk_and_transcribe_tiny: float32 16 kHz samples straight into Whisper"""
+    try:
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        if audio.size < MIN_AUDIO_SAMPLES:
+            return []
+        return _transcribe_with_timeout(audio)
+    except Exception as e:
+        print(f"🎤 Transcription error: {e}")
+        return []
+
 def transcribe_large(audio_path):
     # Enhanced version with better error handling
+    if _is_audio_array(audio_path):
+        # In-memory 16 kHz float32 samples - no file to check or clean up
+        try:
+            with model_inference("whisper"):
+                result = get_whisper_large().transcribe(np.ascontiguousarray(audio_path, dtype=np.float32), fp16=False)
+            text = result["text"].strip()
+            print(f"Large transcription result: '{text}'")
+            return text
+        except Exception as e:
+            print(f"Large transcription error: {e}")
+            return ""
+    
     if not audio_path:
         print("No audio path provided for large transcription")
         return ""
@@ -223,7 +399,8 @@ def transcribe_large(audio_path):
         
         print(f"Large transcribing audio file: {audio_path} ({file_size} bytes)")
         
-        result = whisper_large.transcribe(audio_path, fp16=False)
+        with model_inference("whisper"):
+            result = get_whisper_large().transcribe(audio_path, fp16=False)
         text = result["text"].strip()
         
         print(f"Large transcription result: '{text}'")
@@ -247,6 +424,172 @@ def transcribe_large(audio_path):
             pass
         return ""
 
+# Streaming transcription settings (seconds / dBFS)
+STREAM_WINDOW_SECONDS = float(os.getenv("AUDIO_WINDOW_SECONDS", "3.0"))
+STREAM_HOP_SECONDS = float(os.getenv("AUDIO_HOP_SECONDS", "1.0"))
+STREAM_VAD_THRESHOLD_DB = float(os.getenv("AUDIO_VAD_THRESHOLD_DB", "-45"))
+
+def _normalize_words(text):
+    """Lower-case words without punctuation, for comparing overlapping transcripts"""
+    return ["".join(ch for ch in word.lower() if ch.isalnum()) for word in text.split()]
+
+def dedupe_overlap(previous_text, new_text):
+    """Drop the leading words of new_text that repeat the tail of previous_text (window overlap)"""
+    if not previous_text or not new_text:
+        return new_text
+    previous_words = _normalize_words(previous_text)
+    new_words = new_text.split()
+    normalized_new = _normalize_words(new_text)
+
+    # Longest suffix of the previous text that is also a prefix of the new text
+    for size in range(min(len(previous_words), len(normalized_new)), 0, -1):
+        if previous_words[-size:] == normalized_new[:size]:
+            return " ".join(new_words[size:])
+    return new_text
+
+class StreamingTranscriber:
+    """Sliding-window Whisper over a ring buffer: fixed hop + overlap, energy gate, overlap dedupe
+
+    feed() takes any amount of new 16 kHz float32 audio and returns the transcript segments
+    completed by it: {"text", "start", "end", "timestamp"} with start/end in stream seconds and
+    timestamp the wall-clock time of the segment end. Every sample is transcribed as part of at
+    most window/hop windows, silent hops are skipped without running Whisper, and nothing is
+    dropped on a timeout.
+
+    With a pool (TranscriptionPool) windows are queued for the Whisper workers instead of run
+    inline, so the caller keeps draining capture while Whisper works; feed()/poll() return the
+    segments of finished windows, in window order. A window the pool drops to make room for newer
+    audio is counted in stats["dropped_windows"].
+    """
+    def __init__(self, model=None, window_seconds=None, hop_seconds=None, vad_threshold_db=None,
+                 sample_rate=WHISPER_SAMPLE_RATE, pool=None):
+        self.model = model
+        self.pool = pool
+        self.inflight = deque()  # (future, window_start, window_end) of queued windows, oldest first
+        self.sample_rate = sample_rate
+        self.window_samples = int((window_seconds or STREAM_WINDOW_SECONDS) * sample_rate)
+        self.hop_samples = min(self.window_samples, int((hop_seconds or STREAM_HOP_SECONDS) * sample_rate))
+        threshold_db = vad_threshold_db if vad_threshold_db is not None else STREAM_VAD_THRESHOLD_DB
+        self.vad_threshold = 10 ** (threshold_db / 20.0)  # dBFS -> linear RMS
+
+        self.ring = np.zeros(self.window_samples, dtype=np.float32)
+        self.write_pos = 0
+        self.samples_seen = 0  # Total samples fed (stream clock)
+        self.pending = 0  # Samples fed since the last hop
+        self.wall_start = None
+        self.last_text = ""
+        self.last_end = 0.0
+        self.stats = {"windows": 0, "silent_windows": 0, "segments": 0, "dropped_windows": 0}
+
+    def _write(self, samples):
+        """Copy samples into the ring buffer, wrapping around"""
+        for start in range(0, len(samples), self.window_samples):
+            block = samples[start:start + self.window_samples]
+            first = min(len(block), self.window_samples - self.write_pos)
+            self.ring[self.write_pos:self.write_pos + first] = block[:first]
+            self.ring[:len(block) - first] = block[first:]
+            self.write_pos = (self.write_pos + len(block)) % self.window_samples
+
+    def _window(self):
+        """Ring buffer contents in time order (oldest sample first)"""
+        return np.concatenate((self.ring[self.write_pos:], self.ring[:self.write_pos]))
+
+    def feed(self, samples):
+        """Add new audio; transcribe one window per completed hop -> list of new segments"""
+        samples = np.ascontiguousarray(samples, dtype=np.float32).reshape(-1)
+        if self.wall_start is None:
+            self.wall_start = time.time() - len(samples) / self.sample_rate
+
+        segments = []
+        offset = 0
+        while offset < len(samples):
+            take = min(len(samples) - offset, self.hop_samples - self.pending)
+            self._write(samples[offset:offset + take])
+            offset += take
+            self.pending += take
+            self.samples_seen += take
+            if self.pending >= self.hop_samples:
+                self.pending = 0
+                segments.extend(self._process_window())
+        return segments + self.poll()
+
+    def poll(self):
+        """Segments of queued windows that have finished since the last call (pool mode)"""
+        segments = []
+        while self.inflight and self.inflight[0][0].done():
+            future, window_start, window_end = self.inflight.popleft()
+            try:
+                result = future.result()
+            except CancelledError:
+                self.stats["dropped_windows"] += 1  # Evicted from a full pool queue
+                continue
+            except Exception as e:
+                print(f"🎤 Streaming transcription error: {e}")
+                continue
+            segments.extend(self._segments(result, window_start, window_end))
+        return segments
+
+    def close(self):
+        """Cancel windows still waiting for a Whisper worker"""
+        while self.inflight:
+            self.inflight.popleft()[0].cancel()
+
+    def _process_window(self):
+        """Transcribe (or queue) the current window unless its newest hop is silent"""
+        self.stats["windows"] += 1
+        window = self._window()
+        valid = min(self.samples_seen, self.window_samples)  # Stream start: only part of the ring is audio
+        window = window[-valid:]
+
+        newest_hop = window[-self.hop_samples:]
+        if float(np.sqrt(np.mean(newest_hop ** 2))) < self.vad_threshold:
+            self.stats["silent_windows"] += 1
+            return []
+
+        window_end = self.samples_seen / self.sample_rate
+        window_start = window_end - len(window) / self.sample_rate
+        if self.pool is not None:
+            # No max_age: a queued window is only ever skipped when evicted, and then it is counted
+            future = self.pool.submit(window, temperature=0.0, condition_on_previous_text=False)
+            self.inflight.append((future, window_start, window_end))
+            return []
+        try:
+            model = self.model if self.model is not None else get_whisper_tiny()
+            with model_inference("whisper"):
+                result = model.transcribe(window, fp16=False, temperature=0.0,
+                                          condition_on_previous_text=False)
+        except Exception as e:
+            print(f"🎤 Streaming transcription error: {e}")
+            return []
+        return self._segments(result, window_start, window_end)
+
+    def _segments(self, result, window_start, window_end):
+        """Whisper result of one window -> new, overlap-deduped segments on the stream clock"""
+        segments = []
+        for segment in result.get("segments", []):
+            start = window_start + float(segment["start"])
+            end = min(window_end, window_start + float(segment["end"]))
+            if end <= self.last_end:
+                continue  # Entirely inside audio that was already emitted
+            raw_text = segment["text"].strip()
+            # Compare against the previous window's full text - the overlap was transcribed twice
+            text = dedupe_overlap(self.last_text, raw_text) if start < self.last_end else raw_text
+            self.last_text = raw_text
+            if not text:
+                continue
+            segments.append({
+                "text": text,
+                "start": round(max(start, self.last_end), 2),
+                "end": round(end, 2),
+                "timestamp": self.wall_start + end
+            })
+            self.last_end = end
+
+        if segments:
+            self.stats["segments"] += len(segments)
+            print(f"🎤 Audio detected: '{' '.join(s['text'] for s in segments)}'")
+        return segments
+
 # AudioCapture alias for compatibility
 AudioCapture = AudioStream
 
@@ -263,6 +606,10 @@ class MockAudio:
     def get_chunk(self):
         """Mock method that returns None - no audio data"""
         return None
+
+    def get_new_samples(self):
+        """Mock method that returns None - no audio data"""
+        return None
     
     def stop(self):
         self.running = False
@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# ONNX Runtime backend for the Tier 1 CLIP image tower. Only the export uses torch (imported inside
+# export_clip_image_tower); the service itself still runs on torch for the text tower, Tier 2 and
+# the fallback, so this moves the per-frame image encoding off torch without removing the dependency.
+# The export is always fp32, while the text tower producing the prompt bank may be INT8-quantized
+# (model_runtime profile): the bank's "<int8|fp32>-onnx" variant key records exactly that pairing.
+CLIP_IMAGE_BACKEND = os.getenv("CLIP_IMAGE_BACKEND", "torch").lower()  # "torch" or "onnx"
+CLIP_ONNX_DIR = os.getenv(
+    "CLIP_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_cache", "onnx")
+)
+CLIP_ONNX_OPSET = int(os.getenv("CLIP_ONNX_OPSET", "17"))
+CLIP_ONNX_EXPORT_VERSION = 1  # Bump when the exported graph changes (inputs, outputs, normalization)
+
+def clip_onnx_path(model_name):
+    """Cached export path for model_name - the key changes with the export format"""
+    key = hashlib.sha256(f"{model_name}:{CLIP_ONNX_EXPORT_VERSION}:{CLIP_ONNX_OPSET}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CLIP_ONNX_DIR, f"{model_name.replace('/', '__')}_image_{key}.onnx")
+
+def _metadata_path(onnx_path):
+    return f"{onnx_path}.json"
+
+def export_clip_image_tower(model_name, model, path=None):
+    """Export the image tower (pixel_values -> L2-normalized image embeddings) once -> path"""
+    import torch
+
+    path = path or clip_onnx_path(model_name)
+
+    class ImageTower(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, pixel_values):
+            features = self.clip.get_image_features(pixel_values=pixel_values)
+            features = features if torch.is_tensor(features) else features.pooler_output
+            return features / features.norm(dim=-1, keepdim=True)
+
+    size = model.config.vision_config.image_size
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Concurrent workers never load a half-written graph
+    export_kwargs = dict(input_names=["pixel_values"], output_names=["image_embeds"],
+                         dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+                         opset_version=CLIP_ONNX_OPSET)
+    with torch.no_grad():
+        tower = ImageTower(model).eval()
+        dummy = torch.zeros(1, 3, size, size)
+        try:
+            # TorchScript exporter: no onnxscript dependency on newer torch
+            torch.onnx.export(tower, (dummy,), tmp_path, dynamo=False, **export_kwargs)
+        except TypeError:
+            torch.onnx.export(tower, (dummy,), tmp_path, **export_kwargs)
+        logit_scale = model.logit_scale.exp().item()
+
+    # Graph first, then its sidecar - both atomic, and a reader needs both files, so a crash at any
+    # point leaves either no export or a matching pair (a stale sidecar is removed up front)
+    if os.path.exists(_metadata_path(path)):
+        os.remove(_metadata_path(path))
+    os.replace(tmp_path, path)
+    tmp_metadata_path = f"{_metadata_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_metadata_path, "w") as f:
+        json.dump({"model": model_name, "logit_scale": logit_scale, "image_size": size}, f)
+    os.replace(tmp_metadata_path, _metadata_path(path))
+    print(f"💾 CLIP image tower exported to ONNX: {path}")
+    return path
+
+class OnnxClipImageEncoder:
+    """CLIP image tower on ONNX Runtime's CPU execution provider"""
+
+    def __init__(self, path, threads=1):
+        import onnxruntime as ort
+
+        with open(_metadata_path(path)) as f:
+            metadata = json.load(f)
+        self.logit_scale = float(metadata["logit_scale"])
+        self.image_size = int(metadata["image_size"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = max(1, threads)
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        print(f"⚡ ONNX Runtime CLIP image tower ready ({threads} threads): {os.path.basename(path)}")
+
+    def encode(self, pixel_values):
+        """(N, 3, H, W) float32 pixels -> normalized (N, dim) float32 features"""
+        pixel_values = np.ascontiguousarray(pixel_values, dtype=np.float32)
+        return self.session.run(None, {self.input_name: pixel_values})[0]
+
+def load_onnx_image_encoder(model_name, get_torch_model, threads=1):
+    """ORT encoder for model_name, exporting with get_torch_model() only on a cache miss"""
+    path = clip_onnx_path(model_name)
+    if not (os.path.exists(path) and os.path.exists(_metadata_path(path))):
+        print(f"🧮 No cached ONNX export for {model_name}, exporting...")
+        export_clip_image_tower(model_name, get_torch_model(), path)
+    return OnnxClipImageEncoder(path, threads)
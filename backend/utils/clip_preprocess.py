@@ -0,0 +1,141 @@
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+
+# Vectorized CLIP image preprocessing: BGR uint8 frames -> normalized CHW float32 batch without the
+# cvtColor -> PIL -> HF processor round trip. Pixels track the HF CLIPImageProcessor within
+# CLIP_PREPROCESS_TOLERANCE (checked once at load; the HF processor is used if it drifts further).
+CLIP_FAST_PREPROCESS = os.getenv("CLIP_FAST_PREPROCESS", "1") == "1"
+CLIP_PREPROCESS_TOLERANCE = float(os.getenv("CLIP_PREPROCESS_TOLERANCE", "0.05"))  # Mean |fast - HF| (normalized units)
+CLIP_PREPROCESS_MAX_BATCH = int(os.getenv("CLIP_PREPROCESS_MAX_BATCH", "16"))  # Preallocated rows per thread
+
+def to_rgb_image(image):
+    """PIL image or BGR numpy frame -> RGB PIL image (input for the HF processors)"""
+    if isinstance(image, Image.Image):
+        return image
+    if image.ndim == 2:
+        return Image.fromarray(image).convert("RGB")
+    return Image.fromarray(cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2RGB))
+
+def to_rgb_images(images):
+    return [to_rgb_image(image) for image in images]
+
+class ClipPreprocessor:
+    """HF CLIPImageProcessor equivalent on OpenCV + numpy
+
+    Resize (shortest edge, HF output size rounding) -> center crop -> rescale + normalize fused into
+    one multiply-add over the whole batch, written into a per-thread preallocated buffer. Numpy
+    frames are BGR (as read by OpenCV) and are channel-swapped during the crop copy; PIL images are RGB.
+    """
+
+    def __init__(self, size=224, crop_size=224, image_mean=(0.48145466, 0.4578275, 0.40821073),
+                 image_std=(0.26862954, 0.26130258, 0.27577711), rescale_factor=1 / 255, max_batch=CLIP_PREPROCESS_MAX_BATCH):
+        if crop_size > size:
+            raise ValueError(f"crop_size {crop_size} larger than resize target {size}")
+        self.size = int(size)
+        self.crop_size = int(crop_size)
+        image_mean = np.asarray(image_mean, dtype=np.float32)
+        image_std = np.asarray(image_std, dtype=np.float32)
+        # (x * rescale - mean) / std == x * scale + offset, per channel
+        self.scale = (rescale_factor / image_std).astype(np.float32).reshape(1, 3, 1, 1)
+        self.offset = (-image_mean / image_std).astype(np.float32).reshape(1, 3, 1, 1)
+        self.max_batch = max(1, int(max_batch))
+        self._local = threading.local()
+
+    @classmethod
+    def from_hf(cls, processor, max_batch=CLIP_PREPROCESS_MAX_BATCH):
+        """Build from an HF AutoProcessor/CLIPImageProcessor config (shortest-edge resize + square crop only)"""
+        image_processor = getattr(processor, "image_processor", processor)
+        size = image_processor.size
+        crop = image_processor.crop_size
+        if "shortest_edge" not in size or crop.get("height") != crop.get("width"):
+            raise ValueError(f"Unsupported CLIP preprocessing config: size={size}, crop_size={crop}")
+        return cls(size["shortest_edge"], crop["height"], image_processor.image_mean, image_processor.image_std,
+                   image_processor.rescale_factor, max_batch)
+
+    def _buffers(self, count):
+        """Thread-local (uint8 NHWC staging, float32 NCHW output) buffers with room for count rows"""
+        local = self._local
+        if getattr(local, "capacity", 0) < count:
+            local.capacity = max(count, self.max_batch)
+            local.staging = np.empty((local.capacity, self.crop_size, self.crop_size, 3), dtype=np.uint8)
+            local.pixels = np.empty((local.capacity, 3, self.crop_size, self.crop_size), dtype=np.float32)
+        return local.staging, local.pixels
+
+    def _resize_crop(self, image, out):
+        """One image -> center crop written into out (crop, crop, 3) in RGB order"""
+        bgr = not isinstance(image, Image.Image)
+        if not bgr:
+            image = np.asarray(image.convert("RGB") if image.mode != "RGB" else image)
+        elif image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        height, width = image.shape[:2]
+        short, long = (height, width) if height <= width else (width, height)
+        new_short, new_long = self.size, int(self.size * long / short)  # Same rounding as HF
+        new_height, new_width = (new_short, new_long) if height <= width else (new_long, new_short)
+        if (new_height, new_width) != (height, width):
+            # INTER_AREA approximates PIL's antialiased bicubic on downscale
+            interpolation = cv2.INTER_AREA if new_height < height else cv2.INTER_CUBIC
+            image = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+
+        top = (new_height - self.crop_size) // 2
+        left = (new_width - self.crop_size) // 2
+        crop = image[top:top + self.crop_size, left:left + self.crop_size, :3]
+        out[...] = crop[:, :, ::-1] if bgr else crop
+
+    def __call__(self, images):
+        """List of BGR frames / PIL images -> (N, 3, crop, crop) float32 view into this thread's buffer
+
+        The view is overwritten by the next call on the same thread - consume it (or copy) first.
+        """
+        count = len(images)
+        staging, pixels = self._buffers(count)
+        for i, image in enumerate(images):
+            self._resize_crop(image, staging[i])
+        out = pixels[:count]
+        np.multiply(staging[:count].transpose(0, 3, 1, 2), self.scale, out=out)
+        out += self.offset
+        return out
+
+    def parity(self, processor, images):
+        """Mean / max |fast - HF| pixel difference on images (normalized units)"""
+        reference = processor(images=to_rgb_images(images), return_tensors="np")["pixel_values"]
+        difference = np.abs(self(images) - reference)
+        return {"mean_abs_diff": round(float(difference.mean()), 5), "max_abs_diff": round(float(difference.max()), 5)}
+
+def _parity_frames():
+    # Smooth seeded blobs at a camera-like resolution, so the check exercises the downscale path
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, size=(2, 12, 16, 3), dtype=np.uint8)
+    return [cv2.resize(frame, (640, 480), interpolation=cv2.INTER_CUBIC) for frame in small]
+
+def load_clip_preprocessor(processor):
+    """Fast preprocessor for processor's config, or None (use the HF processor) when disabled or out of tolerance"""
+    if not CLIP_FAST_PREPROCESS:
+        return None
+    try:
+        preprocessor = ClipPreprocessor.from_hf(processor)
+        report = preprocessor.parity(processor, _parity_frames())
+    except Exception as e:
+        print(f"⚠️ Fast CLIP preprocessing unavailable ({e}), using the HF processor")
+        return None
+    if report["mean_abs_diff"] > CLIP_PREPROCESS_TOLERANCE:
+        print(f"⚠️ Fast CLIP preprocessing out of tolerance {report}, using the HF processor")
+        return None
+    print(f"⚡ Fast CLIP preprocessing enabled (vs HF processor: {report})")
+    return preprocessor
+
+_preprocessors = {}  # id(processor) -> ClipPreprocessor, or None for the HF fallback
+
+def clip_pixel_values(processor, images):
+    """BGR frames / PIL images -> (N, 3, S, S) float32 CLIP pixel values for processor's model"""
+    key = id(processor)
+    if key not in _preprocessors:
+        _preprocessors[key] = load_clip_preprocessor(processor)
+    preprocessor = _preprocessors[key]
+    if preprocessor is None:
+        return processor(images=to_rgb_images(images), return_tensors="np")["pixel_values"]
+    return preprocessor(images)
@@ -0,0 +1,104 @@
+"""
+Binary websocket frame transport
+
+Clients opt in with ?frame_protocol=binary on the websocket URL (or a
+{"type": "hello", "frame_protocol": "binary"} message on the browser stream). Everyone else
+keeps the legacy JSON messages with a base64 "frame_data" field.
+
+Binary message layout (little-endian, 24-byte header):
+    magic "AF" | version u8 | kind u8 | frame_id u32 | timestamp f64 | jpeg_len u32 | audio_len u32
+    followed by jpeg_len bytes of JPEG and audio_len bytes of 16 kHz mono PCM16 (browser -> server only)
+
+In binary mode the metadata still goes out as compact JSON, with "frame_format": "binary", and the
+binary message follows it directly - clients pair each binary frame with the metadata before it.
+The header frame_id/timestamp are 0 when the message's own values are not numeric.
+The React client (frontend/src/utils/frameProtocol.js) opts in and decodes this layout.
+"""
+import os
+import json
+import struct
+import base64
+import cv2
+import numpy as np
+
+FRAME_PROTOCOL_MAGIC = b"AF"
+FRAME_PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBBIdII")
+
+KIND_VIDEO_FRAME = 1  # Browser -> server capture (optionally with PCM audio)
+KIND_DISPLAY_FRAME = 2  # Server -> client annotated/display frame
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+DISPLAY_FRAME_SIZE = (640, 480)
+DISPLAY_JPEG_QUALITY = int(os.getenv("DISPLAY_JPEG_QUALITY", "80"))
+
+def negotiate_protocol(query_params):
+    """Binary only when the client asked for it - old clients never send the parameter"""
+    requested = (query_params.get("frame_protocol") or PROTOCOL_JSON).lower()
+    return PROTOCOL_BINARY if requested == PROTOCOL_BINARY else PROTOCOL_JSON
+
+def _header_number(value, cast):
+    """Numeric header field from a message value; non-numeric ids/timestamps ("unknown", ISO strings) -> 0"""
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return cast(0)
+
+def pack_frame(jpeg_bytes, frame_id, timestamp, kind=KIND_DISPLAY_FRAME, audio_bytes=b""):
+    """Header + JPEG (+ PCM) in one binary websocket message"""
+    header = FRAME_HEADER.pack(FRAME_PROTOCOL_MAGIC, FRAME_PROTOCOL_VERSION, kind,
+                               _header_number(frame_id, int) & 0xFFFFFFFF, _header_number(timestamp, float),
+                               len(jpeg_bytes), len(audio_bytes))
+    return b"".join((header, jpeg_bytes, audio_bytes))
+
+def unpack_frame(message):
+    """Binary message -> dict(kind, frame_id, timestamp, jpeg, audio); ValueError if malformed"""
+    if len(message) < FRAME_HEADER.size:
+        raise ValueError(f"Binary frame too short: {len(message)} bytes")
+    magic, version, kind, frame_id, timestamp, jpeg_len, audio_len = FRAME_HEADER.unpack_from(message)
+    if magic != FRAME_PROTOCOL_MAGIC or version != FRAME_PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported binary frame (magic={magic!r}, version={version})")
+    if FRAME_HEADER.size + jpeg_len + audio_len > len(message):
+        raise ValueError("Binary frame payload truncated")
+
+    payload = memoryview(message)[FRAME_HEADER.size:]
+    return {
+        "kind": kind,
+        "frame_id": frame_id,
+        "timestamp": timestamp,
+        "jpeg": payload[:jpeg_len],
+        "audio": payload[jpeg_len:jpeg_len + audio_len].tobytes()
+    }
+
+def decode_jpeg(jpeg):
+    """JPEG bytes (or memoryview) -> BGR frame, None if undecodable"""
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+def encode_display_frame(frame, size=DISPLAY_FRAME_SIZE, quality=DISPLAY_JPEG_QUALITY):
+    """Resize + JPEG-encode a frame for display -> bytes, None on failure"""
+    if size is not None:
+        frame = cv2.resize(frame, size)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
+
+async def send_frame_message(websocket, message, jpeg_bytes, protocol=PROTOCOL_JSON):
+    """Send a result plus its display frame in the negotiated format
+
+    json:   one text message, frame inlined as base64 "frame_data" (legacy clients)
+    binary: compact JSON metadata, then the JPEG in a binary message with the same frame_id
+    """
+    if jpeg_bytes is None:
+        await websocket.send_json(message)
+        return
+
+    if protocol != PROTOCOL_BINARY:
+        await websocket.send_json({**message, "frame_data": base64.b64encode(jpeg_bytes).decode('utf-8')})
+        return
+
+    frame_id = message.get("frame_id", 0) or 0
+    timestamp = message.get("timestamp", 0.0) or 0.0
+    await websocket.send_text(json.dumps({**message, "frame_format": PROTOCOL_BINARY},
+                                         separators=(",", ":"), ensure_ascii=False))
+    await websocket.send_bytes(pack_frame(jpeg_bytes, frame_id, timestamp))
@@ -0,0 +1,93 @@
+import os
+import queue
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+# Dedicated executors so model calls never run on the asyncio event loop.
+# Tier 2 (BLIP + Groq reasoning) is not run here: every app submits it to tier2.tier2_jobs, whose
+# prioritized worker pool keeps it off the Tier 1 lanes.
+INFERENCE_TIER1_WORKERS = int(os.getenv("INFERENCE_TIER1_WORKERS", "4"))
+INFERENCE_IO_WORKERS = int(os.getenv("INFERENCE_IO_WORKERS", "2"))
+RESULT_BRIDGE_SIZE = int(os.getenv("RESULT_BRIDGE_SIZE", "4"))
+
+class ResultBridge:
+    """Moves items from a thread queue.Queue onto an asyncio.Queue that a websocket handler can await"""
+
+    def __init__(self, source_queue, loop, maxsize=RESULT_BRIDGE_SIZE):
+        self.source_queue = source_queue
+        self.loop = loop
+        self.results = asyncio.Queue(maxsize=maxsize)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        """Blocking side: wait on the pipeline queue, then hand the item to the event loop"""
+        while not self._stop_event.is_set():
+            try:
+                item = self.source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                # Waits while the asyncio queue is full, so back-pressure reaches the pipeline
+                put = asyncio.run_coroutine_threadsafe(self.results.put(item), self.loop)
+                while not self._stop_event.is_set():
+                    try:
+                        put.result(timeout=0.5)
+                        break
+                    except FuturesTimeoutError:
+                        continue
+                else:
+                    put.cancel()
+            except RuntimeError:
+                # Event loop closed - the handler is gone
+                break
+
+    async def get(self, timeout=None):
+        """Next item; raises queue.Empty on timeout (same contract as queue.Queue.get)"""
+        try:
+            return await asyncio.wait_for(self.results.get(), timeout)
+        except asyncio.TimeoutError:
+            raise queue.Empty
+
+    def get_nowait(self):
+        try:
+            return self.results.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def close(self):
+        self._stop_event.set()
+
+class InferenceGateway:
+    """Async front door for blocking inference: handlers await results, the event loop never blocks"""
+
+    def __init__(self):
+        self._executors = {
+            "tier1": ThreadPoolExecutor(max_workers=INFERENCE_TIER1_WORKERS, thread_name_prefix="tier1"),
+            "io": ThreadPoolExecutor(max_workers=INFERENCE_IO_WORKERS, thread_name_prefix="inference-io")
+        }
+
+    async def run(self, fn, *args, lane="tier1", **kwargs):
+        """Run fn(*args, **kwargs) on the lane's executor and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executors[lane], functools.partial(fn, *args, **kwargs))
+
+    async def run_tier1(self, fn, *args, **kwargs):
+        return await self.run(fn, *args, lane="tier1", **kwargs)
+
+    async def run_io(self, fn, *args, **kwargs):
+        """Disk writes (cv2.imwrite etc.)"""
+        return await self.run(fn, *args, lane="io", **kwargs)
+
+    def bridge(self, source_queue, maxsize=RESULT_BRIDGE_SIZE):
+        """Await items from a pipeline queue via an asyncio.Queue - call close() when the handler exits"""
+        return ResultBridge(source_queue, asyncio.get_running_loop(), maxsize)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+inference_gateway = InferenceGateway()
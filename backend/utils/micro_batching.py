@@ -0,0 +1,84 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+class MicroBatchServer:
+    """Collects single-item requests from many callers into one batched model call
+
+    The first request opens a window of window_ms; everything that arrives before it closes
+    (up to max_batch items) runs in a single batch_fn call, and row i of the result goes back to
+    caller i's future. One server thread owns the model, so concurrent sessions never contend on it.
+    """
+
+    def __init__(self, batch_fn, max_batch=16, window_ms=5.0, name="micro-batch"):
+        self.batch_fn = batch_fn  # list of items -> sequence with one result per item
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.name = name
+        self._requests = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"requests": 0, "batches": 0, "max_batch_seen": 0, "errors": 0}
+
+    def _ensure_started(self):
+        # Lazy start: importing the module (e.g. in offline worker processes) spawns no thread
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._serve, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item):
+        """Queue one item -> Future resolving to its row of the batched result"""
+        self._ensure_started()
+        future = Future()
+        self._requests.put((item, future))
+        return future
+
+    def infer(self, item, timeout=None):
+        """Blocking submit(): wait for this item's result"""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                with self._metrics_lock:
+                    self._metrics["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._metrics_lock:
+                self._metrics["requests"] += len(batch)
+                self._metrics["batches"] += 1
+                self._metrics["max_batch_seen"] = max(self._metrics["max_batch_seen"], len(batch))
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["avg_batch_size"] = round(metrics["requests"] / metrics["batches"], 2) if metrics["batches"] else 0.0
+        metrics["pending"] = self._requests.qsize()
+        return metrics
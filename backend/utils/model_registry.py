@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+import traceback
+
+# Models load on first use or in the background warmup - never at import time
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "1") == "1"
+
+class ModelRegistry:
+    """Loads each distinct model artifact once, lazily, and tracks readiness
+
+    register(key, loader, warmup) is cheap and idempotent: registering the same key again (e.g.
+    clip and clip_large pointing at the same checkpoint) reuses the first entry, so duplicate
+    names share one copy of the weights. get(key) loads on first use; warmup() loads every
+    registered model in a background thread and runs its dummy inference, after which
+    is_ready() turns True. Each model is tagged with the tier that needs it: Tier 1 models warm
+    first and is_ready(tier=1) alone gates live traffic; Tier 2 keeps warming behind it.
+    """
+
+    def __init__(self):
+        self._entries = {}  # key -> {"loader", "warmup", "tier", "status", "value", "error", "load_seconds"}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+
+    def register(self, key, loader, warmup=None, tier=1):
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = {"loader": loader, "warmup": warmup, "tier": tier, "status": "registered",
+                                      "value": None, "error": None, "load_seconds": None,
+                                      "lock": threading.Lock()}
+            else:
+                # Shared artifact: it belongs to the earliest tier that uses it
+                self._entries[key]["tier"] = min(self._entries[key]["tier"], tier)
+        return key
+
+    def get(self, key):
+        """The loaded model for key, loading it now if nobody has yet"""
+        entry = self._entries[key]
+        if entry["status"] in ("loaded", "ready"):
+            return entry["value"]
+        with entry["lock"]:  # One loader per artifact; other callers wait for it
+            if entry["status"] not in ("loaded", "ready"):
+                entry["status"] = "loading"
+                started = time.time()
+                try:
+                    entry["value"] = entry["loader"]()
+                except Exception as e:
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                    raise
+                entry["load_seconds"] = round(time.time() - started, 2)
+                entry["status"] = "loaded"
+                print(f"📦 Model loaded: {key} ({entry['load_seconds']}s)")
+        return entry["value"]
+
+    def _warm(self, key):
+        entry = self._entries[key]
+        try:
+            value = self.get(key)
+            if entry["warmup"] and entry["status"] != "ready":
+                entry["warmup"](value)
+            entry["status"] = "ready"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            print(f"❌ Model warmup failed for {key}: {e}")
+            print(traceback.format_exc())
+
+    def warmup(self, background=True):
+        """Load + dummy-infer every registered model (in a daemon thread by default)"""
+        if not MODEL_WARMUP_ENABLED:
+            return
+        def run():
+            started = time.time()
+            # Tier 1 first, so readiness does not wait on the Tier 2 models
+            keys = list(self._entries)
+            for key in [key for key in keys if self._entries[key]["tier"] == 1]:
+                self._warm(key)
+            print(f"🔥 Tier 1 models warmed in {time.time() - started:.1f}s - ready={self.is_ready(tier=1)}")
+            for key in [key for key in keys if self._entries[key]["tier"] != 1]:
+                self._warm(key)
+            print(f"🔥 Model warmup finished in {time.time() - started:.1f}s - ready={self.is_ready()}")
+        if not background:
+            run()
+            return
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+                self._warmup_thread.start()
+
+    def is_ready(self, keys=None, tier=None):
+        """True once the given models (default: every registered one, or every one of tier) are loaded and warmed
+
+        Always True in lazy-only mode, where the first call loads the model.
+        """
+        if not MODEL_WARMUP_ENABLED:
+            return True
+        if keys is not None:
+            entries = [self._entries[key] for key in keys]
+        else:
+            entries = [entry for entry in self._entries.values() if tier is None or entry["tier"] == tier]
+        return bool(self._entries) and all(entry["status"] == "ready" for entry in entries)
+
+    def get_status(self, tier=None):
+        return {key: {"status": entry["status"], "tier": entry["tier"], "load_seconds": entry["load_seconds"],
+                      "error": entry["error"]}
+                for key, entry in self._entries.items() if tier is None or entry["tier"] == tier}
+
+model_registry = ModelRegistry()
@@ -0,0 +1,132 @@
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+import torch
+
+# Central runtime for every torch model call (CLIP, BLIP, Whisper): inference mode, thread budget,
+# optional bfloat16 autocast and channels-last layout, configured per model family
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", str(max(1, (os.cpu_count() or 1) // 4))))
+MODEL_INTEROP_THREADS = int(os.getenv("MODEL_INTEROP_THREADS", "1"))
+
+# Opt-in quantized profile: MODEL_PROFILE=int8 quantizes every family, <PREFIX>_QUANTIZE=int8|none overrides one
+MODEL_PROFILE = os.getenv("MODEL_PROFILE", "fp32").lower()
+
+# Submodules whose Linear layers get dynamic INT8 weights (activations are quantized on the fly)
+QUANTIZE_TARGETS = {
+    "clip": ("vision_model", "text_model", "visual_projection", "text_projection"),
+    "blip": ("text_decoder",),
+    "whisper": ("encoder", "decoder")
+}
+
+def _model_config(prefix):
+    return {
+        "threads": int(os.getenv(f"{prefix}_THREADS", str(MODEL_THREADS))),
+        "bf16": os.getenv(f"{prefix}_BF16", "0") == "1",
+        "channels_last": os.getenv(f"{prefix}_CHANNELS_LAST", "0") == "1",
+        "quantize": os.getenv(f"{prefix}_QUANTIZE", "int8" if MODEL_PROFILE == "int8" else "none").lower() == "int8"
+    }
+
+MODEL_RUNTIME_CONFIG = {
+    "clip": _model_config("CLIP"),
+    "blip": _model_config("BLIP"),
+    "whisper": _model_config("WHISPER")
+}
+
+_thread_state = threading.local()
+_thread_cap = None  # Set in worker processes that own only a slice of the machine
+
+try:
+    # Inter-op parallelism only adds threads on top of our own executors; must be set before first use
+    torch.set_num_interop_threads(MODEL_INTEROP_THREADS)
+except RuntimeError:
+    pass
+
+def get_model_config(name):
+    return MODEL_RUNTIME_CONFIG.get(name, {"threads": MODEL_THREADS, "bf16": False, "channels_last": False,
+                                           "quantize": False})
+
+def cap_thread_budgets(max_threads):
+    """Never give any model more than max_threads (e.g. per offline worker process)"""
+    global _thread_cap
+    _thread_cap = max(1, int(max_threads))
+    torch.set_num_threads(_thread_cap)
+
+def _apply_thread_budget(threads):
+    # With torch's OpenMP backend the intra-op thread count is per calling thread, so each
+    # executor thread keeps the budget of the model it last ran and only changes it on a switch
+    if _thread_cap is not None:
+        threads = min(threads, _thread_cap)
+    if threads > 0 and getattr(_thread_state, "threads", None) != threads:
+        torch.set_num_threads(threads)
+        _thread_state.threads = threads
+
+def _as_plain_linear(linear):
+    """nn.Linear subclasses (e.g. Whisper's dtype-casting Linear) -> plain nn.Linear sharing the same
+    parameters, since quantize_dynamic only matches the exact nn.Linear type"""
+    if type(linear) is torch.nn.Linear:
+        return linear
+    plain = torch.nn.Linear(linear.in_features, linear.out_features, bias=linear.bias is not None)
+    plain.weight = linear.weight
+    plain.bias = linear.bias
+    return plain
+
+def _plain_linear_layers(module):
+    for child_name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear):
+            setattr(module, child_name, _as_plain_linear(child))
+        else:
+            _plain_linear_layers(child)
+
+def quantize_int8(name, model):
+    """Dynamic INT8 quantization of the Linear layers in the family's QUANTIZE_TARGETS -> the model"""
+    targets = [target for target in QUANTIZE_TARGETS.get(name, ()) if getattr(model, target, None) is not None]
+    for target in targets:
+        submodule = getattr(model, target)
+        if isinstance(submodule, torch.nn.Linear):
+            setattr(model, target, _as_plain_linear(submodule))
+        else:
+            _plain_linear_layers(submodule)
+    qconfig_spec = {target: torch.ao.quantization.default_dynamic_qconfig for target in targets}
+    # Linear only: embeddings/convs inside the targets keep their float weights
+    mapping = {torch.nn.Linear: torch.ao.nn.quantized.dynamic.Linear}
+    return torch.ao.quantization.quantize_dynamic(model, qconfig_spec, dtype=torch.qint8, mapping=mapping, inplace=True)
+
+def configure_model(name, model, quantize=None):
+    """Prepare a freshly loaded model for inference under its runtime config -> the model
+
+    quantize overrides the configured INT8 setting (the parity check loads both variants).
+    """
+    model.eval()
+    if quantize is None:
+        quantize = get_model_config(name)["quantize"]
+    if quantize:
+        model = quantize_int8(name, model)
+    if get_model_config(name)["channels_last"]:
+        model = model.to(memory_format=torch.channels_last)
+    print(f"⚙️ Model runtime [{name}]: {dict(get_model_config(name), quantize=bool(quantize))}")
+    return model
+
+def prepare_pixels(name, pixel_values):
+    """Match the image batch layout to the model (channels-last when enabled)"""
+    if get_model_config(name)["channels_last"] and pixel_values.dim() == 4:
+        return pixel_values.contiguous(memory_format=torch.channels_last)
+    return pixel_values
+
+@contextmanager
+def model_inference(name):
+    """Wrap one model call: inference mode + thread budget + optional bf16 autocast"""
+    config = get_model_config(name)
+    _apply_thread_budget(config["threads"])
+    # INT8 dynamic kernels take float32 activations, so quantized models never run under bf16 autocast
+    use_bf16 = config["bf16"] and not config["quantize"]
+    autocast = torch.autocast("cpu", dtype=torch.bfloat16) if use_bf16 else nullcontext()
+    with torch.inference_mode(), autocast:
+        yield
+
+def get_runtime_stats():
+    return {
+        "torch_threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "thread_cap": _thread_cap,
+        "models": {name: dict(config) for name, config in MODEL_RUNTIME_CONFIG.items()}
+    }
@@ -0,0 +1,70 @@
+import os
+import time
+import cv2
+import numpy as np
+
+# Tier 1 pre-filter: static frames skip CLIP and pose and reuse the last Tier 1 result
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") == "1"
+MOTION_GATE_METHOD = os.getenv("MOTION_GATE_METHOD", "diff")  # "diff" (frame differencing) or "mog2"
+MOTION_GATE_THRESHOLD = float(os.getenv("MOTION_GATE_THRESHOLD", "3.0"))  # Mean abs grey diff (0-255)
+MOTION_GATE_FOREGROUND_RATIO = float(os.getenv("MOTION_GATE_FOREGROUND_RATIO", "0.005"))  # MOG2 moving-pixel share
+MOTION_GATE_MIN_REFRESH = float(os.getenv("MOTION_GATE_MIN_REFRESH", "2.0"))  # Seconds between forced full runs
+MOTION_GATE_SIZE = (64, 48)
+
+class MotionGate:
+    """Cheap change detector on a downscaled grey frame - one per stream
+
+    is_static() is True only when nothing changed since the last frame that went through Tier 1
+    and that frame is younger than min_refresh seconds, so every stream is fully re-analysed
+    at least once per refresh interval.
+    """
+
+    def __init__(self, method=MOTION_GATE_METHOD, threshold=MOTION_GATE_THRESHOLD,
+                 foreground_ratio=MOTION_GATE_FOREGROUND_RATIO, min_refresh=MOTION_GATE_MIN_REFRESH,
+                 enabled=MOTION_GATE_ENABLED):
+        self.method = method
+        self.threshold = threshold
+        self.foreground_ratio = foreground_ratio
+        self.min_refresh = min_refresh
+        self.enabled = enabled
+        self._reference = None  # Thumbnail of the last frame that was let through (diff method)
+        self._last_refresh = None
+        self._subtractor = None
+        if method == "mog2":
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+        self.stats = {"frames": 0, "static": 0, "motion": 0, "refresh": 0}
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, MOTION_GATE_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)  # Suppress sensor noise
+
+    def _changed(self, thumbnail):
+        if self.method == "mog2":
+            # The background model learns from every frame; motion = share of foreground pixels
+            foreground = self._subtractor.apply(thumbnail)
+            return np.count_nonzero(foreground) / foreground.size >= self.foreground_ratio
+        if self._reference is None:
+            return True
+        return float(np.mean(cv2.absdiff(thumbnail, self._reference))) >= self.threshold
+
+    def is_static(self, frame, timestamp=None, force=False):
+        """True if this frame can reuse the previous result; force lets it through as a refresh"""
+        if not self.enabled or frame is None:
+            return False
+        now = timestamp if timestamp is not None else time.time()
+        self.stats["frames"] += 1
+
+        thumbnail = self._thumbnail(frame)
+        changed = self._changed(thumbnail)
+        overdue = force or self._last_refresh is None or now - self._last_refresh >= self.min_refresh
+
+        if changed or overdue:
+            self.stats["motion" if changed else "refresh"] += 1
+            self._reference = thumbnail
+            self._last_refresh = now
+            return False
+
+        self.stats["static"] += 1
+        return True
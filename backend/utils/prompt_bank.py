@@ -0,0 +1,55 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# On-disk cache of normalized CLIP text embeddings for the constant SOTA_* prompt lists
+PROMPT_BANK_DIR = os.getenv(
+    "PROMPT_BANK_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_cache", "prompt_bank")
+)
+
+def prompt_bank_key(model_name, prompts, variant="fp32"):
+    """Stable key for a (model, variant, prompt list) - changes whenever any prompt text changes
+
+    variant names the runtime profile that encoded the bank (e.g. "int8-torch"), so banks from
+    quantized and fp32 text towers are never reused for each other.
+    """
+    payload = json.dumps({"model": model_name, "variant": variant, "prompts": list(prompts)}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def prompt_bank_path(model_name, prompts, variant="fp32"):
+    """Path of the .npy file holding the embeddings for this model, variant and prompt list"""
+    safe_model = model_name.replace("/", "__")
+    return os.path.join(PROMPT_BANK_DIR, f"{safe_model}_{variant}_{prompt_bank_key(model_name, prompts, variant)}.npy")
+
+def load_prompt_bank(model_name, prompts, encode_fn, variant="fp32"):
+    """Memory-mapped (num_prompts, dim) float32 text embeddings, computed with encode_fn on a cache miss"""
+    path = prompt_bank_path(model_name, prompts, variant)
+
+    if os.path.exists(path):
+        try:
+            bank = np.load(path, mmap_mode="r")
+            if bank.ndim == 2 and bank.shape[0] == len(prompts):
+                print(f"📚 Prompt bank loaded: {os.path.basename(path)} {bank.shape}")
+                return bank
+            print(f"⚠️ Prompt bank shape mismatch {bank.shape}, recomputing")
+        except Exception as e:
+            print(f"⚠️ Prompt bank unreadable ({e}), recomputing")
+
+    print(f"🧮 Computing prompt bank for {model_name} ({len(prompts)} prompts)...")
+    features = np.ascontiguousarray(encode_fn(list(prompts)), dtype=np.float32)
+    features /= np.linalg.norm(features, axis=-1, keepdims=True)
+
+    try:
+        os.makedirs(PROMPT_BANK_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent workers never read a half-written bank
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, features)
+        os.replace(tmp_path, path)
+        print(f"💾 Prompt bank saved: {path}")
+        return np.load(path, mmap_mode="r")
+    except Exception as e:
+        print(f"⚠️ Could not persist prompt bank ({e}), using in-memory embeddings")
+        return features
@@ -0,0 +1,180 @@
+"""
+INT8 parity check - score drift of the quantized profile against the fp32 path
+
+Run offline (it loads its own fp32 + INT8 copies, independent of the model registry):
+    python -m utils.quantization_parity [samples_dir] [--models clip,blip,whisper] [--limit 16]
+
+samples_dir holds images (.jpg/.png), videos (middle frame is used) and audio (.wav/.mp3).
+Without images, seeded synthetic frames are used so the check always runs.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import difflib
+import argparse
+import numpy as np
+import cv2
+from PIL import Image
+from utils.model_runtime import configure_model, model_inference
+from utils.scene_processing import (CLIP_MODEL_NAME, BLIP_MODEL_NAME, ALL_SCENE_PROMPTS, _text_encoder,
+                                    _image_encoder_features, _softmax, evaluate_scene_categories)
+from utils.audio_processing import WHISPER_TINY_MODEL
+
+QUANT_PARITY_SAMPLES_DIR = os.getenv("QUANT_PARITY_SAMPLES_DIR", "anomaly_frames")
+QUANT_PARITY_MAX_PROB_DRIFT = float(os.getenv("QUANT_PARITY_MAX_PROB_DRIFT", "0.02"))  # Mean |p_fp32 - p_int8|
+QUANT_PARITY_MIN_AGREEMENT = float(os.getenv("QUANT_PARITY_MIN_AGREEMENT", "0.95"))  # Decisions/captions/transcripts
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".m4a")
+
+def load_parity_samples(samples_dir=None, limit=16):
+    """-> (list of PIL images, list of audio paths, synthetic flag)"""
+    samples_dir = samples_dir or QUANT_PARITY_SAMPLES_DIR
+    images, audio_paths = [], []
+    if os.path.isdir(samples_dir):
+        for filename in sorted(os.listdir(samples_dir)):
+            path = os.path.join(samples_dir, filename)
+            extension = os.path.splitext(filename)[1].lower()
+            if extension in IMAGE_EXTENSIONS and len(images) < limit:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    images.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+            elif extension in VIDEO_EXTENSIONS and len(images) < limit:
+                cap = cv2.VideoCapture(path)
+                cap.set(cv2.CAP_PROP_POS_FRAMES, cap.get(cv2.CAP_PROP_FRAME_COUNT) // 2)
+                ret, frame = cap.read()
+                cap.release()
+                if ret:
+                    images.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+            elif extension in AUDIO_EXTENSIONS and len(audio_paths) < limit:
+                audio_paths.append(path)
+
+    synthetic = not images
+    if synthetic:
+        # Smooth random blobs rather than white noise, so CLIP/BLIP see image-like statistics
+        rng = np.random.default_rng(0)
+        for _ in range(limit):
+            small = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+            images.append(Image.fromarray(cv2.resize(small, (224, 224), interpolation=cv2.INTER_CUBIC)))
+    return images, audio_paths, synthetic
+
+def _agreement(a, b):
+    return float(np.mean([x == y for x, y in zip(a, b)])) if a else 1.0
+
+def _text_similarity(a, b):
+    return float(np.mean([difflib.SequenceMatcher(None, x, y).ratio() for x, y in zip(a, b)])) if a else 1.0
+
+def check_clip_parity(images):
+    """Scene logits/probabilities and per-category decisions, fp32 vs INT8"""
+    from transformers import AutoProcessor, CLIPModel
+    processor = AutoProcessor.from_pretrained(CLIP_MODEL_NAME)
+    fp32 = configure_model("clip", CLIPModel.from_pretrained(CLIP_MODEL_NAME), quantize=False)
+    int8 = configure_model("clip", copy.deepcopy(fp32), quantize=True)
+
+    outputs = {}
+    for label, model in (("fp32", fp32), ("int8", int8)):
+        text_features = np.asarray(_text_encoder(processor, model)(list(ALL_SCENE_PROMPTS)), dtype=np.float32)
+        text_features /= np.linalg.norm(text_features, axis=-1, keepdims=True)
+        started = time.perf_counter()
+        image_features = _image_encoder_features(processor, model, images)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(images)
+        outputs[label] = (model.logit_scale.exp().item() * (image_features @ text_features.T), elapsed_ms)
+
+    (fp32_logits, fp32_ms), (int8_logits, int8_ms) = outputs["fp32"], outputs["int8"]
+    fp32_probs, int8_probs = _softmax(fp32_logits), _softmax(int8_logits)
+    fp32_decisions = [{name: d["detected"] for name, d in evaluate_scene_categories(row).items()} for row in fp32_logits]
+    int8_decisions = [{name: d["detected"] for name, d in evaluate_scene_categories(row).items()} for row in int8_logits]
+    mean_prob_drift = float(np.mean(np.abs(fp32_probs - int8_probs)))
+    decision_agreement = _agreement(fp32_decisions, int8_decisions)
+
+    return {
+        "samples": len(images),
+        "max_logit_drift": round(float(np.max(np.abs(fp32_logits - int8_logits))), 4),
+        "mean_prob_drift": round(mean_prob_drift, 5),
+        "top1_agreement": _agreement(list(fp32_probs.argmax(axis=1)), list(int8_probs.argmax(axis=1))),
+        "decision_agreement": decision_agreement,
+        "fp32_ms_per_image": round(fp32_ms, 2),
+        "int8_ms_per_image": round(int8_ms, 2),
+        "within_tolerance": mean_prob_drift <= QUANT_PARITY_MAX_PROB_DRIFT and decision_agreement >= QUANT_PARITY_MIN_AGREEMENT
+    }
+
+def check_blip_parity(images):
+    """Greedy captions, fp32 vs INT8 text decoder"""
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+    fp32 = configure_model("blip", BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME), quantize=False)
+    int8 = configure_model("blip", copy.deepcopy(fp32), quantize=True)
+
+    inputs = processor(images=images, return_tensors="pt")
+    captions, timings = {}, {}
+    for label, model in (("fp32", fp32), ("int8", int8)):
+        started = time.perf_counter()
+        with model_inference("blip"):
+            generated_ids = model.generate(**inputs, max_length=30)
+        timings[label] = (time.perf_counter() - started) * 1000 / len(images)
+        captions[label] = processor.batch_decode(generated_ids, skip_special_tokens=True)
+
+    exact_match = _agreement(captions["fp32"], captions["int8"])
+    return {
+        "samples": len(images),
+        "caption_exact_match": exact_match,
+        "caption_similarity": round(_text_similarity(captions["fp32"], captions["int8"]), 4),
+        "fp32_ms_per_image": round(timings["fp32"], 2),
+        "int8_ms_per_image": round(timings["int8"], 2),
+        "within_tolerance": exact_match >= QUANT_PARITY_MIN_AGREEMENT
+    }
+
+def check_whisper_parity(audio_paths):
+    """Greedy transcripts, fp32 vs INT8 encoder/decoder (skipped without audio samples)"""
+    if not audio_paths:
+        return {"samples": 0, "skipped": "no audio samples"}
+    import whisper
+    fp32 = configure_model("whisper", whisper.load_model(WHISPER_TINY_MODEL), quantize=False)
+    int8 = configure_model("whisper", copy.deepcopy(fp32), quantize=True)
+
+    audio = [whisper.load_audio(path) for path in audio_paths]
+    transcripts, timings = {}, {}
+    for label, model in (("fp32", fp32), ("int8", int8)):
+        started = time.perf_counter()
+        with model_inference("whisper"):
+            transcripts[label] = [model.transcribe(clip, fp16=False, temperature=0.0)["text"].strip() for clip in audio]
+        timings[label] = (time.perf_counter() - started) * 1000 / len(audio)
+
+    similarity = _text_similarity(transcripts["fp32"], transcripts["int8"])
+    return {
+        "samples": len(audio),
+        "transcript_exact_match": _agreement(transcripts["fp32"], transcripts["int8"]),
+        "transcript_similarity": round(similarity, 4),
+        "fp32_ms_per_clip": round(timings["fp32"], 2),
+        "int8_ms_per_clip": round(timings["int8"], 2),
+        "within_tolerance": similarity >= QUANT_PARITY_MIN_AGREEMENT
+    }
+
+def run_parity_check(samples_dir=None, models=("clip", "blip", "whisper"), limit=16):
+    """Drift report of the INT8 profile against fp32 for each requested model family"""
+    images, audio_paths, synthetic = load_parity_samples(samples_dir, limit)
+    report = {"samples_dir": samples_dir or QUANT_PARITY_SAMPLES_DIR, "synthetic_images": synthetic}
+    checks = {"clip": lambda: check_clip_parity(images), "blip": lambda: check_blip_parity(images),
+              "whisper": lambda: check_whisper_parity(audio_paths)}
+    for name in models:
+        print(f"🔬 INT8 parity check: {name}...")
+        try:
+            report[name] = checks[name]()
+        except Exception as e:
+            report[name] = {"error": str(e)}
+        status = report[name].get("within_tolerance")
+        print(f"{'✅' if status else '⚠️'} {name}: {report[name]}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score drift of the INT8 model profile against fp32")
+    parser.add_argument("samples_dir", nargs="?", default=None)
+    parser.add_argument("--models", default="clip,blip,whisper")
+    parser.add_argument("--limit", type=int, default=16)
+    args = parser.parse_args()
+    result = run_parity_check(args.samples_dir, [m.strip() for m in args.models.split(",") if m.strip()], args.limit)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if all(r.get("within_tolerance", "error" not in r) for r in result.values() if isinstance(r, dict)) else 1)
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+
+# Per-session analysis rate: Tier 1 latency and queue depth steer how many frames get analysed
+ANALYSIS_TARGET_FPS = float(os.getenv("ANALYSIS_TARGET_FPS", "6.0"))  # Frames/sec sent to Tier 1 when there is headroom
+ANALYSIS_MIN_FPS = float(os.getenv("ANALYSIS_MIN_FPS", "0.5"))  # Never analyse less often than this
+TIER1_LATENCY_SLO = float(os.getenv("TIER1_LATENCY_SLO", "0.5"))  # Seconds per Tier 1 call before backing off
+RATE_QUEUE_HIGH = float(os.getenv("RATE_QUEUE_HIGH", "0.5"))  # Queue fill ratio that forces a back-off
+RATE_QUEUE_LOW = float(os.getenv("RATE_QUEUE_LOW", "0.2"))  # Queue fill ratio below which the rate may grow
+RATE_ADJUST_INTERVAL = float(os.getenv("RATE_ADJUST_INTERVAL", "0.5"))  # Seconds between rate changes
+RATE_DECREASE_FACTOR = 0.7
+RATE_LATENCY_ALPHA = 0.3  # EWMA weight of the newest latency sample
+
+class AdaptiveRateController:
+    """AIMD controller for one session's analysis rate
+
+    The consumer reports every Tier 1 latency together with the current queue fill; the
+    producer asks for the capture stride (or should_analyze() for time-based sources).
+    Latency above the SLO or a filling queue cuts the rate multiplicatively, headroom on both
+    grows it back additively up to target_fps. The rate is also capped at what one consumer can
+    sustain (1 / latency), so the queue drains instead of filling up and dropping frames.
+    """
+
+    def __init__(self, target_fps=ANALYSIS_TARGET_FPS, latency_slo=TIER1_LATENCY_SLO,
+                 min_fps=ANALYSIS_MIN_FPS, adaptive=True):
+        self.target_fps = max(float(target_fps), min_fps)
+        self.latency_slo = float(latency_slo)
+        self.min_fps = min_fps
+        self.adaptive = adaptive  # False -> fixed rate at target_fps (e.g. files that must be sampled evenly)
+        self.analysis_fps = self.target_fps
+        self.latency_ewma = None
+        self.queue_fill = 0.0
+        self._last_adjust = 0.0
+        self._last_analyzed = None
+        self._lock = threading.Lock()
+        self.stats = {"latency_samples": 0, "slo_violations": 0, "decreases": 0, "increases": 0}
+
+    def record_latency(self, seconds, queue_fill=0.0):
+        """Feed one Tier 1 latency and the queue fill ratio (0-1) seen by the consumer"""
+        with self._lock:
+            self.stats["latency_samples"] += 1
+            if seconds > self.latency_slo:
+                self.stats["slo_violations"] += 1
+            if self.latency_ewma is None:
+                self.latency_ewma = seconds
+            else:
+                self.latency_ewma += RATE_LATENCY_ALPHA * (seconds - self.latency_ewma)
+            self.queue_fill = queue_fill
+            self._adjust()
+
+    def observe_queue(self, queue_fill):
+        """Producer-side queue reading - lets the rate fall before the consumer reports back"""
+        with self._lock:
+            self.queue_fill = queue_fill
+            if queue_fill >= RATE_QUEUE_HIGH:
+                self._adjust()
+
+    def _adjust(self):
+        if not self.adaptive:
+            return
+        now = time.time()
+        if now - self._last_adjust < RATE_ADJUST_INTERVAL:
+            return
+        self._last_adjust = now
+
+        latency = self.latency_ewma or 0.0
+        if latency > self.latency_slo or self.queue_fill >= RATE_QUEUE_HIGH:
+            new_fps = self.analysis_fps * RATE_DECREASE_FACTOR
+        elif latency < self.latency_slo * 0.6 and self.queue_fill <= RATE_QUEUE_LOW:
+            new_fps = self.analysis_fps + self.target_fps * 0.1
+        else:
+            new_fps = self.analysis_fps
+
+        if latency > 0:
+            new_fps = min(new_fps, 0.9 / latency)  # What a single sequential consumer can keep up with
+        new_fps = max(self.min_fps, min(self.target_fps, new_fps))
+
+        if new_fps < self.analysis_fps - 1e-6:
+            self.stats["decreases"] += 1
+        elif new_fps > self.analysis_fps + 1e-6:
+            self.stats["increases"] += 1
+        self.analysis_fps = new_fps
+
+    def stride(self, source_fps):
+        """Analyse every Nth captured frame at source_fps"""
+        if not source_fps or source_fps <= 0:
+            source_fps = 30.0
+        return max(1, int(round(source_fps / self.analysis_fps)))
+
+    def should_analyze(self, now=None):
+        """Time-based gate for sources without a fixed frame rate (e.g. browser frames)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            if self._last_analyzed is not None and now - self._last_analyzed < 1.0 / self.analysis_fps:
+                return False
+            self._last_analyzed = now
+            return True
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "analysis_fps": round(self.analysis_fps, 2),
+                "target_fps": self.target_fps,
+                "latency_slo": self.latency_slo,
+                "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+                "queue_fill": round(self.queue_fill, 2),
+                "adaptive": self.adaptive
+            }
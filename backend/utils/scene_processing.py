@@ -1,18 +1,38 @@
+import os
 import cv2
 from transformers import AutoProcessor, CLIPModel, BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
 import torch
 import numpy as np
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from utils.prompt_bank import load_prompt_bank
+from utils.micro_batching import MicroBatchServer
+from utils.model_runtime import configure_model, model_inference, prepare_pixels, get_model_config
+from utils.clip_onnx import CLIP_IMAGE_BACKEND, load_onnx_image_encoder
+from utils.clip_preprocess import clip_pixel_values, to_rgb_images
+from utils.model_registry import model_registry
 
 # SOTA Model Initialization - Industry Standard Vision Models
-clip_processor = AutoProcessor.from_pretrained("openai/clip-vit-base-patch32")
-clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+CLIP_LARGE_MODEL_NAME = "openai/clip-vit-base-patch32"
 
-clip_large_processor = AutoProcessor.from_pretrained("openai/clip-vit-base-patch32")
-clip_large_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+def _clip_loader(model_name):
+    """Registry loader -> (processor, model, logit_scale)"""
+    def load():
+        processor = AutoProcessor.from_pretrained(model_name)
+        model = configure_model("clip", CLIPModel.from_pretrained(model_name))
+        return processor, model, model.logit_scale.exp().item()
+    return load
+
+def _load_blip():
+    return BlipProcessor.from_pretrained(BLIP_MODEL_NAME), configure_model("blip", BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME))
+
+# Number of sampled frames encoded together in one image-tower forward pass (video modes)
+SCENE_BATCH_SIZE = int(os.getenv("SCENE_BATCH_SIZE", "8"))
 
-blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
 
 # SOTA Prompt Engineering - Used by Major AI Companies
 SOTA_NORMAL_PROMPTS = [
@@ -99,381 +119,324 @@ SOTA_ELECTRICAL_EMERGENCY_PROMPTS = [
     "electrical equipment overheating with smoke"
 ]
 
-def detect_violence_sota(image, confidence_threshold=0.40):
-    """SOTA Violence Detection using Security Industry Standards"""
+# === SINGLE-PASS CLIP SCORING ENGINE ===
+# Every prompt family is scored from ONE image encoding: the image is encoded once,
+# compared against all prompt embeddings in a single matrix multiply, and each
+# category then applies its own softmax (normal prompts + category prompts) and
+# thresholds exactly like the original per-category CLIP calls did.
+# Prompt embeddings come from the on-disk prompt bank, so per frame only the
+# image tower runs.
+
+# All prompts in the fixed order used by detect_comprehensive_anomalies
+ALL_SCENE_PROMPTS = (SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS +
+                     SOTA_MEDICAL_EMERGENCY_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS +
+                     SOTA_FIRE_EMERGENCY_PROMPTS + SOTA_FLOOD_EMERGENCY_PROMPTS +
+                     SOTA_ENVIRONMENTAL_HAZARD_PROMPTS + SOTA_SECURITY_THEFT_PROMPTS +
+                     SOTA_WORKPLACE_SAFETY_PROMPTS + SOTA_ELECTRICAL_EMERGENCY_PROMPTS)
+
+# Prompt subset used by the Tier 2 CLIP-Large analysis (normal, violence, medical, abnormal)
+TIER2_SCENE_PROMPTS = (SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS +
+                       SOTA_MEDICAL_EMERGENCY_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS)
+
+# Per-category decision rules (same thresholds as the original detect_*_sota functions)
+# name: (prompts, confidence_threshold, min_ratio, min_margin, detected_type, log_label)
+SCENE_CATEGORIES = {
+    'violence': (SOTA_VIOLENCE_PROMPTS, 0.40, 1.2, 0.05, "violence", "🥊 SOTA Violence"),
+    'medical': (SOTA_MEDICAL_EMERGENCY_PROMPTS, 0.25, 1.15, 0.03, "medical_emergency", "🏥 SOTA Medical Emergency"),
+    'abnormal': (SOTA_ABNORMAL_BEHAVIOR_PROMPTS, 0.30, 1.1, 0.02, "abnormal_behavior", "🔍 SOTA Abnormal Behavior"),
+    'fire': (SOTA_FIRE_EMERGENCY_PROMPTS, 0.42, 1.3, 0.06, "fire_emergency", "🔥 SOTA Fire Emergency"),
+    'flood': (SOTA_FLOOD_EMERGENCY_PROMPTS, 0.41, 1.25, 0.05, "flood_emergency", "🌊 SOTA Flood Emergency"),
+    'environmental': (SOTA_ENVIRONMENTAL_HAZARD_PROMPTS, 0.43, 1.35, 0.07, "environmental_hazard", "☢️ SOTA Environmental Hazard"),
+    'security': (SOTA_SECURITY_THEFT_PROMPTS, 0.44, 1.4, 0.08, "security_theft", "🔐 SOTA Security Threat"),
+    'workplace': (SOTA_WORKPLACE_SAFETY_PROMPTS, 0.40, 1.2, 0.05, "workplace_safety", "⚠️ SOTA Workplace Safety"),
+    'electrical': (SOTA_ELECTRICAL_EMERGENCY_PROMPTS, 0.43, 1.35, 0.07, "electrical_emergency", "⚡ SOTA Electrical Emergency"),
+}
+
+# Index ranges of each prompt family inside ALL_SCENE_PROMPTS
+def _build_category_slices():
+    slices = {}
+    offset = len(SOTA_NORMAL_PROMPTS)
+    for name, category in SCENE_CATEGORIES.items():
+        slices[name] = slice(offset, offset + len(category[0]))
+        offset += len(category[0])
+    return slices
+
+_NORMAL_SLICE = slice(0, len(SOTA_NORMAL_PROMPTS))
+_CATEGORY_SLICES = _build_category_slices()
+
+def _softmax(logits):
+    """Numerically stable softmax over the last axis"""
+    shifted = logits - np.max(logits, axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / np.sum(exp, axis=-1, keepdims=True)
+
+def _projected_features(output):
+    """get_*_features returns a tensor on older transformers and a pooled output on newer ones"""
+    return output if torch.is_tensor(output) else output.pooler_output
+
+def _text_encoder(processor, model):
+    """Prompt encoder for the prompt bank: list of prompts -> (num_prompts, dim) numpy features"""
+    def encode(prompts):
+        text_inputs = processor(text=prompts, return_tensors="pt", padding=True)
+        with model_inference("clip"):
+            text_features = _projected_features(model.get_text_features(**text_inputs))
+        return text_features.float().numpy()
+    return encode
+
+def _image_encoder_features(processor, model, images):
+    """Encode a list of PIL images / BGR frames with a CLIP image tower -> normalized (N, dim) features"""
+    pixel_values = prepare_pixels("clip", torch.from_numpy(clip_pixel_values(processor, images)))
+    with model_inference("clip"):
+        image_features = _projected_features(model.get_image_features(pixel_values=pixel_values)).float()
+        image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+    return image_features.numpy().astype(np.float32)
+
+def _warmup_clip(bundle):
+    processor, model, _ = bundle
+    # A camera-sized BGR frame, so warmup also builds (and parity-checks) the fast preprocessor
+    _image_encoder_features(processor, model, [np.zeros((480, 640, 3), dtype=np.uint8)])
+
+def _warmup_blip(bundle):
+    processor, model = bundle
+    inputs = processor(images=Image.new("RGB", (224, 224)), return_tensors="pt")
+    with model_inference("blip"):
+        model.generate(**inputs, max_length=5)
+
+# Registry keys are artifact names, so CLIP-Large pointing at the same checkpoint shares one copy.
+# The full torch CLIP is tagged Tier 2: Tier 1 only reaches it through the image tower / prompt bank
+# entries (torch backend, or a bank recompute), whose own readiness already covers that load.
+_CLIP_KEY = model_registry.register(f"clip:{CLIP_MODEL_NAME}", _clip_loader(CLIP_MODEL_NAME), _warmup_clip, tier=2)
+_CLIP_LARGE_KEY = model_registry.register(f"clip:{CLIP_LARGE_MODEL_NAME}", _clip_loader(CLIP_LARGE_MODEL_NAME), _warmup_clip,
+                                          tier=2)
+_BLIP_KEY = model_registry.register(f"blip:{BLIP_MODEL_NAME}", _load_blip, _warmup_blip, tier=2)
+
+def get_clip():
+    """Tier 1 CLIP -> (processor, model, logit_scale), loaded on first use"""
+    return model_registry.get(_CLIP_KEY)
+
+def get_clip_large():
+    """Tier 2 CLIP -> (processor, model, logit_scale)"""
+    return model_registry.get(_CLIP_LARGE_KEY)
+
+def get_blip():
+    """BLIP captioner -> (processor, model)"""
+    return model_registry.get(_BLIP_KEY)
+
+def _load_clip_image_backend():
+    """Tier 1 image tower -> (encode(images) -> normalized features, logit_scale)
+
+    CLIP_IMAGE_BACKEND=onnx serves a cached ONNX export on ONNX Runtime (exported on first use);
+    any failure there falls back to the PyTorch tower.
+    """
+    if CLIP_IMAGE_BACKEND == "onnx":
+        try:
+            processor = AutoProcessor.from_pretrained(CLIP_MODEL_NAME)
+            # Exported from a fresh fp32 copy - the served torch model may be quantized
+            encoder = load_onnx_image_encoder(CLIP_MODEL_NAME, lambda: CLIPModel.from_pretrained(CLIP_MODEL_NAME).eval(),
+                                              get_model_config("clip")["threads"])
+
+            def encode(images):
+                return encoder.encode(clip_pixel_values(processor, images))
+            return encode, encoder.logit_scale
+        except Exception as e:
+            print(f"⚠️ ONNX CLIP backend unavailable ({e}), falling back to PyTorch")
+
+    processor, model, logit_scale = get_clip()
+    return (lambda images: _image_encoder_features(processor, model, images)), logit_scale
+
+_CLIP_IMAGE_KEY = model_registry.register(f"clip_image:{CLIP_MODEL_NAME}:{CLIP_IMAGE_BACKEND}", _load_clip_image_backend,
+                                          lambda backend: backend[0]([np.zeros((480, 640, 3), dtype=np.uint8)]))
+
+# Normalized text embeddings, computed once (or memory-mapped from disk) on first use; the text
+# tower itself is only loaded when the bank has to be recomputed. The bank is keyed by the runtime
+# profile (INT8 or fp32 text tower) and the image backend it is paired with, so profiles never mix.
+# With CLIP_IMAGE_BACKEND=onnx the pairing is mixed-precision by design: "int8-onnx" is an INT8
+# torch text tower scored against the fp32 ONNX image tower.
+_CLIP_PROFILE = "int8" if get_model_config("clip")["quantize"] else "fp32"
+_PROMPT_BANK_KEY = model_registry.register(
+    f"prompt_bank:{CLIP_MODEL_NAME}:tier1:{_CLIP_PROFILE}-{CLIP_IMAGE_BACKEND}",
+    lambda: load_prompt_bank(CLIP_MODEL_NAME, ALL_SCENE_PROMPTS,
+                             lambda prompts: _text_encoder(*get_clip()[:2])(prompts),
+                             f"{_CLIP_PROFILE}-{CLIP_IMAGE_BACKEND}"))
+_TIER2_PROMPT_BANK_KEY = model_registry.register(
+    f"prompt_bank:{CLIP_LARGE_MODEL_NAME}:tier2:{_CLIP_PROFILE}-torch",
+    lambda: load_prompt_bank(CLIP_LARGE_MODEL_NAME, TIER2_SCENE_PROMPTS,
+                             lambda prompts: _text_encoder(*get_clip_large()[:2])(prompts),
+                             f"{_CLIP_PROFILE}-torch"),
+    tier=2)
+
+def get_prompt_text_features():
+    """Normalized CLIP text embeddings for ALL_SCENE_PROMPTS, shape (num_prompts, dim)"""
+    return model_registry.get(_PROMPT_BANK_KEY)
+
+def encode_scene_images(images):
+    """Encode a list of PIL images / BGR frames with the CLIP image tower -> normalized (N, dim) features"""
+    encode, _ = model_registry.get(_CLIP_IMAGE_KEY)
+    return encode(images)
+
+def score_scene_images_tier2(images):
+    """CLIP-Large logits of every image against TIER2_SCENE_PROMPTS, shape (N, num_prompts)"""
+    processor, model, logit_scale = get_clip_large()
+    image_features = _image_encoder_features(processor, model, images)
+    return logit_scale * (image_features @ model_registry.get(_TIER2_PROMPT_BANK_KEY).T)
+
+def score_scene_images(images):
+    """Single-pass CLIP logits of every image against every prompt, shape (N, num_prompts)"""
+    encode, logit_scale = model_registry.get(_CLIP_IMAGE_KEY)
+    return logit_scale * (encode(images) @ get_prompt_text_features().T)
+
+def score_scene_batch(images, batch_size=None):
+    """score_scene_images over many frames, encoding batch_size frames per forward pass"""
+    batch_size = batch_size or SCENE_BATCH_SIZE
+    if not images:
+        return np.zeros((0, len(ALL_SCENE_PROMPTS)), dtype=np.float32)
+    return np.concatenate([score_scene_images(images[i:i + batch_size])
+                           for i in range(0, len(images), batch_size)])
+
+# Cross-stream micro-batching: frames from all live sessions share one CLIP image-encoder pass
+CLIP_SERVER_ENABLED = os.getenv("CLIP_SERVER_ENABLED", "1") == "1"
+CLIP_SERVER_MAX_BATCH = int(os.getenv("CLIP_SERVER_MAX_BATCH", "16"))
+CLIP_SERVER_WINDOW_MS = float(os.getenv("CLIP_SERVER_WINDOW_MS", "5"))
+CLIP_SERVER_TIMEOUT = float(os.getenv("CLIP_SERVER_TIMEOUT", "5"))  # Default wait when the caller sets none
+
+clip_batch_server = MicroBatchServer(score_scene_images, CLIP_SERVER_MAX_BATCH, CLIP_SERVER_WINDOW_MS,
+                                     name="clip-batch-server")
+
+def score_scene_images_shared(images, timeout=None):
+    """score_scene_images through the batch server, so concurrent callers are encoded together
+
+    Waits at most timeout seconds (CLIP_SERVER_TIMEOUT by default) for the whole list; on expiry the
+    frames still queued are withdrawn from the server and FuturesTimeoutError is raised.
+    """
+    if not CLIP_SERVER_ENABLED:
+        return score_scene_images(images)
+    deadline = time.time() + (CLIP_SERVER_TIMEOUT if timeout is None else timeout)
+    futures = [clip_batch_server.submit(image) for image in images]
     try:
-        # Multi-scale violence detection with ensemble scoring
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        # Calculate violence vs normal scores
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        violence_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_violence = torch.max(violence_scores).item()
-        best_violence_idx = torch.argmax(violence_scores).item()
-        
-        # Industry-standard confidence scoring
-        confidence_ratio = max_violence / (max_normal + 1e-6)
-        violence_confidence = max_violence - max_normal
-        
-        # Multi-criteria violence detection
-        is_violence = (
-            max_violence > confidence_threshold and
-            confidence_ratio > 1.2 and
-            violence_confidence > 0.05
-        )
-        
-        if is_violence:
-            violence_type = SOTA_VIOLENCE_PROMPTS[best_violence_idx]
-            print(f"🥊 SOTA Violence: {violence_confidence:.3f} conf, type: {violence_type[:50]}...")
-            return True, max_violence, violence_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in violence detection: {e}")
-        return False, 0.0, ""
-
-def detect_medical_emergency_sota(image, confidence_threshold=0.35):
-    """SOTA Medical Emergency Detection using Healthcare Industry Standards"""
+        return np.stack([future.result(timeout=max(0.0, deadline - time.time())) for future in futures])
+    except FuturesTimeoutError:
+        for future in futures:
+            future.cancel()
+        raise
+
+def get_clip_batching_metrics():
+    return clip_batch_server.get_metrics()
+
+def scene_models_ready():
+    """True once the Tier 1 image tower and prompt bank are warmed - before that a call would block on loading"""
+    return model_registry.is_ready([_CLIP_IMAGE_KEY, _PROMPT_BANK_KEY])
+
+def evaluate_scene_category(logits, name, confidence_threshold=None):
+    """Apply one category's decision rule to a single logits row from score_scene_images"""
+    prompts, default_threshold, min_ratio, min_margin, _, _ = SCENE_CATEGORIES[name]
+    if confidence_threshold is None:
+        confidence_threshold = default_threshold
+
+    # Same softmax scope as the original per-category call: normal prompts + category prompts
+    normal_logits = logits[_NORMAL_SLICE]
+    probs = _softmax(np.concatenate([normal_logits, logits[_CATEGORY_SLICES[name]]]))
+    normal_scores = probs[:len(normal_logits)]
+    category_scores = probs[len(normal_logits):]
+
+    max_normal = float(np.max(normal_scores))
+    max_category = float(np.max(category_scores))
+    best_idx = int(np.argmax(category_scores))
+
+    confidence_ratio = max_category / (max_normal + 1e-6)
+    category_confidence = max_category - max_normal
+
+    detected = (
+        max_category > confidence_threshold and
+        confidence_ratio > min_ratio and
+        category_confidence > min_margin
+    )
+
+    return {
+        'detected': detected,
+        'score': max_category,
+        'normal_score': max_normal,
+        'ratio': confidence_ratio,
+        'margin': category_confidence,
+        'prompt': prompts[best_idx]
+    }
+
+def evaluate_scene_categories(logits):
+    """Evaluate every category in SCENE_CATEGORIES against a single logits row"""
+    return {name: evaluate_scene_category(logits, name) for name in SCENE_CATEGORIES}
+
+def _detect_category_sota(image, name, confidence_threshold):
+    """Shared body of the detect_*_sota functions - one encoding, one category decision"""
     try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_MEDICAL_EMERGENCY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        medical_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_medical = torch.max(medical_scores).item()
-        best_medical_idx = torch.argmax(medical_scores).item()
-        
-        confidence_ratio = max_medical / (max_normal + 1e-6)
-        medical_confidence = max_medical - max_normal
-        
-        is_medical = (
-            max_medical > confidence_threshold and
-            confidence_ratio > 1.1 and  # Lower threshold for medical emergencies
-            medical_confidence > 0.03
-        )
-        
-        if is_medical:
-            medical_type = SOTA_MEDICAL_EMERGENCY_PROMPTS[best_medical_idx]
-            print(f"🚑 SOTA Medical Emergency: {medical_confidence:.3f} conf, type: {medical_type[:50]}...")
-            return True, max_medical, medical_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in medical detection: {e}")
-        return False, 0.0, ""
+        logits = score_scene_images([image])[0]
+        decision = evaluate_scene_category(logits, name, confidence_threshold)
+
+        if decision['detected']:
+            log_label = SCENE_CATEGORIES[name][5]
+            print(f"{log_label}: {decision['margin']:.3f} conf, type: {decision['prompt'][:50]}...")
+            return True, decision['score'], decision['prompt']
 
-def detect_abnormal_behavior_sota(image, confidence_threshold=0.38):
-    """SOTA Abnormal Behavior Detection using Surveillance Industry Standards"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        abnormal_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_abnormal = torch.max(abnormal_scores).item()
-        best_abnormal_idx = torch.argmax(abnormal_scores).item()
-        
-        confidence_ratio = max_abnormal / (max_normal + 1e-6)
-        abnormal_confidence = max_abnormal - max_normal
-        
-        is_abnormal = (
-            max_abnormal > confidence_threshold and
-            confidence_ratio > 1.15 and
-            abnormal_confidence > 0.04
-        )
-        
-        if is_abnormal:
-            abnormal_type = SOTA_ABNORMAL_BEHAVIOR_PROMPTS[best_abnormal_idx]
-            print(f"🤯 SOTA Abnormal Behavior: {abnormal_confidence:.3f} conf, type: {abnormal_type[:50]}...")
-            return True, max_abnormal, abnormal_type
-        
         return False, 0.0, ""
-        
+
     except Exception as e:
-        print(f"Error in abnormal behavior detection: {e}")
+        print(f"Error in {name} detection: {e}")
         return False, 0.0, ""
 
+def detect_violence_sota(image, confidence_threshold=0.40):
+    """SOTA Violence Detection using Security Industry Standards"""
+    return _detect_category_sota(image, 'violence', confidence_threshold)
+
+def detect_medical_emergency_sota(image, confidence_threshold=0.25):
+    """SOTA Medical Emergency Detection - Healthcare Grade"""
+    return _detect_category_sota(image, 'medical', confidence_threshold)
+
+def detect_abnormal_behavior_sota(image, confidence_threshold=0.30):
+    """SOTA Abnormal Behavior Detection - Surveillance Grade"""
+    return _detect_category_sota(image, 'abnormal', confidence_threshold)
+
 def detect_fire_emergency_sota(image, confidence_threshold=0.42):
     """SOTA Fire Emergency Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_FIRE_EMERGENCY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        fire_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_fire = torch.max(fire_scores).item()
-        best_fire_idx = torch.argmax(fire_scores).item()
-        
-        confidence_ratio = max_fire / (max_normal + 1e-6)
-        fire_confidence = max_fire - max_normal
-        
-        is_fire = (
-            max_fire > confidence_threshold and
-            confidence_ratio > 1.3 and
-            fire_confidence > 0.06
-        )
-        
-        if is_fire:
-            fire_type = SOTA_FIRE_EMERGENCY_PROMPTS[best_fire_idx]
-            print(f"🔥 SOTA Fire Emergency: {fire_confidence:.3f} conf, type: {fire_type[:50]}...")
-            return True, max_fire, fire_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in fire detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'fire', confidence_threshold)
 
 def detect_flood_emergency_sota(image, confidence_threshold=0.41):
     """SOTA Flood Emergency Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_FLOOD_EMERGENCY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        flood_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_flood = torch.max(flood_scores).item()
-        best_flood_idx = torch.argmax(flood_scores).item()
-        
-        confidence_ratio = max_flood / (max_normal + 1e-6)
-        flood_confidence = max_flood - max_normal
-        
-        is_flood = (
-            max_flood > confidence_threshold and
-            confidence_ratio > 1.25 and
-            flood_confidence > 0.05
-        )
-        
-        if is_flood:
-            flood_type = SOTA_FLOOD_EMERGENCY_PROMPTS[best_flood_idx]
-            print(f"🌊 SOTA Flood Emergency: {flood_confidence:.3f} conf, type: {flood_type[:50]}...")
-            return True, max_flood, flood_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in flood detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'flood', confidence_threshold)
 
 def detect_environmental_hazard_sota(image, confidence_threshold=0.43):
     """SOTA Environmental Hazard Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_ENVIRONMENTAL_HAZARD_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        environmental_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_environmental = torch.max(environmental_scores).item()
-        best_environmental_idx = torch.argmax(environmental_scores).item()
-        
-        confidence_ratio = max_environmental / (max_normal + 1e-6)
-        environmental_confidence = max_environmental - max_normal
-        
-        is_environmental = (
-            max_environmental > confidence_threshold and
-            confidence_ratio > 1.35 and
-            environmental_confidence > 0.07
-        )
-        
-        if is_environmental:
-            environmental_type = SOTA_ENVIRONMENTAL_HAZARD_PROMPTS[best_environmental_idx]
-            print(f"☢️ SOTA Environmental Hazard: {environmental_confidence:.3f} conf, type: {environmental_type[:50]}...")
-            return True, max_environmental, environmental_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in environmental hazard detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'environmental', confidence_threshold)
 
 def detect_security_theft_sota(image, confidence_threshold=0.44):
     """SOTA Security & Theft Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_SECURITY_THEFT_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        security_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_security = torch.max(security_scores).item()
-        best_security_idx = torch.argmax(security_scores).item()
-        
-        confidence_ratio = max_security / (max_normal + 1e-6)
-        security_confidence = max_security - max_normal
-        
-        is_security = (
-            max_security > confidence_threshold and
-            confidence_ratio > 1.4 and
-            security_confidence > 0.08
-        )
-        
-        if is_security:
-            security_type = SOTA_SECURITY_THEFT_PROMPTS[best_security_idx]
-            print(f"🔐 SOTA Security Threat: {security_confidence:.3f} conf, type: {security_type[:50]}...")
-            return True, max_security, security_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in security detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'security', confidence_threshold)
 
 def detect_workplace_safety_sota(image, confidence_threshold=0.40):
     """SOTA Workplace Safety Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_WORKPLACE_SAFETY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        workplace_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_workplace = torch.max(workplace_scores).item()
-        best_workplace_idx = torch.argmax(workplace_scores).item()
-        
-        confidence_ratio = max_workplace / (max_normal + 1e-6)
-        workplace_confidence = max_workplace - max_normal
-        
-        is_workplace = (
-            max_workplace > confidence_threshold and
-            confidence_ratio > 1.2 and
-            workplace_confidence > 0.05
-        )
-        
-        if is_workplace:
-            workplace_type = SOTA_WORKPLACE_SAFETY_PROMPTS[best_workplace_idx]
-            print(f"⚠️ SOTA Workplace Safety: {workplace_confidence:.3f} conf, type: {workplace_type[:50]}...")
-            return True, max_workplace, workplace_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in workplace safety detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'workplace', confidence_threshold)
 
 def detect_electrical_emergency_sota(image, confidence_threshold=0.43):
     """SOTA Electrical Emergency Detection"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_ELECTRICAL_EMERGENCY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        electrical_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_electrical = torch.max(electrical_scores).item()
-        best_electrical_idx = torch.argmax(electrical_scores).item()
-        
-        confidence_ratio = max_electrical / (max_normal + 1e-6)
-        electrical_confidence = max_electrical - max_normal
-        
-        is_electrical = (
-            max_electrical > confidence_threshold and
-            confidence_ratio > 1.35 and
-            electrical_confidence > 0.07
-        )
-        
-        if is_electrical:
-            electrical_type = SOTA_ELECTRICAL_EMERGENCY_PROMPTS[best_electrical_idx]
-            print(f"⚡ SOTA Electrical Emergency: {electrical_confidence:.3f} conf, type: {electrical_type[:50]}...")
-            return True, max_electrical, electrical_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in electrical emergency detection: {e}")
-        return False, 0.0, ""
+    return _detect_category_sota(image, 'electrical', confidence_threshold)
 
-def detect_comprehensive_anomalies(image, confidence_threshold=0.40):
+def detect_comprehensive_anomalies(image, confidence_threshold=0.40, logits=None):
     """Comprehensive Anomaly Detection including Violence, Medical, Fire, Flood & Environmental Hazards"""
     try:
-        # Comprehensive multi-category detection with ensemble scoring
-        all_prompts = (SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS + 
-                      SOTA_MEDICAL_EMERGENCY_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS +
-                      SOTA_FIRE_EMERGENCY_PROMPTS + SOTA_FLOOD_EMERGENCY_PROMPTS +
-                      SOTA_ENVIRONMENTAL_HAZARD_PROMPTS + SOTA_SECURITY_THEFT_PROMPTS +
-                      SOTA_WORKPLACE_SAFETY_PROMPTS + SOTA_ELECTRICAL_EMERGENCY_PROMPTS)
-        
-        # Use proper CLIP model instead of non-existent clip_interrogator
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        # Calculate category scores
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        violence_scores = probs[len(SOTA_NORMAL_PROMPTS):len(SOTA_NORMAL_PROMPTS)+len(SOTA_VIOLENCE_PROMPTS)]
-        medical_start = len(SOTA_NORMAL_PROMPTS) + len(SOTA_VIOLENCE_PROMPTS)
-        medical_scores = probs[medical_start:medical_start+len(SOTA_MEDICAL_EMERGENCY_PROMPTS)]
-        behavior_start = medical_start + len(SOTA_MEDICAL_EMERGENCY_PROMPTS)
-        behavior_scores = probs[behavior_start:behavior_start+len(SOTA_ABNORMAL_BEHAVIOR_PROMPTS)]
-        fire_start = behavior_start + len(SOTA_ABNORMAL_BEHAVIOR_PROMPTS)
-        fire_scores = probs[fire_start:fire_start+len(SOTA_FIRE_EMERGENCY_PROMPTS)]
-        flood_start = fire_start + len(SOTA_FIRE_EMERGENCY_PROMPTS)
-        flood_scores = probs[flood_start:flood_start+len(SOTA_FLOOD_EMERGENCY_PROMPTS)]
-        hazard_start = flood_start + len(SOTA_FLOOD_EMERGENCY_PROMPTS)
-        hazard_scores = probs[hazard_start:hazard_start+len(SOTA_ENVIRONMENTAL_HAZARD_PROMPTS)]
-        security_start = hazard_start + len(SOTA_ENVIRONMENTAL_HAZARD_PROMPTS)
-        security_scores = probs[security_start:security_start+len(SOTA_SECURITY_THEFT_PROMPTS)]
-        workplace_start = security_start + len(SOTA_SECURITY_THEFT_PROMPTS)
-        workplace_scores = probs[workplace_start:workplace_start+len(SOTA_WORKPLACE_SAFETY_PROMPTS)]
-        electrical_start = workplace_start + len(SOTA_WORKPLACE_SAFETY_PROMPTS)
-        electrical_scores = probs[electrical_start:]
+        # Comprehensive multi-category detection: softmax across ALL prompt families at once
+        if logits is None:
+            logits = score_scene_images([image])[0]
+        probs = _softmax(logits)
 
         # Find maximum scores for each category
-        max_normal = torch.max(normal_scores).item()
-        max_violence = torch.max(violence_scores).item()
-        max_medical = torch.max(medical_scores).item()
-        max_behavior = torch.max(behavior_scores).item()
-        max_fire = torch.max(fire_scores).item()
-        max_flood = torch.max(flood_scores).item()
-        max_hazard = torch.max(hazard_scores).item()
-        max_security = torch.max(security_scores).item()
-        max_workplace = torch.max(workplace_scores).item()
-        max_electrical = torch.max(electrical_scores).item()
-        
+        max_normal = float(np.max(probs[_NORMAL_SLICE]))
+        max_violence = float(np.max(probs[_CATEGORY_SLICES['violence']]))
+        max_medical = float(np.max(probs[_CATEGORY_SLICES['medical']]))
+        max_behavior = float(np.max(probs[_CATEGORY_SLICES['abnormal']]))
+        max_fire = float(np.max(probs[_CATEGORY_SLICES['fire']]))
+        max_flood = float(np.max(probs[_CATEGORY_SLICES['flood']]))
+        max_hazard = float(np.max(probs[_CATEGORY_SLICES['environmental']]))
+        max_security = float(np.max(probs[_CATEGORY_SLICES['security']]))
+        max_workplace = float(np.max(probs[_CATEGORY_SLICES['workplace']]))
+        max_electrical = float(np.max(probs[_CATEGORY_SLICES['electrical']]))
+
         # Find the highest anomaly category
         anomaly_scores = {
             'violence': max_violence,
@@ -486,18 +449,18 @@ def detect_comprehensive_anomalies(image, confidence_threshold=0.40):
             'workplace': max_workplace,
             'electrical': max_electrical
         }
-        
+
         max_anomaly_type = max(anomaly_scores, key=anomaly_scores.get)
         max_anomaly_score = anomaly_scores[max_anomaly_type]
-        
+
         # Enhanced confidence calculation
         confidence_ratio = max_anomaly_score / (max_normal + 1e-6)
         anomaly_confidence = max_anomaly_score - max_normal
-        
+
         # Multi-criteria anomaly detection with category-specific handling
         is_anomaly = False
         anomaly_reason = "Normal activity detected"
-        
+
         # Emergency categories get lower thresholds
         if max_fire > 0.35 or max_flood > 0.35:  # Lower threshold for environmental emergencies
             is_anomaly = True
@@ -532,318 +495,148 @@ def detect_comprehensive_anomalies(image, confidence_threshold=0.40):
             'all_scores': anomaly_scores,
             'normal_score': max_normal
         }
-        
+
     except Exception as e:
         print(f"❌ Comprehensive anomaly detection error: {e}")
         return 0.0, {'detected': False, 'category': 'error', 'confidence': 0.0, 'reason': f"Detection error: {e}"}
 
-def detect_medical_emergency_sota(image, confidence_threshold=0.25):
-    """SOTA Medical Emergency Detection - Healthcare Grade"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_MEDICAL_EMERGENCY_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        emergency_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_emergency = torch.max(emergency_scores).item()
-        best_emergency_idx = torch.argmax(emergency_scores).item()
-        
-        # Healthcare-grade detection criteria
-        confidence_ratio = max_emergency / (max_normal + 1e-6)
-        emergency_confidence = max_emergency - max_normal
-        
-        is_emergency = (
-            max_emergency > confidence_threshold and
-            confidence_ratio > 1.15 and  # More sensitive for medical emergencies
-            emergency_confidence > 0.03
-        )
-        
-        if is_emergency:
-            emergency_type = SOTA_MEDICAL_EMERGENCY_PROMPTS[best_emergency_idx]
-            print(f"🏥 SOTA Medical Emergency: {emergency_confidence:.3f} conf, type: {emergency_type[:50]}...")
-            return True, max_emergency, emergency_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in medical emergency detection: {e}")
-        return False, 0.0, ""
-
-def detect_abnormal_behavior_sota(image, confidence_threshold=0.30):
-    """SOTA Abnormal Behavior Detection - Surveillance Grade"""
-    try:
-        all_prompts = SOTA_NORMAL_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS
-        
-        inputs = clip_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-        outputs = clip_model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)[0]
-        
-        normal_scores = probs[:len(SOTA_NORMAL_PROMPTS)]
-        abnormal_scores = probs[len(SOTA_NORMAL_PROMPTS):]
-        
-        max_normal = torch.max(normal_scores).item()
-        max_abnormal = torch.max(abnormal_scores).item()
-        best_abnormal_idx = torch.argmax(abnormal_scores).item()
-        
-        # Surveillance-grade detection
-        confidence_ratio = max_abnormal / (max_normal + 1e-6)
-        abnormal_confidence = max_abnormal - max_normal
-        
-        is_abnormal = (
-            max_abnormal > confidence_threshold and
-            confidence_ratio > 1.1 and
-            abnormal_confidence > 0.02
-        )
-        
-        if is_abnormal:
-            abnormal_type = SOTA_ABNORMAL_BEHAVIOR_PROMPTS[best_abnormal_idx]
-            print(f"🔍 SOTA Abnormal Behavior: {abnormal_confidence:.3f} conf, type: {abnormal_type[:50]}...")
-            return True, max_abnormal, abnormal_type
-        
-        return False, 0.0, ""
-        
-    except Exception as e:
-        print(f"Error in abnormal behavior detection: {e}")
-        return False, 0.0, ""
-
-def process_scene_tier1(video_path):
-    """SOTA Tier 1 Scene Processing - Industry Standard Video Analysis"""
+def _iter_sampled_frame_batches(video_path, batch_size=None):
+    """Yield batches of BGR frames sampled once per second from a video file"""
+    batch_size = batch_size or SCENE_BATCH_SIZE
     cap = cv2.VideoCapture(video_path)
     fps = cap.get(cv2.CAP_PROP_FPS)
     frame_interval = int(fps) if fps > 0 else 1
     frame_count = 0
-    
-    # Comprehensive anomaly scoring system
-    all_scores = []
+    batch = []
 
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
         if frame_count % frame_interval == 0:
-            image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            
-            # Use comprehensive detection instead of old functions
-            anomaly_score, detection_details = detect_comprehensive_anomalies(image)
-            
-            # Collect scores for final assessment
-            if detection_details['detected']:
-                all_scores.append(anomaly_score)
-        
+            batch.append(frame)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
         frame_count += 1
 
     cap.release()
-    
-    # Return highest confidence anomaly score
-    return max(all_scores) if all_scores else 0.0
+    if batch:
+        yield batch
 
-def process_scene_tier2(video_path):
-    """SOTA Tier 2 Scene Processing - Advanced AI with Scene Understanding"""
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_interval = int(fps) if fps > 0 else 1
-    frame_count = 0
-    
+def process_scene_tier2(video_path, batch_size=None):
+    """SOTA Tier 2 Scene Processing - Advanced AI with Scene Understanding (batched)"""
     captions = []
     anomaly_scores = []
     anomaly_types = []
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if frame_count % frame_interval == 0:
-            image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            
-            # SOTA Scene Captioning with BLIP
-            inputs = blip_processor(images=image, return_tensors="pt")
+    # Sophisticated anomaly scoring
+    normal_end = len(SOTA_NORMAL_PROMPTS)
+    violence_end = normal_end + len(SOTA_VIOLENCE_PROMPTS)
+    medical_end = violence_end + len(SOTA_MEDICAL_EMERGENCY_PROMPTS)
+
+    blip_processor, blip_model = get_blip()
+    for batch in _iter_sampled_frame_batches(video_path, batch_size):
+        # SOTA Scene Captioning with BLIP
+        inputs = blip_processor(images=to_rgb_images(batch), return_tensors="pt")
+        inputs["pixel_values"] = prepare_pixels("blip", inputs["pixel_values"])
+        with model_inference("blip"):
             generated_ids = blip_model.generate(**inputs, max_length=50)
-            caption = blip_processor.decode(generated_ids[0], skip_special_tokens=True)
-            captions.append(caption)
-            
-            # Enhanced large model analysis with CLIP-Large
-            all_prompts = (SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS + 
-                          SOTA_MEDICAL_EMERGENCY_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS)
-            
-            inputs = clip_large_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-            outputs = clip_large_model(**inputs)
-            probs = outputs.logits_per_image.softmax(dim=1)[0]
-            
-            # Sophisticated anomaly scoring
-            normal_end = len(SOTA_NORMAL_PROMPTS)
-            violence_end = normal_end + len(SOTA_VIOLENCE_PROMPTS)
-            medical_end = violence_end + len(SOTA_MEDICAL_EMERGENCY_PROMPTS)
-            
-            normal_scores = probs[:normal_end]
-            violence_scores = probs[normal_end:violence_end]
-            medical_scores = probs[violence_end:medical_end]
-            abnormal_scores = probs[medical_end:]
-            
-            max_normal = torch.max(normal_scores).item()
-            max_violence = torch.max(violence_scores).item()
-            max_medical = torch.max(medical_scores).item()
-            max_abnormal = torch.max(abnormal_scores).item()
-            
+        captions.extend(blip_processor.batch_decode(generated_ids, skip_special_tokens=True))
+
+        # Enhanced large model analysis with CLIP-Large (prompt embeddings from the bank)
+        for probs in _softmax(score_scene_images_tier2(batch)):
+            max_normal = float(np.max(probs[:normal_end]))
+            max_violence = float(np.max(probs[normal_end:violence_end]))
+            max_medical = float(np.max(probs[violence_end:medical_end]))
+            max_abnormal = float(np.max(probs[medical_end:]))
+
             # Determine best anomaly category
             anomaly_categories = [
                 (max_violence, "violence"),
                 (max_medical, "medical_emergency"),
                 (max_abnormal, "abnormal_behavior")
             ]
-            
+
             best_anomaly_score, best_anomaly_type = max(anomaly_categories, key=lambda x: x[0])
-            
+
             # Industry-standard thresholding
             if best_anomaly_score > max_normal * 1.25:  # SOTA threshold
                 anomaly_scores.append(best_anomaly_score)
                 anomaly_types.append(best_anomaly_type)
-            
-        frame_count += 1
 
-    cap.release()
-    
     # Return comprehensive analysis
     max_anomaly_score = max(anomaly_scores) if anomaly_scores else 0.0
     return captions, max_anomaly_score
 
-def process_scene_frame(image_array):
-    """Original Scene Processing with Enhanced Detection Conditions"""
-    image = Image.fromarray(image_array)
-    
-    # Initialize score lists
-    violence_scores = []
-    medical_scores = []
-    abnormal_scores = []
-    fire_scores = []
-    flood_scores = []
-    environmental_scores = []
-    security_scores = []
-    workplace_scores = []
-    electrical_scores = []
-    
+def process_scene_frame(frame, timeout=None):
+    """Original Scene Processing with Enhanced Detection Conditions - single CLIP pass on a BGR frame
+
+    timeout bounds the wait on the CLIP batch server; FuturesTimeoutError is raised past it.
+    """
     try:
-        # === ORIGINAL SOTA MULTI-MODAL DETECTION PIPELINE ===
-        anomaly_detected = False
-        max_confidence = 0.0
-        detected_type = "normal"
-        
-        # 1. Violence Detection (Security Industry Standard)
-        violence_detected, violence_score, violence_type = detect_violence_sota(image)
-        if violence_detected:
-            violence_scores.append(violence_score)
-            if violence_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = violence_score
-                detected_type = "violence"
-        
-        # 2. Medical Emergency Detection (Healthcare Grade)
-        medical_detected, medical_score, medical_type = detect_medical_emergency_sota(image)
-        if medical_detected:
-            medical_scores.append(medical_score)
-            if medical_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = medical_score
-                detected_type = "medical_emergency"
-        
-        # 3. Abnormal Behavior Detection (Surveillance Grade)
-        abnormal_detected, abnormal_score, abnormal_type = detect_abnormal_behavior_sota(image)
-        if abnormal_detected:
-            abnormal_scores.append(abnormal_score)
-            if abnormal_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = abnormal_score
-                detected_type = "abnormal_behavior"
-        
-        # 4. Fire Emergency Detection (Enhanced)
-        fire_detected, fire_score, fire_type = detect_fire_emergency_sota(image)
-        if fire_detected:
-            fire_scores.append(fire_score)
-            if fire_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = fire_score
-                detected_type = "fire_emergency"
-        
-        # 5. Flood Emergency Detection (Enhanced)
-        flood_detected, flood_score, flood_type = detect_flood_emergency_sota(image)
-        if flood_detected:
-            flood_scores.append(flood_score)
-            if flood_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = flood_score
-                detected_type = "flood_emergency"
-        
-        # 6. Environmental Hazard Detection (Enhanced)
-        environmental_detected, environmental_score, environmental_type = detect_environmental_hazard_sota(image)
-        if environmental_detected:
-            environmental_scores.append(environmental_score)
-            if environmental_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = environmental_score
-                detected_type = "environmental_hazard"
-        
-        # 7. Security & Theft Detection (Enhanced)
-        security_detected, security_score, security_type = detect_security_theft_sota(image)
-        if security_detected:
-            security_scores.append(security_score)
-            if security_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = security_score
-                detected_type = "security_theft"
-        
-        # 8. Workplace Safety Detection (Enhanced)
-        workplace_detected, workplace_score, workplace_type = detect_workplace_safety_sota(image)
-        if workplace_detected:
-            workplace_scores.append(workplace_score)
-            if workplace_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = workplace_score
-                detected_type = "workplace_safety"
-        
-        # 9. Electrical Emergency Detection (Enhanced)
-        electrical_detected, electrical_score, electrical_type = detect_electrical_emergency_sota(image)
-        if electrical_detected:
-            electrical_scores.append(electrical_score)
-            if electrical_score > max_confidence:
-                anomaly_detected = True
-                max_confidence = electrical_score
-                detected_type = "electrical_emergency"
-        
-        # Combine all scores for comprehensive analysis
-        all_scores = (violence_scores + medical_scores + abnormal_scores + 
-                     fire_scores + flood_scores + environmental_scores +
-                     security_scores + workplace_scores + electrical_scores)
-        
-        if anomaly_detected:
-            print(f"🎬 SOTA Scene Detection: {detected_type} (confidence={max_confidence:.3f})")
-            return max_confidence
-        
-        return 0.0
-        
+        # === SINGLE-PASS SOTA MULTI-CATEGORY DETECTION PIPELINE ===
+        # One image encoding + one matrix multiply scores every category at once
+        logits = score_scene_images_shared([frame], timeout)[0]
+        return select_scene_anomaly(logits)
+
+    except FuturesTimeoutError:
+        raise
     except Exception as e:
         print(f"❌ Scene processing error: {e}")
         return 0.0
 
+def process_scene_frames(frames, batch_size=None):
+    """Batched process_scene_frame: one scene anomaly score per BGR frame, same decisions"""
+    try:
+        # BGR frames go straight to the CLIP preprocessor - no per-frame RGB/PIL conversion
+        images = list(frames)
+        if CLIP_SERVER_ENABLED:
+            # Each frame joins the shared batch server (max CLIP_SERVER_MAX_BATCH per pass)
+            all_logits = score_scene_images_shared(images)
+        else:
+            all_logits = score_scene_batch(images, batch_size)
+        return [select_scene_anomaly(logits) for logits in all_logits]
+
+    except Exception as e:
+        print(f"❌ Batched scene processing error: {e}")
+        return [0.0] * len(frames)
+
+def select_scene_anomaly(logits):
+    """Pick the highest-confidence detected category from one logits row (0.0 if none)"""
+    anomaly_detected = False
+    max_confidence = 0.0
+    detected_type = "normal"
+
+    # Categories are checked in the original pipeline order; ties keep the earlier category
+    for name, decision in evaluate_scene_categories(logits).items():
+        if decision['detected']:
+            print(f"{SCENE_CATEGORIES[name][5]}: {decision['margin']:.3f} conf, type: {decision['prompt'][:50]}...")
+            if decision['score'] > max_confidence:
+                anomaly_detected = True
+                max_confidence = decision['score']
+                detected_type = SCENE_CATEGORIES[name][4]
+
+    if anomaly_detected:
+        print(f"🎬 SOTA Scene Detection: {detected_type} (confidence={max_confidence:.3f})")
+        return max_confidence
+
+    return 0.0
+
 def process_scene_tier2_frame(image_array):
     """SOTA Tier 2 Scene Analysis - Advanced AI with Scene Understanding"""
     image = Image.fromarray(image_array)
     
     # Enhanced scene captioning with BLIP
+    blip_processor, blip_model = get_blip()
     inputs = blip_processor(images=image, return_tensors="pt")
-    generated_ids = blip_model.generate(**inputs, max_length=50, num_beams=4)
+    inputs["pixel_values"] = prepare_pixels("blip", inputs["pixel_values"])
+    with model_inference("blip"):
+        generated_ids = blip_model.generate(**inputs, max_length=50, num_beams=4)
     caption = blip_processor.decode(generated_ids[0], skip_special_tokens=True)
     
-    # SOTA Large Model Analysis with CLIP-Large
-    all_prompts = (SOTA_NORMAL_PROMPTS + SOTA_VIOLENCE_PROMPTS + 
-                  SOTA_MEDICAL_EMERGENCY_PROMPTS + SOTA_ABNORMAL_BEHAVIOR_PROMPTS)
-    
-    inputs = clip_large_processor(text=all_prompts, images=image, return_tensors="pt", padding=True)
-    outputs = clip_large_model(**inputs)
-    probs = outputs.logits_per_image.softmax(dim=1)[0]
+    # SOTA Large Model Analysis with CLIP-Large (prompt embeddings from the bank)
+    probs = _softmax(score_scene_images_tier2([image])[0])
     
     # Sophisticated category analysis
     normal_end = len(SOTA_NORMAL_PROMPTS)
@@ -855,10 +648,10 @@ def process_scene_tier2_frame(image_array):
     medical_scores = probs[violence_end:medical_end]
     abnormal_scores = probs[medical_end:]
     
-    max_normal = torch.max(normal_scores).item()
-    max_violence = torch.max(violence_scores).item()
-    max_medical = torch.max(medical_scores).item()
-    max_abnormal = torch.max(abnormal_scores).item()
+    max_normal = float(np.max(normal_scores))
+    max_violence = float(np.max(violence_scores))
+    max_medical = float(np.max(medical_scores))
+    max_abnormal = float(np.max(abnormal_scores))
     
     # Determine best anomaly with industry-standard thresholds
     anomaly_categories = [
@@ -13,6 +13,7 @@ import VideoPlayback from './components/VideoPlayback';
 import UserDashboard from './pages/UserDashboard';
 import DatabaseManager from './components/DatabaseManager';
 import VideoUploadMonitoring from './pages/VideoUploadMonitoring';
+import { withFrameProtocol, parseFrameMessage, bytesToBase64 } from './utils/frameProtocol';
 import './index.css';
 
 // Debug/Demo mode - set to true to skip login
@@ -242,10 +243,12 @@ function App() {
       const username = user?.username || 'demo_user';
       const separator = endpoint.includes('?') ? '&' : '?';
       const wsBaseUrl = process.env.REACT_APP_WS_URL || 'ws://localhost:8000';
-      const wsUrl = `${wsBaseUrl}${endpoint}${separator}username=${encodeURIComponent(username)}`;
+      // Display frames arrive as binary JPEG messages instead of base64 JSON
+      const wsUrl = withFrameProtocol(`${wsBaseUrl}${endpoint}${separator}username=${encodeURIComponent(username)}`);
       
       console.log('🌐 Attempting WebSocket connection to:', wsUrl);
       const newWs = new WebSocket(wsUrl);
+      newWs.binaryType = 'arraybuffer';
     
     newWs.onopen = () => {
       console.log('✅ WebSocket connection opened successfully!');
@@ -255,6 +258,17 @@ function App() {
     };
 
     newWs.onmessage = (event) => {
+      // Binary display frame: follows its JSON metadata message
+      if (event.data instanceof ArrayBuffer) {
+        try {
+          const frame = parseFrameMessage(event.data);
+          setVideoFrame(bytesToBase64(frame.jpeg));
+        } catch (error) {
+          console.error('❌ Error parsing binary frame:', error);
+        }
+        return;
+      }
+
       try {
         const data = JSON.parse(event.data);
         setJsonData(data);
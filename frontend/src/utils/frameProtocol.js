@@ -0,0 +1,51 @@
+// Binary websocket frame transport (see backend/utils/frame_protocol.py)
+//
+// Opting in with ?frame_protocol=binary makes the server send each display frame as
+// a JSON metadata message ("frame_format": "binary") followed by one binary message:
+//   magic "AF" | version u8 | kind u8 | frame_id u32 | timestamp f64 | jpeg_len u32 | audio_len u32
+// (24-byte little-endian header) and then the JPEG bytes.
+
+export const FRAME_PROTOCOL = 'binary';
+const FRAME_PROTOCOL_VERSION = 1;
+const FRAME_HEADER_SIZE = 24;
+
+// Append the opt-in query parameter to a websocket endpoint
+export const withFrameProtocol = (endpoint) => {
+  const separator = endpoint.includes('?') ? '&' : '?';
+  return `${endpoint}${separator}frame_protocol=${FRAME_PROTOCOL}`;
+};
+
+// ArrayBuffer -> { kind, frameId, timestamp, jpeg (Uint8Array), audio (Uint8Array) }; throws if malformed
+export const parseFrameMessage = (buffer) => {
+  if (buffer.byteLength < FRAME_HEADER_SIZE) {
+    throw new Error(`Binary frame too short: ${buffer.byteLength} bytes`);
+  }
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1));
+  const version = view.getUint8(2);
+  if (magic !== 'AF' || version !== FRAME_PROTOCOL_VERSION) {
+    throw new Error(`Unsupported binary frame (magic=${magic}, version=${version})`);
+  }
+  const jpegLength = view.getUint32(16, true);
+  const audioLength = view.getUint32(20, true);
+  if (FRAME_HEADER_SIZE + jpegLength + audioLength > buffer.byteLength) {
+    throw new Error('Binary frame payload truncated');
+  }
+  return {
+    kind: view.getUint8(3),
+    frameId: view.getUint32(4, true),
+    timestamp: view.getFloat64(8, true),
+    jpeg: new Uint8Array(buffer, FRAME_HEADER_SIZE, jpegLength),
+    audio: new Uint8Array(buffer, FRAME_HEADER_SIZE + jpegLength, audioLength)
+  };
+};
+
+// JPEG bytes -> base64 string, for components that render data:image/jpeg;base64 URLs
+export const bytesToBase64 = (bytes) => {
+  let binary = '';
+  const chunkSize = 0x8000; // Stay under the argument limit of String.fromCharCode
+  for (let i = 0; i < bytes.length; i += chunkSize) {
+    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + chunkSize));
+  }
+  return btoa(binary);
+};